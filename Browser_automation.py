@@ -1,126 +1,233 @@
 import asyncio
 import json
-from playwright.async_api import async_playwright
-from scrapy.crawler import CrawlerProcess
-from scrapy.utils.project import get_project_settings
-from summarizer import summarize_text
-from search_spider import SearchSpider
-from keyword_extractor import extract_keywords
-from file_system_handler import generate_pdf
+import os
+import re
+import time
 from content_scraper import extract_structured_content
+from browser_manager import get_browser_manager
+from streaming_pipeline import StreamingPipeline, JsonFileSink
+from run_store import get_run_store, RunStoreSink
+from stage_graph import (StageGraph, fingerprint, file_hash, keywords_input, keywords_run, keywords_stage,
+                         pdf_stage)
+from summarizer import summary_settings
+from async_runtime import run_sync
+from instrumentation import span, count, is_enabled, export, new_trace
+from result_cache import ResultCache
 
 import logging
 logging.getLogger("pdfminer").setLevel(logging.WARNING)
 
+# Search engine home page; any page with a q input and Bing-style results works
+SEARCH_URL = os.environ.get("AGENT_SEARCH_URL", "https://www.bing.com/")
+
+# Results for the same (normalized) query are reused for this many seconds
+SEARCH_CACHE_TTL = 6 * 3600
+
+# The results page only needs its DOM; these are never requested
+BLOCKED_RESOURCES = {"image", "font", "media", "stylesheet"}
+
+_search_cache = None
+
+def get_search_cache():
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = ResultCache("search", "search-results-v1")
+    return _search_cache
+
+def normalize_query(query):
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+async def _block_heavy_resources(route):
+    if route.request.resource_type in BLOCKED_RESOURCES:
+        await route.abort()
+    else:
+        await route.continue_()
+
 # -------------------- Search URLs using Playwright --------------------
-async def get_top_search_urls(query, num_results=5):
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context()
-        page = await context.new_page()
-
-        await page.goto("https://www.bing.com/")
-        await page.wait_for_selector("input[name=q]", timeout=10000)
-        await page.fill("input[name=q]", query)
-        await page.keyboard.press("Enter")
-        await page.wait_for_selector("li.b_algo h2 a", timeout=10000)
-
-        urls = await page.eval_on_selector_all(
-            "li.b_algo h2 a", "elements => elements.map(el => el.href)"
-        )
-
-        # Scrape images/tables from search page
-        page_html = await page.content()
-        structured_data = extract_structured_content(page_html, page.url)
-        images, tables = structured_data['images'], structured_data['tables']
-        print(f"[+] Extracted from search page: Images: {len(images)}, Tables: {len(tables)}")
-
-        await browser.close()
-        return urls[:num_results] if urls else []
-
-# -------------------- Scrape URLs using Scrapy --------------------
-def run_scrapy_spider(urls):
-    settings = get_project_settings()
-    settings.set("FEEDS", {
-        "scraped_output.json": {
-            "format": "json",
-            "overwrite": True
-        }
-    })
-    process = CrawlerProcess(settings)
-    process.crawl(SearchSpider, urls=urls)
-    process.start()
+async def get_top_search_urls(query, num_results=5, search_url=None, use_cache=True,
+                              extract_page_content=False):
+    """
+    Top result URLs for `query`. Served from the search cache (no browser)
+    when the same normalized query was searched within SEARCH_CACHE_TTL.
+    `extract_page_content` also reports images/tables found on the results page.
+    """
+    search_url = search_url or SEARCH_URL
+    cache_key = normalize_query(query)
+    if use_cache:
+        cached = get_search_cache().get(cache_key, search_url=search_url)
+        if cached and time.time() - cached["fetched_at"] < SEARCH_CACHE_TTL:
+            count("search_cache_hits")
+            return cached["urls"][:num_results]
+
+    async with get_browser_manager().page() as page:
+        await page.route("**/*", _block_heavy_resources)
+        try:
+            await page.goto(search_url)
+            await page.wait_for_selector("input[name=q]", timeout=10000)
+            await page.fill("input[name=q]", query)
+            await page.keyboard.press("Enter")
+            await page.wait_for_selector("li.b_algo h2 a", timeout=10000)
+
+            urls = await page.eval_on_selector_all(
+                "li.b_algo h2 a", "elements => elements.map(el => el.href)"
+            )
+
+            if extract_page_content:
+                page_html = await page.content()
+                structured_data = extract_structured_content(page_html, page.url)
+                images, tables = structured_data['images'], structured_data['tables']
+                print(f"[+] Extracted from search page: Images: {len(images)}, Tables: {len(tables)}")
+        finally:
+            # Pages go back to the pool; the next user may need everything loaded
+            try:
+                await page.unroute("**/*", _block_heavy_resources)
+            except Exception:
+                pass  # page already gone; the pool replaces it
+
+    urls = urls or []
+    if use_cache and urls:
+        get_search_cache().put(cache_key, {"urls": urls, "fetched_at": time.time()}, search_url=search_url)
+    return urls[:num_results]
+
+async def search_many(queries, num_results=5, search_url=None):
+    """Run several searches in parallel tabs of the shared browser."""
+    results = await asyncio.gather(
+        *(get_top_search_urls(q, num_results, search_url) for q in queries), return_exceptions=True
+    )
+    urls_by_query = {}
+    for query, result in zip(queries, results):
+        if isinstance(result, Exception):
+            print(f"[⚠️] Search failed for '{query}': {result}")
+            result = []
+        urls_by_query[query] = result
+    return urls_by_query
 
 # -------------------- Main Execution Logic --------------------
-async def main(query, intents=None, commands=None):
+async def main(query, intents=None, commands=None, write_files=True, workdir="."):
+    """
+    Search, then stream the results through crawl/summarize/keyword stages.
+
+    Results are appended to a new run in the run store as they are produced,
+    and the run id is returned. With `write_files` (the default) they are also
+    streamed into the usual JSON files in `workdir`. The PDF report is
+    rendered from the store into `workdir`.
+    """
     intents = intents or []
     commands = commands or []
+    store = get_run_store()
+    run_id = store.create_run(query, commands, workdir)
+    try:
+        await _run(store, run_id, query, commands, write_files, workdir)
+    except BaseException:
+        store.finish_run(run_id, "failed")
+        raise
+    store.finish_run(run_id)
+    return run_id
+
+async def _run(store, run_id, query, commands, write_files, workdir):
+    path = lambda name: os.path.join(workdir, name)
+    graph = StageGraph(store, run_id, workdir)
 
     print("[+] Starting search...")
-    urls = await get_top_search_urls(query)
+    with span("search"):
+        urls = await get_top_search_urls(query)
 
     if not urls:
         print("[❌] No URLs found. Aborting pipeline.")
         return
 
     print("[+] URLs found:", urls)
-    with open("search_urls.json", "w") as f:
-        json.dump(urls, f, indent=2)
+    store.add_search_results(run_id, urls)
+    search_hash = graph.record("search", fingerprint(normalize_query(query), SEARCH_URL), entries=len(urls))
+    if write_files:
+        with open(path("search_urls.json"), "w") as f:
+            json.dump(urls, f, indent=2)
 
+    scraped = None
     if any(cmd in commands for cmd in ["scrape", "summarize", "headlines"]):
-        print("[+] Running Scrapy spider...")
-        run_scrapy_spider(urls)
-
-    try:
-        with open("scraped_output.json", "r") as f:
-            scraped_data = json.load(f)
-    except FileNotFoundError:
-        print("[❌] Scraped output not found. Skipping downstream tasks.")
-        return
-
+        print("[+] Crawling URLs...")
+    else:
+        # Nothing to crawl this time: work from the previous run's pages
+        previous = store.latest_run("scrape", workdir=workdir, exclude=run_id)
+        if previous is not None:
+            scraped = store.iter_pages(previous)
+            scrape_hash = store.stage_digest(previous, "scrape")
+        else:
+            try:
+                with open(path("scraped_output.json"), "r") as f:
+                    scraped = json.load(f)
+                scrape_hash = file_hash(path("scraped_output.json"))
+            except FileNotFoundError:
+                print("[❌] Scraped output not found. Skipping downstream tasks.")
+                return
+
+    sinks = [RunStoreSink(store, run_id)]
+    if write_files:
+        sinks.append(JsonFileSink(workdir))
+    pipeline = StreamingPipeline(commands, sinks=sinks)
+    with span("stream", pages=len(urls) if scraped is None else None):
+        await pipeline.run(urls if scraped is None else None, scraped)
+
+    if scraped is None:
+        # Pages are always fetched again; the ones whose text changed are what the later stages redo
+        previous = store.latest_run("scrape", workdir=workdir, exclude=run_id)
+        before = store.page_hashes(previous) if previous is not None else {}
+        pages = store.page_hashes(run_id)
+        changed = sum(1 for url, text_hash in pages.items() if before.get(url) != text_hash)
+        scrape_hash = graph.record("scrape", search_hash, entries=len(pages), recomputed=changed)
     if "summarize" in commands:
-        print("[+] Summarizing scraped data...")
-        summaries = []
-        for entry in scraped_data:
-            summary = summarize_text(entry["text"])
-            summaries.append({"url": entry["url"], "summary": summary})
-
-        with open("final_summary.json", "w") as f:
-            json.dump(summaries, f, indent=2)
-        print("[✓] Summaries saved in final_summary.json")
+        graph.record("summarize", fingerprint(scrape_hash, summary_settings()),
+                     entries=pipeline.summarized_count, recomputed=pipeline.stats["summarize"].get("computed", 0))
+    if pipeline.streams_keywords:
+        graph.record("extract_keywords", keywords_input(store, run_id), entries=pipeline.summarized_count,
+                     recomputed=pipeline.stats["extract_keywords"].get("computed", 0))
 
+    if "summarize" in commands:
+        print(f"[✓] Summarized {pipeline.summarized_count} pages" +
+              (" into final_summary.json" if write_files else ""))
+    if pipeline.duplicate_count:
+        print(f"[✓] {pipeline.duplicate_count} near-duplicate pages grouped with the page they repeat")
     if "headlines" in commands:
-        print("[+] Extracting just headlines...")
-        headlines = [{"url": entry["url"], "headline": entry["text"].split('\n')[0]} for entry in scraped_data]
-
-        with open("headlines.json", "w") as f:
-            json.dump(headlines, f, indent=2)
-        print("[✓] Headlines saved in headlines.json")
-
-    keyword_file = None
+        print("[✓] Headlines extracted" + (" into headlines.json" if write_files else ""))
+
+    # Summaries of this run, or of the last run that made some
+    summary_run = run_id if "summarize" in commands else store.latest_run("summarize", workdir=workdir,
+                                                                           exclude=run_id)
+    if "extract_keywords" in commands and not pipeline.streams_keywords:
+        if summary_run is None:
+            print("[❌] No summaries to extract keywords from.")
+        else:
+            print("[+] Extracting keywords...")
+            with span("keywords"):
+                keywords_stage(graph, summary_run, path("keywords.json") if write_files else None)
     if "extract_keywords" in commands:
-        print("[+] Extracting keywords...")
-        keyword_file = extract_keywords("final_summary.json", "keywords.json")
-        print("[✓] Keywords saved in", keyword_file)
+        print(f"[✓] Keywords saved in run {run_id}" + (" and keywords.json" if write_files else ""))
 
     if "export_to_pdf" in commands or "save_to_file" in commands:
         print("[+] Generating PDF report...")
-        summary_file = "final_summary.json"
-        if summary_file and (not keyword_file or keyword_file.endswith(".json")):
-            generate_pdf(summary_file, keyword_file)
+        if summary_run is None:
+            print("[❌] Cannot generate PDF. No summaries found.")
         else:
-            print("[❌] Cannot generate PDF. Summary or keyword file missing.")
+            keyword_run = run_id if store.keywords(run_id) else keywords_run(graph, summary_run)
+            with span("pdf"):
+                pdf_stage(graph, summary_run, keyword_run, path("final_report.pdf"))
 
-    print("[🏁] Pipeline complete.")
+    graph.report()
+    print(f"[🏁] Pipeline complete (run {run_id}).")
 
 # -------------------- Entrypoint for Router --------------------
-def run_pipeline(instruction, intents, commands):
+def run_pipeline(instruction, intents, commands, workdir="."):
     print(f"[🚀] Running web pipeline for: {instruction}")
-    asyncio.run(main(instruction, intents, commands))
+    # A trace of its own: other instructions may be running (agent server workers)
+    with new_trace():
+        with span("pipeline", instruction=instruction):
+            run_sync(main(instruction, intents, commands, workdir=workdir))
+        if is_enabled():
+            export(workdir)
 
 # -------------------- Standalone Debug/Test --------------------
 if __name__ == "__main__":
     test_query = input("🔍 Enter your search query: ")
     dummy_intents = ["web", "file_handler"]
     dummy_commands = ["scrape", "summarize", "extract_keywords", "export_to_pdf"]
-    asyncio.run(main(test_query, dummy_intents, dummy_commands))
+    run_sync(main(test_query, dummy_intents, dummy_commands))
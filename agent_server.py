@@ -0,0 +1,372 @@
+import contextvars
+import io
+import ipaddress
+import json
+import os
+import queue
+import re
+import shutil
+import sys
+import threading
+import time
+import traceback
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from task_handler import route_instruction
+
+# Long-running mode: one process keeps the models, browser and connection
+# pools warm and runs instructions posted over a local HTTP API.
+#
+#   POST /jobs                      {"instruction": "...", "session": "..." (optional)}
+#                                   -> {"id": ..., "session": ..., "status": "queued"}
+#   GET  /jobs                      all jobs, newest first
+#   GET  /jobs/<id>                 status, parsed intent, output files
+#   GET  /jobs/<id>/log?offset=N    log lines from N on (for polling)
+#   GET  /jobs/<id>/stream          log lines as NDJSON until the job ends
+#   GET  /jobs/<id>/files/<name>    download an output file
+#   GET  /health                    queue and worker state
+#
+# Each job runs in a directory of its own under jobs/, unless it names a
+# session: jobs of one session share jobs/sessions/<name>/ and run one at a
+# time, so a follow-up ("generate a pdf report from the last search") finds
+# the files and runs of the jobs before it.
+#
+# The API has no authentication and instructions can run shell commands, so
+# it only binds to loopback addresses unless serve(allow_remote=True)
+# (main.py --allow-remote) is given.
+
+JOBS_DIR = "jobs"
+MAX_FINISHED_JOBS = 200
+SESSION_NAME = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+_job_output = contextvars.ContextVar("job_output", default=None)
+
+
+# -------------------- Per-job stdout --------------------
+class _RoutedStdout(io.TextIOBase):
+    """
+    Stands in for sys.stdout: writes go to the log of the job whose context
+    is active (worker thread, its event-loop tasks and to_thread calls),
+    everything else to the real stdout.
+    """
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def write(self, text):
+        job = _job_output.get()
+        if job is None:
+            return self.fallback.write(text)
+        job.write_log(text)
+        return len(text)
+
+    def flush(self):
+        self.fallback.flush()
+
+    @property
+    def encoding(self):
+        return getattr(self.fallback, "encoding", "utf-8")
+
+
+# -------------------- Jobs --------------------
+class Job:
+    def __init__(self, instruction, workdir, session=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.instruction = instruction
+        self.session = session
+        self.workdir = os.path.join(workdir, *(("sessions", session) if session else (self.id,)))
+        self.status = "queued"
+        self.created = time.time()
+        self.started = self.finished = None
+        self.parsed = None
+        self.error = None
+        self.lines = []
+        self._partial = ""
+        self._changed = threading.Condition()
+
+    def write_log(self, text):
+        with self._changed:
+            *complete, self._partial = (self._partial + text).split("\n")
+            if complete:
+                self.lines.extend(complete)
+                self._changed.notify_all()
+
+    def set_status(self, status, **fields):
+        with self._changed:
+            if self._partial:
+                self.lines.append(self._partial)
+                self._partial = ""
+            self.status = status
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self._changed.notify_all()
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def wait_for_lines(self, offset, timeout=15):
+        """Lines after `offset`, waiting up to `timeout` seconds for new ones."""
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.lines) > offset or self.done, timeout)
+            return self.lines[offset:], self.done
+
+    def files(self):
+        if not os.path.isdir(self.workdir):
+            return []
+        return sorted(name for name in os.listdir(self.workdir)
+                      if os.path.isfile(os.path.join(self.workdir, name)))
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "instruction": self.instruction,
+            "session": self.session,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "parsed": self.parsed,
+            "error": self.error,
+            "files": self.files(),
+            "log_lines": len(self.lines),
+        }
+
+
+class JobQueue:
+    """Runs queued jobs on `workers` threads, each in its job's or session's working directory."""
+
+    def __init__(self, workers=2, jobs_dir=JOBS_DIR):
+        self.jobs_dir = jobs_dir
+        self.jobs = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._session_locks = {}
+        self._threads = [
+            threading.Thread(target=self._work, name=f"agent-job-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, instruction, session=None):
+        job = Job(instruction, self.jobs_dir, session)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._forget_old()
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return sorted(self.jobs.values(), key=lambda job: job.created, reverse=True)
+
+    def stats(self):
+        with self._lock:
+            states = [job.status for job in self.jobs.values()]
+        return {
+            "workers": len(self._threads),
+            "queued": states.count("queued"),
+            "running": states.count("running"),
+            "done": states.count("done"),
+            "failed": states.count("failed"),
+        }
+
+    def _forget_old(self):
+        finished = sorted((job for job in self.jobs.values() if job.done), key=lambda job: job.finished)
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job.id]
+            # A session's directory goes with the last job that used it
+            if not any(other.workdir == job.workdir for other in self.jobs.values()):
+                shutil.rmtree(job.workdir, ignore_errors=True)
+                self._session_locks.pop(job.session, None)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            self._run(job)
+
+    def _session_lock(self, job):
+        if job.session is None:
+            return threading.Lock()
+        with self._lock:
+            return self._session_locks.setdefault(job.session, threading.Lock())
+
+    def _run(self, job):
+        # Jobs of one session share their files: one at a time, in submission order
+        with self._session_lock(job):
+            os.makedirs(job.workdir, exist_ok=True)
+            job.set_status("running", started=time.time())
+            token = _job_output.set(job)
+            try:
+                parsed = route_instruction(job.instruction, workdir=job.workdir)
+                job.set_status("done", finished=time.time(), parsed=_jsonable(parsed))
+            except Exception as e:
+                job.write_log(traceback.format_exc())
+                job.set_status("failed", finished=time.time(), error=f"{type(e).__name__}: {e}")
+            finally:
+                _job_output.reset(token)
+
+
+def _jsonable(value):
+    return json.loads(json.dumps(value, default=str))
+
+
+# -------------------- HTTP API --------------------
+def _make_handler(jobs):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "AgentServer/1.0"
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, indent=2).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _job(self, job_id):
+            job = jobs.get(job_id)
+            if job is None:
+                self._send_json(404, {"error": f"no job {job_id}"})
+            return job
+
+        def do_POST(self):
+            if urlsplit(self.path).path.rstrip("/") != "/jobs":
+                return self._send_json(404, {"error": "not found"})
+            if self.headers.get_content_type() != "application/json":
+                return self._send_json(415, {"error": "expected Content-Type: application/json"})
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                instruction, session = body.get("instruction", ""), body.get("session")
+            except (ValueError, AttributeError):
+                return self._send_json(400, {"error": "expected a JSON object with an 'instruction'"})
+            if not isinstance(instruction, str) or not instruction.strip():
+                return self._send_json(400, {"error": "'instruction' must be a non-empty string"})
+            if session is not None and not (isinstance(session, str) and SESSION_NAME.fullmatch(session)):
+                return self._send_json(400, {"error": "'session' must be 1-64 letters, digits, '-' or '_'"})
+            job = jobs.submit(instruction.strip(), session)
+            self._send_json(202, {"id": job.id, "session": job.session, "status": job.status})
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            if parts == ["health"]:
+                return self._send_json(200, {"status": "ok", **jobs.stats()})
+            if parts == ["jobs"]:
+                return self._send_json(200, [job.to_dict() for job in jobs.list()])
+            if len(parts) < 2 or parts[0] != "jobs":
+                return self._send_json(404, {"error": "not found"})
+
+            job = self._job(parts[1])
+            if job is None:
+                return
+            if len(parts) == 2:
+                return self._send_json(200, job.to_dict())
+            if parts[2:] == ["log"]:
+                try:
+                    offset = int(parse_qs(url.query).get("offset", ["0"])[0] or 0)
+                except ValueError:
+                    offset = -1
+                if offset < 0:
+                    return self._send_json(400, {"error": "'offset' must be a non-negative integer"})
+                lines, done = job.wait_for_lines(offset, timeout=0)
+                return self._send_json(200, {"offset": offset + len(lines), "lines": lines,
+                                             "status": job.status})
+            if parts[2:] == ["stream"]:
+                return self._stream(job)
+            if len(parts) == 4 and parts[2] == "files":
+                return self._send_file(job, parts[3])
+            self._send_json(404, {"error": "not found"})
+
+        def _stream(self, job):
+            # HTTP/1.0 response without a length: the body ends when the job does
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            offset = 0
+            try:
+                while True:
+                    lines, done = job.wait_for_lines(offset)
+                    for line in lines:
+                        self.wfile.write((json.dumps({"line": line}) + "\n").encode())
+                    offset += len(lines)
+                    if done and offset >= len(job.lines):
+                        break
+                    self.wfile.flush()
+                self.wfile.write((json.dumps(job.to_dict()) + "\n").encode())
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client went away; the job keeps running
+
+        def _send_file(self, job, name):
+            if name not in job.files():
+                return self._send_json(404, {"error": f"no file {name}"})
+            with open(os.path.join(job.workdir, name), "rb") as f:
+                body = f.read()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf" if name.endswith(".pdf") else
+                             "application/json" if name.endswith(".json") else "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            print(f"[🌐] {self.address_string()} {fmt % args}")
+
+    return Handler
+
+
+def _warm_browser():
+    try:
+        from browser_manager import get_browser_manager
+        from async_runtime import run_sync
+
+        async def open_page():
+            async with get_browser_manager().page():
+                pass
+
+        run_sync(open_page())
+    except Exception as e:
+        print(f"[⚠️] Browser warm-up failed: {e}")
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def serve(host="127.0.0.1", port=8700, workers=2, jobs_dir=JOBS_DIR, warm=True, allow_remote=False):
+    """Serve the job API until interrupted."""
+    if not is_loopback(host):
+        if not allow_remote:
+            raise ValueError(f"Refusing to serve the unauthenticated job API on non-loopback host '{host}' "
+                             "(pass allow_remote=True / --allow-remote to do it anyway)")
+        print(f"[⚠️] Serving the job API on {host} without authentication: anyone who can reach it "
+              "can run instructions, including shell commands")
+    if not isinstance(sys.stdout, _RoutedStdout):
+        sys.stdout = _RoutedStdout(sys.stdout)
+    if warm:
+        from model_registry import warm_up
+        warm_up(["summarizer", "keybert", "embedder"])
+        threading.Thread(target=_warm_browser, name="browser-warm-up", daemon=True).start()
+
+    jobs = JobQueue(workers, jobs_dir)
+    server = ThreadingHTTPServer((host, port), _make_handler(jobs))
+    server.daemon_threads = True
+    print(f"[🚀] Agent server listening on http://{host}:{server.server_address[1]} ({workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("[+] Shutting down agent server.")
+    finally:
+        server.server_close()
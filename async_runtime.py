@@ -0,0 +1,60 @@
+import asyncio
+import atexit
+import threading
+
+# A single event loop that lives for the whole process. Async resources such as
+# the Playwright browser are bound to the loop that created them, so every
+# instruction has to run on the same loop instead of a fresh asyncio.run().
+
+_loop = None
+_thread = None
+_lock = threading.Lock()
+_shutdown_hooks = []
+
+
+def get_loop():
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_loop.run_forever, name="agent-event-loop", daemon=True)
+            _thread.start()
+    return _loop
+
+
+def run_sync(coro, timeout=None):
+    """Run a coroutine on the shared background loop and block until it returns."""
+    loop = get_loop()
+    if threading.current_thread() is _thread:
+        raise RuntimeError("run_sync() cannot be called from the shared event loop thread")
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    return future.result(timeout)
+
+
+def on_shutdown(hook):
+    """Register an async callable to run on the shared loop at interpreter exit."""
+    _shutdown_hooks.append(hook)
+    return hook
+
+
+async def _run_shutdown_hooks():
+    for hook in reversed(_shutdown_hooks):
+        try:
+            await hook()
+        except Exception as e:
+            print(f"[⚠️] Shutdown hook failed: {e}")
+
+
+@atexit.register
+def shutdown():
+    global _loop
+    if _loop is None or _loop.is_closed():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(_run_shutdown_hooks(), _loop).result(timeout=15)
+    except Exception as e:
+        print(f"[⚠️] Event loop shutdown incomplete: {e}")
+    _loop.call_soon_threadsafe(_loop.stop)
+    if _thread is not None:
+        _thread.join(timeout=5)
+    _loop = None
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import re
+import time
+
+from async_runtime import run_sync
+from Browser_automation import search_many
+from file_system_handler import render_pdf
+from instrumentation import span
+from json_sinks import JsonArrayWriter, JsonObjectWriter
+from streaming_pipeline import StreamingPipeline
+
+# Many instructions in one run: all searches share the browser pool, every
+# distinct URL is crawled, summarized and keyword-tagged once, and each
+# instruction then gets its own report built from the shared results.
+
+BATCH_COMMANDS = ["scrape", "summarize", "extract_keywords"]
+
+
+class SummaryIndexSink:
+    """Keeps only summaries, keywords and duplicate links by URL (not the scraped page text)."""
+
+    def __init__(self):
+        self.summaries = {}
+        self.keywords = {}
+        self.duplicates = {}
+
+    def open(self, stages):
+        pass
+
+    def on_scraped(self, item):
+        pass
+
+    def on_duplicate(self, url, canonical):
+        self.duplicates[url] = canonical
+
+    def on_headline(self, headline):
+        pass
+
+    def on_summary(self, entry):
+        self.summaries[entry["url"]] = entry
+
+    def on_keywords(self, url, keywords):
+        self.keywords[url] = keywords
+
+    def close(self):
+        pass
+
+
+def read_instructions(path):
+    """One instruction per line (blank lines and # comments skipped), or a JSON list."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return [str(item).strip() for item in json.load(f) if str(item).strip()]
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def report_dir_name(index, instruction):
+    slug = re.sub(r"[^a-z0-9]+", "-", instruction.lower()).strip("-")[:60] or "query"
+    return f"{index:03d}-{slug}"
+
+
+async def run_batch_async(instructions, output_dir="batch_reports", num_results=5, pdf=True,
+                          search_url=None):
+    """
+    Search every instruction, process the union of their result URLs once,
+    and write output_dir/<nnn-slug>/ reports plus output_dir/batch.json.
+    """
+    instructions = list(dict.fromkeys(instructions))
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"[+] Searching {len(instructions)} queries...")
+    with span("batch.search", queries=len(instructions)):
+        urls_by_query = await search_many(instructions, num_results, search_url)
+
+    unique_urls = list(dict.fromkeys(url for urls in urls_by_query.values() for url in urls))
+    total_urls = sum(len(urls) for urls in urls_by_query.values())
+    print(f"[+] {total_urls} results, {len(unique_urls)} unique pages to process")
+
+    sink = SummaryIndexSink()
+    if unique_urls:
+        pipeline = StreamingPipeline(BATCH_COMMANDS, sinks=[sink])
+        with span("batch.stream", pages=len(unique_urls)):
+            await pipeline.run(unique_urls)
+
+    index = []
+    with span("batch.reports", queries=len(instructions)):
+        for i, instruction in enumerate(instructions, 1):
+            urls = urls_by_query.get(instruction, [])
+            report_dir = os.path.join(output_dir, report_dir_name(i, instruction))
+            # FPDF rendering and image preparation would block the shared event loop
+            index.append(await asyncio.to_thread(_write_report, instruction, urls, sink, report_dir, pdf))
+
+    batch_file = os.path.join(output_dir, "batch.json")
+    with open(batch_file, "w", encoding="utf-8") as f:
+        json.dump({
+            "queries": len(instructions),
+            "results": total_urls,
+            "unique_pages": len(unique_urls),
+            "summarized_pages": len(sink.summaries),
+            "near_duplicates": len(sink.duplicates),
+            "seconds": round(time.perf_counter() - started, 2),
+            "reports": index,
+        }, f, indent=2)
+    print(f"[🏁] Batch complete: {len(instructions)} reports in {output_dir}")
+    return index
+
+
+def _write_report(instruction, urls, sink, report_dir, pdf):
+    os.makedirs(report_dir, exist_ok=True)
+    # Near-duplicates show up once, under the page that was summarized for them
+    alternates = {}
+    for url in urls:
+        if url in sink.duplicates:
+            alternates.setdefault(sink.duplicates[url], []).append(url)
+    entries = []
+    for url in dict.fromkeys(sink.duplicates.get(url, url) for url in urls):
+        if url in sink.summaries:
+            entry = sink.summaries[url]
+            if url in alternates:
+                entry = {**entry, "alternate_urls": alternates[url]}
+            entries.append(entry)
+    keywords = {entry["url"]: sink.keywords.get(entry["url"], []) for entry in entries}
+
+    with open(os.path.join(report_dir, "search_urls.json"), "w") as f:
+        json.dump(urls, f, indent=2)
+    with JsonArrayWriter(os.path.join(report_dir, "final_summary.json")) as writer:
+        for entry in entries:
+            writer.append(entry)
+    with JsonObjectWriter(os.path.join(report_dir, "keywords.json"), ensure_ascii=False) as writer:
+        for url, words in keywords.items():
+            writer.add(url, words)
+
+    report = None
+    if pdf and entries:
+        report = os.path.join(report_dir, "final_report.pdf")
+        render_pdf(entries, keywords, report)
+    elif not entries:
+        print(f"[⚠️] No pages summarized for '{instruction}'")
+
+    return {"instruction": instruction, "directory": report_dir, "urls": urls,
+            "pages": len(entries), "report": report}
+
+
+def run_batch(instructions, output_dir="batch_reports", num_results=5, pdf=True, search_url=None):
+    return run_sync(run_batch_async(instructions, output_dir, num_results, pdf, search_url))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run many search instructions as one batch")
+    parser.add_argument("instructions", help="text file with one instruction per line, or a JSON list")
+    parser.add_argument("--output", default="batch_reports", help="directory for the per-query reports")
+    parser.add_argument("--results", type=int, default=5, help="search results per query")
+    parser.add_argument("--no-pdf", action="store_true", help="write JSON reports only")
+    args = parser.parse_args()
+
+    run_batch(read_instructions(args.instructions), args.output, args.results, not args.no_pdf)
@@ -0,0 +1,127 @@
+"""
+Offline evaluation of main-content extraction (main_content.py).
+
+    python -m benchmarks.boilerplate [page.html ...] [--generated 20] [--tokenizer]
+                                     [--output boilerplate_eval.json]
+
+Every page is extracted twice: the old way (every <p> over 50 characters,
+what scrape_content used to send to the summarizer) and with
+main_content=True. The report shows how many tokens the main-content text
+removes and, on pages whose article paragraphs are marked data-eval="body",
+how many body paragraphs survive (recall) and how much of the kept text is
+body (precision).
+
+By default the saved pages in benchmarks/fixtures/main_content are used,
+plus --generated fixture articles that share one domain, so the per-domain
+template takes over after a few pages. Templates are learned in a temporary
+store. Tokens are whitespace-separated words unless --tokenizer is given,
+which counts with the summarizer's own tokenizer (needs transformers).
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+
+import lxml.html
+
+from benchmarks.fixture_site import make_article
+from html_extract import extract_document
+from main_content import get_template_store
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "main_content")
+CHART_NOTE = "\n\n[Charts Detected:"
+
+
+def _key(text):
+    return "".join(text.split())
+
+
+def load_pages(paths, generated):
+    pages = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            name = os.path.splitext(os.path.basename(path))[0]
+            pages.append((name, f"https://{name.replace('_', '-')}.fixtures.test/{name}.html", f.read()))
+    for i in range(generated):
+        pages.append((f"generated_{i}", f"https://reviews.fixtures.test/articles/{i}.html", make_article(i)))
+    return pages
+
+
+def token_counter(use_tokenizer):
+    if not use_tokenizer:
+        return lambda text: len(text.split())
+    from model_registry import get_model
+    import summarizer  # noqa: F401  (registers the model)
+    tokenizer = get_model("summarizer").tokenizer
+    return lambda text: len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+
+def evaluate(name, url, html, count_tokens):
+    before = extract_document(html, url)["text"].split(CHART_NOTE)[0]
+    start = time.perf_counter()
+    after = extract_document(html, url, main_content=True)["text"].split(CHART_NOTE)[0]
+    elapsed = time.perf_counter() - start
+
+    result = {"page": name, "url": url, "tokens_before": count_tokens(before),
+              "tokens_after": count_tokens(after), "ms": elapsed * 1000}
+    result["removed"] = 1 - result["tokens_after"] / result["tokens_before"] if result["tokens_before"] else 0.0
+
+    gold = {_key(p.text_content()) for p in lxml.html.fromstring(html).xpath('//p[@data-eval="body"]')}
+    if gold:
+        kept = [line for line in after.split("\n") if line.strip()]
+        body = [line for line in kept if _key(line) in gold]
+        result["recall"] = len({_key(line) for line in body}) / len(gold)
+        result["precision"] = sum(len(line) for line in body) / max(1, sum(len(line) for line in kept))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pages", nargs="*", help="saved HTML pages (default: benchmarks/fixtures/main_content)")
+    parser.add_argument("--generated", type=int, default=20, help="generated fixture articles to add")
+    parser.add_argument("--tokenizer", action="store_true", help="count tokens with the summarizer's tokenizer")
+    parser.add_argument("--output", help="write the per-page results as JSON")
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages or sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))), args.generated)
+    count_tokens = token_counter(args.tokenizer)
+
+    with tempfile.TemporaryDirectory(prefix="templates_") as tmp:
+        get_template_store(path=os.path.join(tmp, "templates.db"))
+        results = [evaluate(name, url, html, count_tokens) for name, url, html in pages]
+
+    print(f"{'page':<22} {'tokens':>15} {'removed':>8} {'recall':>7} {'precision':>9} {'ms':>6}")
+    for r in results:
+        recall = f"{r['recall']:.0%}" if "recall" in r else "-"
+        precision = f"{r['precision']:.0%}" if "precision" in r else "-"
+        print(f"{r['page']:<22} {r['tokens_before']:>6} -> {r['tokens_after']:<6} {r['removed']:>8.1%} "
+              f"{recall:>7} {precision:>9} {r['ms']:>6.1f}")
+
+    before = sum(r["tokens_before"] for r in results)
+    after = sum(r["tokens_after"] for r in results)
+    scored = [r for r in results if "recall" in r]
+    totals = {
+        "pages": len(results),
+        "tokens_before": before,
+        "tokens_after": after,
+        "removed": 1 - after / before if before else 0.0,
+        "recall": sum(r["recall"] for r in scored) / len(scored) if scored else None,
+        "precision": sum(r["precision"] for r in scored) / len(scored) if scored else None,
+    }
+    print(f"\n[✓] {before} -> {after} tokens over {len(results)} pages ({totals['removed']:.1%} removed)")
+    if scored:
+        print(f"    body recall {totals['recall']:.1%}, precision {totals['precision']:.1%} "
+              f"on {len(scored)} labelled pages")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"totals": totals, "pages": results}, f, indent=2)
+        print(f"[✓] Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
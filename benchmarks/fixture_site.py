@@ -0,0 +1,233 @@
+"""
+Synthetic web site for offline benchmarks.
+
+    with FixtureServer(articles=40) as site:
+        site.url("/")             # search form (input[name=q])
+        site.url("/search?q=x")   # results laid out like Bing (li.b_algo h2 a)
+        site.article_urls()       # generated review articles
+
+Articles are generated from a fixed seed, so every run serves the same bytes.
+Each one has page chrome (nav, sidebar, cookie banner, related-article
+teasers, a comment thread, footer), long paragraphs, pros/cons lists, a spec
+table, an inline SVG chart and PNG images. Article body paragraphs carry
+data-eval="body" so extraction quality can be scored against them. Query strings are
+ignored when serving, which lets a benchmark defeat the HTTP cache by
+appending ?run=N.
+"""
+import random
+import struct
+import threading
+import zlib
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+WORDS = (
+    "battery display camera performance design price value storage charging screen "
+    "processor memory software update speaker audio build quality weight thickness "
+    "brightness color accuracy refresh rate gaming thermal efficiency benchmark review "
+    "market energy solar wind grid demand supply trend growth forecast policy cost "
+    "consumer device network signal latency reliability warranty support feature"
+).split()
+
+TOPICS = ["smartphone", "laptop", "headphones", "solar panel", "electric car", "smartwatch",
+          "tablet", "router", "camera", "monitor"]
+
+
+def _sentence(rng, words=(8, 20)):
+    sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(*words)))
+    return sentence.capitalize() + "."
+
+
+def _paragraph(rng, sentences=(4, 8)):
+    return " ".join(_sentence(rng) for _ in range(rng.randint(*sentences)))
+
+
+def make_png(width, height, seed):
+    """A small RGB gradient PNG, built without Pillow."""
+    r0, g0, b0 = (seed * 67) % 256, (seed * 131) % 256, (seed * 29) % 256
+    x = np.arange(width)
+    y = np.arange(height)[:, None]
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    pixels[..., 0] = (r0 + x) % 256
+    pixels[..., 1] = (g0 + y) % 256
+    pixels[..., 2] = (b0 + x + y) % 256
+    # Every scanline starts with its filter type byte (0: none)
+    rows = np.hstack([np.zeros((height, 1), dtype=np.uint8), pixels.reshape(height, width * 3)])
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(rows.tobytes(), 6)) + chunk(b"IEND", b""))
+
+
+def make_article(index, images=3, paragraphs=12, seed=0):
+    """HTML of article `index`; image sources point at /images/<index>_<n>.png."""
+    rng = random.Random(seed * 100003 + index)
+    topic = TOPICS[index % len(TOPICS)]
+    title = f"{topic.title()} review {index}: {_sentence(rng, (4, 7))[:-1]}"
+
+    parts = [
+        "<!DOCTYPE html><html><head>",
+        f"<title>{escape(title)}</title>",
+        "<style>body { font-family: sans-serif; } .sidebar { float: right; }</style>",
+        "<script>window.analytics = window.analytics || []; analytics.push(['page']);</script>",
+        "</head><body>",
+        '<div class="cookie-banner"><p>We use cookies and similar technologies to improve your experience, '
+        'measure audiences and show personalised ads. <a href="/privacy">Manage preferences</a></p></div>',
+        '<nav class="menu"><ul>' + "".join(f'<li><a href="/section/{w}">{w.title()}</a></li>'
+                                          for w in rng.sample(WORDS, 8)) + "</ul></nav>",
+        '<div class="sidebar"><h3>Related</h3><ul>' + "".join(
+            f'<li><a href="/articles/{rng.randrange(1000)}.html">{escape(_sentence(rng, (3, 6)))}</a></li>'
+            for _ in range(6)) + "</ul><p>Subscribe to our newsletter.</p></div>",
+        f'<article><h1>{escape(title)}</h1>',
+        f'<p class="byline">By Staff Writer {index}</p>',
+    ]
+    for p in range(paragraphs):
+        parts.append(f'<p data-eval="body">{escape(_paragraph(rng))}</p>')
+        if p % 3 == 0 and p // 3 < images:
+            n = p // 3
+            parts.append(f'<figure><img src="/images/{index}_{n}.png" alt="{topic} photo {n}">'
+                         f"<figcaption>{escape(_sentence(rng, (4, 8)))}</figcaption></figure>")
+        if p == paragraphs // 2:
+            parts.append("<h2>Pros</h2><ul>" + "".join(f"<li>{escape(_sentence(rng, (3, 6)))}</li>"
+                                                      for _ in range(4)) + "</ul>")
+            parts.append("<h2>Cons</h2><ul>" + "".join(f"<li>{escape(_sentence(rng, (3, 6)))}</li>"
+                                                      for _ in range(3)) + "</ul>")
+            parts.append("<table><tr><th>Spec</th><th>Value</th></tr>" + "".join(
+                f"<tr><td>{w.title()}</td><td>{rng.randint(1, 999)} units</td></tr>"
+                for w in rng.sample(WORDS, 6)) + "</table>")
+            parts.append('<svg width="200" height="80">' + "".join(
+                f'<rect x="{i * 20}" y="{80 - h}" width="15" height="{h}"></rect>'
+                for i, h in enumerate(rng.randint(10, 80) for _ in range(8))) + "</svg>")
+    parts.append("</article>")
+    parts.append('<section class="related-articles"><h2>You may also like</h2>' + "".join(
+        f'<div class="teaser"><p><a href="/articles/{rng.randrange(1000)}.html">'
+        f"{escape(_sentence(rng, (5, 9)))}</a> {escape(_sentence(rng, (10, 16)))}</p></div>"
+        for _ in range(4)) + "</section>")
+    parts.append('<div id="comments"><h2>Comments</h2>' + "".join(
+        f'<div class="comment"><p class="author">Reader {rng.randrange(100)}</p>'
+        f"<p>{escape(_paragraph(rng, (1, 3)))}</p></div>"
+        for _ in range(rng.randint(2, 5))) + "</div>")
+    parts.append('<footer><p>Copyright Example Media. All rights reserved. Prices and availability '
+                 'are subject to change; we may earn a commission from links on this page.</p>'
+                 '<a href="/privacy">Privacy</a> <a href="/terms">Terms</a></footer>')
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def search_page(query, links):
+    """Results page with Bing's markup for organic results."""
+    items = "".join(
+        f'<li class="b_algo"><h2><a href="{escape(url)}">{escape(title)}</a></h2>'
+        f'<p>{escape(title)} snippet</p></li>'
+        for url, title in links
+    )
+    return (f"<!DOCTYPE html><html><head><title>{escape(query)} - Search</title></head><body>"
+            f'<form action="/search"><input name="q" value="{escape(query)}"></form>'
+            f'<ol id="b_results">{items}</ol></body></html>')
+
+
+HOME_PAGE = ('<!DOCTYPE html><html><head><title>Search</title></head><body>'
+             '<form action="/search"><input name="q" type="search"></form></body></html>')
+
+
+class FixtureServer:
+    """Serves the synthetic site from a background thread on 127.0.0.1."""
+
+    def __init__(self, articles=40, images_per_article=3, image_size=(480, 320), seed=0, port=0):
+        self.articles = articles
+        self.images_per_article = images_per_article
+        self.image_size = image_size
+        self.seed = seed
+        self.port = port
+        self.requests = 0
+        self._pages = {}
+        self._images = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    # -------------------- Content --------------------
+    def article_html(self, index):
+        with self._lock:
+            if index not in self._pages:
+                self._pages[index] = make_article(index, self.images_per_article, seed=self.seed).encode()
+            return self._pages[index]
+
+    def image_png(self, name):
+        with self._lock:
+            if name not in self._images:
+                self._images[name] = make_png(*self.image_size, seed=zlib.crc32(name.encode()))
+            return self._images[name]
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    def article_urls(self, count=None, run=None):
+        suffix = f"?run={run}" if run is not None else ""
+        return [self.url(f"/articles/{i}.html{suffix}") for i in range(count or self.articles)]
+
+    def _route(self, path, query):
+        if path == "/":
+            return 200, "text/html; charset=utf-8", HOME_PAGE.encode()
+        if path == "/search":
+            q = query.get("q", [""])[0]
+            links = [(url, f"Result {i} for {q}") for i, url in enumerate(self.article_urls())]
+            return 200, "text/html; charset=utf-8", search_page(q, links).encode()
+        if path.startswith("/articles/") and path.endswith(".html"):
+            index = path[len("/articles/"):-len(".html")]
+            if index.isdigit() and int(index) < self.articles:
+                return 200, "text/html; charset=utf-8", self.article_html(int(index))
+        if path.startswith("/images/") and path.endswith(".png"):
+            return 200, "image/png", self.image_png(path[len("/images/"):])
+        return 404, "text/plain", b"not found"
+
+    # -------------------- Server --------------------
+    def start(self):
+        # Build everything up front so page generation never shows up in timings
+        for index in range(self.articles):
+            self.article_html(index)
+            for n in range(self.images_per_article):
+                self.image_png(f"{index}_{n}.png")
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                status, content_type, body = site._route(parts.path, parse_qs(parts.query))
+                site.requests += 1
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
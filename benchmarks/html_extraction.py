@@ -0,0 +1,128 @@
+"""
+Micro-benchmark: single-pass html_extract vs the original BeautifulSoup functions.
+
+    python -m benchmarks.html_extraction [page.html ...]
+
+Without arguments a synthetic review-style page is used. Every page is also
+checked for identical output between the two implementations.
+"""
+import sys
+import time
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from html_extract import extract_document, IMAGE_EXTENSIONS
+
+
+# -------------------- Reference (pre single-pass) implementation --------------------
+def legacy_extract(html, base_url):
+    soup = BeautifulSoup(html, "html.parser")
+    paragraphs = soup.find_all("p")
+    main_text = "\n".join([p.get_text(strip=True) for p in paragraphs if len(p.get_text()) > 50])
+
+    image_urls = []
+    for img in soup.find_all("img"):
+        img_url = img.get("src") or img.get("data-src")
+        if img_url and any(ext in img_url for ext in IMAGE_EXTENSIONS):
+            image_urls.append(img_url)
+
+    tables = [str(table) for table in soup.find_all("table")]
+
+    svg_charts = soup.find_all("svg")
+    canvas_charts = soup.find_all("canvas")
+    if svg_charts or canvas_charts:
+        main_text += f"\n\n[Charts Detected: {len(svg_charts)} SVG, {len(canvas_charts)} Canvas]"
+
+    pros, cons = [], []
+    for header in soup.find_all(['h2', 'h3', 'strong']):
+        text = header.get_text(strip=True).lower()
+        if "pros" in text:
+            ul = header.find_next_sibling('ul')
+            if ul:
+                pros.extend([li.get_text(strip=True) for li in ul.find_all('li')])
+        if "cons" in text:
+            ul = header.find_next_sibling('ul')
+            if ul:
+                cons.extend([li.get_text(strip=True) for li in ul.find_all('li')])
+
+    # extract_structured_content parsed the page a second time
+    soup = BeautifulSoup(html, "html.parser")
+    linked_images = [urljoin(base_url, img['src']) for img in soup.find_all("img", src=True)]
+
+    # PDF.add_table re-parsed every table string
+    table_rows = []
+    for table_html in tables:
+        rows = BeautifulSoup(table_html, "html.parser").find_all("tr")
+        table_rows.append([[col.get_text(strip=True) for col in row.find_all(["td", "th"])] for row in rows])
+
+    return {
+        "text": main_text,
+        "image_urls": image_urls,
+        "linked_images": linked_images,
+        "tables": tables,
+        "table_rows": table_rows,
+        "pros": pros,
+        "cons": cons,
+    }
+
+
+# -------------------- Synthetic page --------------------
+def synthetic_page(sections=40):
+    parts = ["<html><head><title>Review</title><style>p{color:red}</style></head><body>"]
+    for i in range(sections):
+        parts.append(f"<h2>Section {i}</h2>")
+        parts.append(
+            f"<p class='lead  text'>Paragraph {i} &amp; friends: the quick brown fox jumps over the lazy dog "
+            f"<a href='/l/{i}'>link</a> <!-- note --> and keeps running&nbsp;far away.</p>"
+        )
+        parts.append("<p>Short one.</p>")
+        parts.append(f"<img src='/img/{i}.jpg' alt='x'><img data-src='//cdn.example.com/{i}.png'>")
+        if i % 5 == 0:
+            parts.append(
+                f"<table class=\"specs\"><tr><th>Spec</th><th>Value</th></tr>"
+                f"<tr><td>Battery</td><td>{i}000 mAh<br>fast</td></tr>"
+                f"<tr><td title='a \"b\"'>Weight</td><td>{i} g</td></tr></table>"
+            )
+        if i % 7 == 0:
+            parts.append("<h3>Pros</h3><ul><li>Fast</li><li>Cheap <b>really</b></li></ul>")
+            parts.append("<strong>Cons</strong><p>between</p><ul><li>Heavy</li></ul>")
+        if i % 10 == 0:
+            parts.append("<svg width='10' height='10'><rect width='5' height='5'/></svg><canvas></canvas>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def bench(fn, html, base_url, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(html, base_url)
+    return (time.perf_counter() - start) / repeat
+
+
+def main(paths, repeat=20):
+    pages = [(path, open(path, encoding="utf-8", errors="replace").read()) for path in paths]
+    if not pages:
+        pages = [("synthetic", synthetic_page())]
+
+    base_url = "https://example.com/reviews/page.html"
+    failures = 0
+    for name, html in pages:
+        new = extract_document(html, base_url)
+        new.pop("charts")
+        old = legacy_extract(html, base_url)
+        mismatched = [key for key in old if old[key] != new[key]]
+        if mismatched:
+            failures += 1
+            print(f"[❌] {name}: output differs in {mismatched}")
+
+        legacy_time = bench(legacy_extract, html, base_url, repeat)
+        single_time = bench(extract_document, html, base_url, repeat)
+        print(f"[+] {name} ({len(html) // 1024} KB): legacy {legacy_time * 1000:.2f} ms, "
+              f"single-pass {single_time * 1000:.2f} ms, speedup x{legacy_time / single_time:.1f}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,99 @@
+"""
+Memory benchmark for long PDF reports: peak RSS should not grow with the
+number of report entries.
+
+    python -m benchmarks.pdf_memory [--sizes 200,800,3200] [--section-size 50] [--workers 1]
+                                    [--max-growth 0.25]
+
+Every size is rendered by render_pdf in a fresh interpreter and an empty
+working directory, from generated entries that each embed one of a few
+fixture images, a table and pros/cons. Reported per size: wall time, output
+size, pages and peak RSS of the rendering process (and of its section
+workers with --workers > 1). The exit status is 1 when the peak RSS of the
+largest report exceeds that of the smallest by more than --max-growth.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = """
+import json, os, resource, sys, time
+sys.path.insert(0, {root!r})
+from PIL import Image
+from file_system_handler import render_pdf
+
+images = []
+for i in range(4):
+    path = f"img_{{i}}.png"
+    Image.effect_noise((1200, 900), 40 + i * 10).convert("RGB").save(path)
+    images.append(path)
+
+def entries(n):
+    for i in range(n):
+        yield {{"url": f"https://reviews.fixtures.test/articles/{{i}}.html",
+                "summary": f"Summary of article {{i}}. " + "The reviewed product holds up well. " * 12,
+                "images": [images[i % len(images)]], "pros": ["battery", "screen"], "cons": ["price"],
+                "table_rows": [["Spec", "Value"], ["Weight", f"{{i}} g"]]}}
+
+if __name__ == "__main__":
+    n, section_size, workers = {n}, {section_size}, {workers}
+    start = time.perf_counter()
+    render_pdf(entries(n), {{"https://reviews.fixtures.test/articles/0.html": ["battery"]}}, "report.pdf",
+               section_size, workers)
+    seconds = time.perf_counter() - start
+    from pypdf import PdfReader
+    pages = len(PdfReader("report.pdf").pages)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    rss = lambda who: resource.getrusage(who).ru_maxrss * scale / 2 ** 20
+    print(json.dumps({{"seconds": seconds, "pages": pages, "bytes": os.path.getsize("report.pdf"),
+                      "rss_mb": rss(resource.RUSAGE_SELF), "workers_rss_mb": rss(resource.RUSAGE_CHILDREN)}}))
+"""
+
+
+def measure(n, section_size, workers):
+    code = WORKER.format(root=REPO_ROOT, n=n, section_size=section_size, workers=workers)
+    with tempfile.TemporaryDirectory(prefix="bench_pdf_") as workdir:
+        script = os.path.join(workdir, "render.py")
+        with open(script, "w", encoding="utf-8") as f:
+            f.write(code)
+        out = subprocess.run([sys.executable, script], cwd=workdir, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"rendering {n} entries failed:\n{out.stderr.strip()[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="200,800,3200", help="comma-separated report entry counts")
+    parser.add_argument("--section-size", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="section rendering processes (0: one per core)")
+    parser.add_argument("--max-growth", type=float, default=0.25,
+                        help="allowed peak RSS growth from the smallest to the largest report")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    print(f"{'entries':>8} {'pages':>6} {'MB out':>7} {'seconds':>8} {'RSS MB':>7} {'workers MB':>10}")
+    results = []
+    for n in sizes:
+        result = measure(n, args.section_size, args.workers)
+        results.append(result)
+        print(f"{n:>8} {result['pages']:>6} {result['bytes'] / 2 ** 20:>7.1f} {result['seconds']:>8.1f} "
+              f"{result['rss_mb']:>7.1f} {result['workers_rss_mb']:>10.1f}")
+
+    growth = results[-1]["rss_mb"] / results[0]["rss_mb"] - 1
+    if growth > args.max_growth:
+        print(f"[❌] Peak RSS grew {growth:.0%} from {sizes[0]} to {sizes[-1]} entries")
+        return 1
+    print(f"[✓] Peak RSS flat: {growth:+.0%} from {sizes[0]} to {sizes[-1]} entries")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
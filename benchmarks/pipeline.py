@@ -0,0 +1,294 @@
+"""
+End-to-end benchmark: every pipeline stage against a local fixture site.
+
+    python -m benchmarks.pipeline [--articles 40] [--runs 3] [--output pipeline_bench.json]
+                                  [--baseline old.json] [--max-regression 0.25]
+
+A FixtureServer (benchmarks/fixture_site.py) serves a Bing-style search page
+and generated articles with images and tables; the models are replaced by
+the stand-ins in benchmarks/stand_ins.py. Each stage runs --runs times, every
+time in a fresh interpreter and an empty working directory, so HTTP, image
+and result caches start cold. One extra run per stage with tracemalloc
+records peak Python memory.
+
+Results (throughput, latency percentiles, peak memory) are written as JSON.
+With --baseline the p50 latencies are compared against an earlier result and
+the exit status is 1 when any stage got slower than --max-regression.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fixture_site import FixtureServer
+
+STAGES = ["search", "crawl", "scrape", "summarize", "keywords", "pdf", "pipeline"]
+QUERY = "benchmark review"
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# -------------------- Worker side (one stage, one cold process) --------------------
+class Recorder:
+    def __init__(self):
+        self.samples = []
+        self.items = 0
+
+    def time(self, fn, *args, items=1):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.samples.append(time.perf_counter() - start)
+        self.items += items
+        return result
+
+
+def _article_urls(site, articles):
+    return [f"{site}/articles/{i}.html" for i in range(articles)]
+
+
+def _fetch_pages(urls):
+    import requests
+    return [(url, requests.get(url, timeout=10).text) for url in urls]
+
+
+def _texts(urls):
+    from html_extract import extract_document
+    return [extract_document(html, url, main_content=True)["text"] for url, html in _fetch_pages(urls)]
+
+
+def _write_summaries(urls, path="final_summary.json"):
+    from async_runtime import run_sync
+    from crawl_engine import get_crawl_engine
+    from summarizer import summarize_batch
+
+    items = run_sync(get_crawl_engine().crawl_all(urls))
+    summaries = summarize_batch([item["text"] for item in items])
+    entries = [
+        {"url": item["url"], "summary": summary, "images": item.get("images", []),
+         "pros": item.get("pros", []), "cons": item.get("cons", []),
+         "table_rows": item.get("table_rows", [])}
+        for item, summary in zip(items, summaries)
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2)
+    return path
+
+
+def _search(site, articles):
+    from Browser_automation import get_top_search_urls
+    from async_runtime import run_sync
+    # Uncached: every call has to drive the browser
+    return run_sync(get_top_search_urls(QUERY, articles, search_url=f"{site}/", use_cache=False))
+
+
+def run_stage(stage, site, articles, recorder):
+    urls = _article_urls(site, articles)
+
+    if stage == "search":
+        try:
+            import playwright  # noqa: F401
+        except ImportError:
+            return "playwright is not installed"
+        _search(site, articles)  # browser launch is not part of a search
+        for _ in range(5):
+            recorder.time(_search, site, articles)
+
+    elif stage == "crawl":
+        from async_runtime import run_sync
+        from crawl_engine import get_crawl_engine
+        recorder.time(lambda: run_sync(get_crawl_engine().crawl_all(urls)), items=len(urls))
+
+    elif stage == "scrape":
+        from content_scraper import scrape_content
+        for url, html in _fetch_pages(urls):
+            recorder.time(scrape_content, html, url)
+
+    elif stage == "summarize":
+        from summarizer import summarize_text
+        for text in _texts(urls):
+            recorder.time(summarize_text, text)
+
+    elif stage == "keywords":
+        from keyword_extractor import extract_keywords
+        summary_file = _write_summaries(urls)
+        recorder.time(extract_keywords, summary_file, "keywords.json", items=len(urls))
+
+    elif stage == "pdf":
+        from file_system_handler import generate_pdf
+        from keyword_extractor import extract_keywords
+        summary_file = _write_summaries(urls)
+        keyword_file = extract_keywords(summary_file, "keywords.json")
+        recorder.time(generate_pdf, summary_file, keyword_file, "final_report.pdf", items=len(urls))
+
+    elif stage == "pipeline":
+        from async_runtime import run_sync
+        from file_system_handler import generate_pdf
+        from streaming_pipeline import JsonFileSink, StreamingPipeline
+
+        def full_run():
+            try:
+                found = _search(site, articles)
+            except ImportError:
+                found = urls  # no browser: start from the result links
+            sink = JsonFileSink()
+            pipeline = StreamingPipeline(["scrape", "summarize", "extract_keywords"], sinks=[sink])
+            run_sync(pipeline.run(found))
+            generate_pdf(sink.path("summarize"), sink.path("extract_keywords"), "final_report.pdf",
+                         duplicates_file=sink.path("duplicates"))
+
+        recorder.time(full_run, items=len(urls))
+
+    else:
+        raise ValueError(f"Unknown stage '{stage}'")
+    return None
+
+
+def worker(stage, site, articles, trace_memory):
+    from benchmarks import stand_ins
+    stand_ins.install()
+
+    if trace_memory:
+        import tracemalloc
+        tracemalloc.start()
+    recorder = Recorder()
+    skipped = run_stage(stage, site, articles, recorder)
+
+    result = {"samples": recorder.samples, "items": recorder.items}
+    if skipped:
+        result = {"skipped": skipped}
+    if trace_memory and not skipped:
+        result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        result["max_rss_mb"] = rss / 2 ** 20 if sys.platform == "darwin" else rss / 2 ** 10
+    except ImportError:
+        pass
+    print(json.dumps(result))
+
+
+# -------------------- Orchestrator --------------------
+def _spawn(stage, site, articles, trace_memory=False):
+    cmd = [sys.executable, "-m", "benchmarks.pipeline", "--worker", stage,
+           "--site", site, "--articles", str(articles)]
+    if trace_memory:
+        cmd.append("--trace-memory")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])))
+    with tempfile.TemporaryDirectory(prefix=f"bench_{stage}_") as workdir:
+        out = subprocess.run(cmd, cwd=workdir, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"stage '{stage}' failed:\n{out.stderr.strip()[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    pos = (len(sorted_values) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+
+def summarize_runs(runs, memory_run):
+    samples = sorted(s for run in runs for s in run["samples"])
+    items = sum(run["items"] for run in runs)
+    total = sum(samples)
+    return {
+        "runs": len(runs),
+        "samples": len(samples),
+        "items": items,
+        "seconds": total,
+        "throughput_per_s": items / total if total else None,
+        "latency_ms": {
+            name: percentile(samples, q) * 1000
+            for name, q in (("p50", 0.5), ("p90", 0.9), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))
+        },
+        "peak_mb": memory_run.get("peak_mb") if memory_run else None,
+        "max_rss_mb": max((run.get("max_rss_mb") or 0 for run in runs), default=None),
+    }
+
+
+def compare(results, baseline, max_regression):
+    """Print p50/throughput changes against `baseline`; return the regressed stages."""
+    regressed = []
+    print("\n[+] Compared with baseline:")
+    for stage, current in results["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if not before or "skipped" in before or "skipped" in current:
+            continue
+        old, new = before["latency_ms"]["p50"], current["latency_ms"]["p50"]
+        change = (new - old) / old if old else 0.0
+        flag = ""
+        if max_regression is not None and change > max_regression:
+            regressed.append(stage)
+            flag = "  [❌]"
+        print(f"    {stage:<10} p50 {old:9.1f} -> {new:9.1f} ms ({change:+.1%}){flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articles", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated subset of " + ",".join(STAGES))
+    parser.add_argument("--output", default="pipeline_bench.json")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="fail when a stage's p50 latency grows by more than this fraction")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--site", help=argparse.SUPPRESS)
+    parser.add_argument("--trace-memory", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.site, args.articles, args.trace_memory)
+        return 0
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "articles": args.articles,
+            "runs": args.runs,
+        },
+        "stages": {},
+    }
+
+    with FixtureServer(articles=args.articles) as site:
+        base = site.url("")
+        for stage in stages:
+            print(f"[+] Benchmarking {stage} ({args.runs} runs)...")
+            runs = [_spawn(stage, base, args.articles) for _ in range(args.runs)]
+            if "skipped" in runs[0]:
+                print(f"[⚠️] Skipped {stage}: {runs[0]['skipped']}")
+                results["stages"][stage] = runs[0]
+                continue
+            memory_run = None if args.no_memory else _spawn(stage, base, args.articles, trace_memory=True)
+            summary = summarize_runs(runs, memory_run)
+            results["stages"][stage] = summary
+            peak = f", peak {summary['peak_mb']:.1f} MB" if summary["peak_mb"] is not None else ""
+            print(f"    p50 {summary['latency_ms']['p50']:.1f} ms, p95 {summary['latency_ms']['p95']:.1f} ms, "
+                  f"{summary['throughput_per_s']:.1f} items/s{peak}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"[✓] Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressed = compare(results, json.load(f), args.max_regression)
+        if regressed:
+            print(f"[❌] Slower than baseline: {', '.join(regressed)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
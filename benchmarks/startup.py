@@ -0,0 +1,59 @@
+"""
+Startup benchmark: how long it takes before main.py can show its prompt.
+
+    python -m benchmarks.startup [--runs 5] [--max-seconds 2.0]
+
+Imports the REPL's entry modules in fresh interpreters, reports the median
+import time, and fails when it exceeds --max-seconds or when a heavy module
+(models, browser, crawler) gets imported eagerly again.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+ENTRY_MODULES = ["task_handler"]
+HEAVY_MODULES = ["torch", "transformers", "keybert", "sentence_transformers", "playwright", "scrapy", "twisted"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_once():
+    code = PROBE.format(modules=ENTRY_MODULES, heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    results = [measure_once() for _ in range(args.runs)]
+    median = statistics.median(r["seconds"] for r in results)
+    heavy = sorted({m for r in results for m in r["heavy"]})
+
+    print(f"[+] Import of {', '.join(ENTRY_MODULES)}: median {median * 1000:.1f} ms over {args.runs} runs")
+    failed = False
+    if heavy:
+        print(f"[❌] Heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    if median > args.max_seconds:
+        print(f"[❌] Startup slower than {args.max_seconds:.2f}s budget")
+        failed = True
+    if not failed:
+        print("[✓] Startup within budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Accuracy-vs-speed benchmark for the summarizer's inference backends.
+
+    python -m benchmarks.summarizer_backends [--backends eager,int8,onnx,onnx-int8] [--threads 1,4]
+                                             [--generated 8] [--reference reference.json]
+                                             [--output summarizer_backends.json]
+
+The corpus is fixed and local: the main-content text of the saved pages in
+benchmarks/fixtures/main_content plus --generated fixture articles. The
+reference is the current output, i.e. the eager fp32 backend at the default
+thread count; pass --reference to compute it once and reuse it afterwards.
+
+Every backend/thread combination runs in a fresh interpreter, loads the real
+model (transformers, plus optimum for the ONNX backends), summarizes one
+warm-up document and then every corpus document with the result cache off.
+Reported per combination: load time, per-document latency, throughput, and
+ROUGE-1/2/L F1 against the reference summaries.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.fixture_site import make_article
+from benchmarks.pipeline import REPO_ROOT, percentile
+
+FIXTURE_DIR = os.path.join(REPO_ROOT, "benchmarks", "fixtures", "main_content")
+BACKENDS = ["eager", "int8", "onnx", "onnx-int8"]
+
+
+def load_corpus(generated):
+    from html_extract import extract_document
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            pages.append((f"https://fixtures.test/{os.path.basename(path)}", f.read()))
+    pages += [(f"https://reviews.fixtures.test/articles/{i}.html", make_article(i)) for i in range(generated)]
+    return [extract_document(html, url, main_content=True)["text"] for url, html in pages]
+
+
+# -------------------- ROUGE --------------------
+def _tokens(text):
+    return re.findall(r"\w+", text.lower())
+
+
+def _f1(overlap, predicted, reference):
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / predicted, overlap / reference
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_n(reference, candidate, n):
+    ngrams = lambda words: Counter(tuple(words[i:i + n]) for i in range(len(words) - n + 1))
+    ref, cand = ngrams(_tokens(reference)), ngrams(_tokens(candidate))
+    return _f1(sum((ref & cand).values()), sum(cand.values()), sum(ref.values()))
+
+
+def rouge_l(reference, candidate):
+    ref, cand = _tokens(reference), _tokens(candidate)
+    if not ref or not cand:
+        return 0.0
+    # Longest common subsequence, one row at a time
+    previous = [0] * (len(cand) + 1)
+    for word in ref:
+        current = [0]
+        for j, other in enumerate(cand):
+            current.append(previous[j] + 1 if word == other else max(previous[j + 1], current[j]))
+        previous = current
+    return _f1(previous[-1], len(cand), len(ref))
+
+
+def rouge(references, candidates):
+    scores = {"rouge1": [], "rouge2": [], "rougeL": []}
+    for ref, cand in zip(references, candidates):
+        scores["rouge1"].append(rouge_n(ref, cand, 1))
+        scores["rouge2"].append(rouge_n(ref, cand, 2))
+        scores["rougeL"].append(rouge_l(ref, cand))
+    return {name: sum(values) / len(values) for name, values in scores.items() if values}
+
+
+# -------------------- Worker side --------------------
+def worker(backend, threads, generated):
+    try:
+        import transformers  # noqa: F401
+    except ImportError:
+        print(json.dumps({"skipped": "transformers is not installed"}))
+        return
+    if backend.startswith("onnx"):
+        try:
+            import optimum.onnxruntime  # noqa: F401
+        except ImportError:
+            print(json.dumps({"skipped": "optimum[onnxruntime] is not installed"}))
+            return
+
+    from inference_backends import configure
+    configure(summarizer=backend, threads=threads or None)
+    from model_registry import get_model
+    from summarizer import summarize_batch
+
+    corpus = load_corpus(generated)
+    start = time.perf_counter()
+    get_model("summarizer")
+    load_seconds = time.perf_counter() - start
+    summarize_batch(corpus[:1], use_cache=False)  # first call pays for lazy initialisation
+
+    summaries, samples = [], []
+    for text in corpus:
+        start = time.perf_counter()
+        summaries.extend(summarize_batch([text], use_cache=False))
+        samples.append(time.perf_counter() - start)
+    print(json.dumps({"load_seconds": load_seconds, "samples": samples, "summaries": summaries}))
+
+
+# -------------------- Orchestrator --------------------
+def _spawn(backend, threads, generated):
+    cmd = [sys.executable, "-m", "benchmarks.summarizer_backends", "--worker", backend,
+           "--worker-threads", str(threads or 0), "--generated", str(generated)]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])))
+    # Exported graphs are kept in the repo's .onnx_models so they are built once
+    env["AGENT_ONNX_DIR"] = os.path.join(REPO_ROOT, ".onnx_models")
+    with tempfile.TemporaryDirectory(prefix=f"bench_{backend}_") as workdir:
+        out = subprocess.run(cmd, cwd=workdir, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"backend '{backend}' failed:\n{out.stderr.strip()[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", default=",".join(BACKENDS),
+                        help="comma-separated subset of " + ",".join(BACKENDS))
+    parser.add_argument("--threads", default="0", help="comma-separated thread counts (0: library default)")
+    parser.add_argument("--generated", type=int, default=8, help="generated fixture articles in the corpus")
+    parser.add_argument("--reference", help="reference summaries file: read if it exists, written otherwise")
+    parser.add_argument("--output", default="summarizer_backends.json")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-threads", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.worker_threads, args.generated)
+        return 0
+
+    if args.reference and os.path.exists(args.reference):
+        with open(args.reference, "r", encoding="utf-8") as f:
+            reference = json.load(f)
+    else:
+        print("[+] Computing reference summaries (eager fp32)...")
+        run = _spawn("eager", 0, args.generated)
+        if "skipped" in run:
+            print(f"[⚠️] Cannot compute the reference: {run['skipped']}")
+            return 1
+        reference = run["summaries"]
+        if args.reference:
+            with open(args.reference, "w", encoding="utf-8") as f:
+                json.dump(reference, f, indent=2)
+
+    results = {"meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "documents": len(reference)},
+               "runs": []}
+    print(f"{'backend':<10} {'threads':>7} {'load s':>7} {'p50 ms':>8} {'docs/s':>7} "
+          f"{'R-1':>6} {'R-2':>6} {'R-L':>6}")
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        for threads in [int(t) for t in args.threads.split(",") if t.strip()]:
+            run = _spawn(backend, threads, args.generated)
+            entry = {"backend": backend, "threads": threads or None}
+            if "skipped" in run:
+                print(f"{backend:<10} {threads or '-':>7}  skipped: {run['skipped']}")
+                results["runs"].append({**entry, "skipped": run["skipped"]})
+                continue
+            samples = sorted(run["samples"])
+            entry.update({
+                "load_seconds": run["load_seconds"],
+                "latency_ms": {"p50": percentile(samples, 0.5) * 1000, "p95": percentile(samples, 0.95) * 1000},
+                "docs_per_s": len(samples) / sum(samples),
+                **rouge(reference, run["summaries"]),
+            })
+            results["runs"].append(entry)
+            print(f"{backend:<10} {threads or '-':>7} {entry['load_seconds']:>7.1f} "
+                  f"{entry['latency_ms']['p50']:>8.0f} {entry['docs_per_s']:>7.2f} "
+                  f"{entry['rouge1']:>6.3f} {entry['rouge2']:>6.3f} {entry['rougeL']:>6.3f}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"[✓] Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
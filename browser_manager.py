@@ -0,0 +1,146 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+from async_runtime import on_shutdown
+from instrumentation import span
+
+
+class _PageSlot:
+    def __init__(self, context, page, generation):
+        self.context = context
+        self.page = page
+        self.generation = generation
+        self.uses = 0
+        self.broken = False
+
+
+class BrowserManager:
+    """
+    Keeps one Chromium process alive and hands out warm context/page pairs.
+
+    Up to `pool_size` pages can be checked out at once, so that many searches
+    run in parallel tabs. A page is recycled after `max_uses` checkouts or as
+    soon as it (or the browser) crashes; a dead browser is relaunched on the
+    next checkout.
+    """
+
+    def __init__(self, pool_size=3, max_uses=20, headless=True):
+        self.pool_size = pool_size
+        self.max_uses = max_uses
+        self.headless = headless
+        self._reset()
+
+    def _reset(self):
+        self._loop = None
+        self._playwright = None
+        self._browser = None
+        self._generation = 0
+        self._idle = []
+        self._start_lock = None
+        self._slots = None
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Objects from a previous (now finished) loop cannot be reused.
+            self._reset()
+            self._loop = loop
+            self._start_lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.pool_size)
+
+    async def _ensure_browser(self):
+        async with self._start_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            print("[+] Launching Chromium...")
+            with span("browser.launch"):
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+            self._generation += 1
+            await self._drop_idle()
+            return self._browser
+
+    async def _drop_idle(self):
+        idle, self._idle = self._idle, []
+        for slot in idle:
+            await self._close_slot(slot)
+
+    async def _close_slot(self, slot):
+        try:
+            await slot.context.close()
+        except Exception:
+            pass  # Context already gone with a crashed browser
+
+    async def _acquire(self):
+        self._bind_loop()
+        await self._slots.acquire()
+        try:
+            browser = await self._ensure_browser()
+            while self._idle:
+                slot = self._idle.pop()
+                if slot.generation == self._generation and not slot.page.is_closed():
+                    return slot
+                await self._close_slot(slot)
+            context = await browser.new_context()
+            page = await context.new_page()
+            return _PageSlot(context, page, self._generation)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def _release(self, slot):
+        try:
+            slot.uses += 1
+            stale = (
+                slot.broken
+                or slot.uses >= self.max_uses
+                or slot.generation != self._generation
+                or slot.page.is_closed()
+            )
+            if stale:
+                await self._close_slot(slot)
+            else:
+                self._idle.append(slot)
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def page(self):
+        """Check out a warm page; it goes back to the pool when the block exits."""
+        slot = await self._acquire()
+        try:
+            yield slot.page
+        except BaseException:
+            slot.broken = True
+            raise
+        finally:
+            await self._release(slot)
+
+    async def close(self):
+        if self._loop is not asyncio.get_running_loop():
+            self._reset()
+            return
+        await self._drop_idle()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._reset()
+
+
+_manager = None
+
+
+def get_browser_manager(**kwargs):
+    """Return the process-wide BrowserManager, creating it on first use."""
+    global _manager
+    if _manager is None:
+        _manager = BrowserManager(**kwargs)
+        on_shutdown(_manager.close)
+    return _manager
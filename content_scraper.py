@@ -1,111 +1,144 @@
-from bs4 import BeautifulSoup
-import re
+import contextvars
 import os
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
 import requests
-
-def download_image(img_url, base_url, save_dir="images"):
+from requests.adapters import HTTPAdapter
+from http_cache import get_response_cache, ResponseTooLarge
+from html_extract import extract_document, IMAGE_EXTENSIONS
+from instrumentation import count
+
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+# "main": only the article body goes to the summarizer; "all": every <p> over 50 chars
+CONTENT_MODE = os.environ.get("AGENT_CONTENT_MODE", "main")
+
+def resolve_image_url(img_url, base_url):
+    if img_url.startswith("//"):
+        return "https:" + img_url
+    return urljoin(base_url, img_url)
+
+def image_path_for(img_url, save_dir="images"):
+    img_ext = os.path.splitext(img_url)[-1]
+    if not img_ext or len(img_ext) > 5:
+        img_ext = ".jpg"
+    return os.path.join(save_dir, hashlib.md5(img_url.encode()).hexdigest() + img_ext)
+
+def download_image(img_url, base_url, save_dir="images", session=None, max_bytes=MAX_IMAGE_BYTES):
     try:
-        if not os.path.exists(save_dir):
-            os.makedirs(save_dir)
-        
-        if img_url.startswith("//"):
-            img_url = "https:" + img_url
-        elif img_url.startswith("/"):
-            from urllib.parse import urljoin
-            img_url = urljoin(base_url, img_url)
-
-        img_ext = os.path.splitext(img_url)[-1]
-        if not img_ext or len(img_ext) > 5:
-            img_ext = ".jpg"
-
-        img_name = hashlib.md5(img_url.encode()).hexdigest() + img_ext
-        img_path = os.path.join(save_dir, img_name)
-
-        response = requests.get(img_url, timeout=5)
+        os.makedirs(save_dir, exist_ok=True)
+        img_url = resolve_image_url(img_url, base_url)
+        img_path = image_path_for(img_url, save_dir)
+
+        # Same URL -> same md5 name, so an existing file is already the image
+        if os.path.exists(img_path):
+            return img_path
+
+        response = get_response_cache().get(img_url, session=session, timeout=5, max_bytes=max_bytes)
         if response.status_code == 200:
-            with open(img_path, "wb") as f:
-                f.write(response.content)
+            tmp_path = f"{img_path}.{threading.get_ident()}.part"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(response.content)
+                os.replace(tmp_path, img_path)
+            finally:
+                # A failed write must not leave a partial file behind
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            count("images_downloaded")
+            count("image_bytes", len(response.content))
             return img_path
+    except ResponseTooLarge as e:
+        print(f"[⚠️] Skipping oversized image {e}")
     except Exception as e:
         print(f"[⚠️] Failed to download {img_url}: {e}")
     return None
 
-def extract_pros_cons(soup):
-    pros, cons = [], []
-    for header in soup.find_all(['h2', 'h3', 'strong']):
-        text = header.get_text(strip=True).lower()
-        if "pros" in text:
-            ul = header.find_next_sibling('ul')
-            if ul:
-                pros.extend([li.get_text(strip=True) for li in ul.find_all('li')])
-        if "cons" in text:
-            ul = header.find_next_sibling('ul')
-            if ul:
-                cons.extend([li.get_text(strip=True) for li in ul.find_all('li')])
-    return pros, cons
-
-def scrape_content(html, base_url):
-    soup = BeautifulSoup(html, "html.parser")
-
-    # Extract main readable text
-    paragraphs = soup.find_all("p")
-    main_text = "\n".join([p.get_text(strip=True) for p in paragraphs if len(p.get_text()) > 50])
-
-    # Extract and download images
-    images = []
-    for img in soup.find_all("img"):
-        img_url = img.get("src") or img.get("data-src")
-        if img_url and any(ext in img_url for ext in [".jpg", ".jpeg", ".png", ".webp"]):
-            img_path = download_image(img_url, base_url)
-            if img_path:
-                images.append(img_path)
-
-    # Extract tables
-    tables = []
-    for table in soup.find_all("table"):
-        tables.append(str(table))
-
-    # Detect chart-type elements
-    svg_charts = soup.find_all("svg")
-    canvas_charts = soup.find_all("canvas")
-    if svg_charts or canvas_charts:
-        chart_note = f"[Charts Detected: {len(svg_charts)} SVG, {len(canvas_charts)} Canvas]"
-        main_text += f"\n\n{chart_note}"
-
-    # Pros/Cons
-    pros, cons = extract_pros_cons(soup)
-
-    return {
-        "text": main_text,
-        "images": images,
-        "tables": tables,
-        "pros": pros,
-        "cons": cons
+class ImageFetcher:
+    """
+    Downloads images on a bounded thread pool over one shared session.
+
+    Requests for a URL that is already being downloaded share the same future,
+    so a logo that appears on every page is fetched once.
+    """
+
+    def __init__(self, max_workers=8, save_dir="images", max_bytes=MAX_IMAGE_BYTES):
+        self.save_dir = save_dir
+        self.max_bytes = max_bytes
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-fetch")
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, img_url, base_url):
+        key = resolve_image_url(img_url, base_url)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            # In the caller's context: counters and log lines belong to its trace and job
+            future = self.executor.submit(
+                contextvars.copy_context().run,
+                download_image, img_url, base_url, self.save_dir, self.session, self.max_bytes
+            )
+            self._inflight[key] = future
+        # Outside the lock: the callback runs right here if the download already finished
+        future.add_done_callback(lambda _: self._forget(key))
+        return future
+
+    def _forget(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def fetch_all(self, img_urls, base_url):
+        futures = [self.submit(url, base_url) for url in img_urls]
+        return [path for path in (f.result() for f in futures) if path]
+
+_image_fetcher = None
+_image_fetcher_lock = threading.Lock()
+
+def get_image_fetcher():
+    global _image_fetcher
+    with _image_fetcher_lock:
+        if _image_fetcher is None:
+            _image_fetcher = ImageFetcher()
+    return _image_fetcher
+
+def collect_images(entry):
+    """Wait for images queued by scrape_content(..., wait_for_images=False)."""
+    pending = entry.pop("pending_images", None)
+    if pending:
+        entry["images"] = [path for path in (f.result() for f in pending) if path]
+    return entry
+
+def scrape_content(html, base_url, wait_for_images=True, content_mode=None):
+    # Text, images, tables, charts and pros/cons all come from one parse
+    doc = extract_document(html, base_url, main_content=(content_mode or CONTENT_MODE) == "main")
+
+    # Queue image downloads; they run concurrently with the rest of the pipeline
+    fetcher = get_image_fetcher()
+    pending_images = [fetcher.submit(img_url, base_url) for img_url in doc["image_urls"]]
+
+    entry = {
+        "text": doc["text"],
+        "images": [],
+        "tables": doc["tables"],
+        "table_rows": doc["table_rows"],
+        "pros": doc["pros"],
+        "cons": doc["cons"]
     }
+    if pending_images:
+        entry["pending_images"] = pending_images
+    return collect_images(entry) if wait_for_images else entry
 
 
-# content_scraper.py
-
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
-import re
-
 def extract_structured_content(html, base_url):
-    soup = BeautifulSoup(html, "html.parser")
-
-    # Extract images
-    images = []
-    for img in soup.find_all("img", src=True):
-        img_url = urljoin(base_url, img['src'])
-        images.append(img_url)
-
-    # Extract tables (HTML only, no visual charts unless embedded)
-    tables = []
-    for table in soup.find_all("table"):
-        tables.append(str(table))
-
+    doc = extract_document(html, base_url)
     return {
-        "images": images,
-        "tables": tables
+        "images": doc["linked_images"],
+        "tables": doc["tables"]
     }
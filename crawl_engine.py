@@ -0,0 +1,123 @@
+import asyncio
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from scrapy.http import HtmlResponse
+
+from async_runtime import on_shutdown
+from http_cache import get_response_cache
+from instrumentation import span, count
+from search_spider import SearchSpider
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+
+class CrawlEngine:
+    """
+    Reusable asyncio crawler that can be invoked any number of times per process.
+
+    Pages are fetched over one keep-alive `requests.Session` (run in worker
+    threads), with a global concurrency limit and a per-host limit. Extraction
+    still goes through `SearchSpider.parse`, so items look exactly like the
+    ones the Scrapy feed used to produce.
+    """
+
+    def __init__(self, concurrency=8, per_host=2, timeout=15):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._loop = None
+        self._global_slots = None
+        self._host_slots = {}
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._global_slots = asyncio.Semaphore(self.concurrency)
+            self._host_slots = {}
+
+    def _host_slot(self, url):
+        host = urlparse(url).netloc
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        return self._host_slots[host]
+
+    def _fetch(self, url):
+        response = get_response_cache().get(url, session=self.session, timeout=self.timeout)
+        content_type = response.headers.get("Content-Type", "")
+        if response.status_code != 200:
+            print(f"[⚠️] Skipping {url}: HTTP {response.status_code}")
+            return None
+        if content_type and "html" not in content_type:
+            print(f"[⚠️] Skipping {url}: not an HTML page ({content_type})")
+            return None
+        count("pages_fetched")
+        count("bytes_fetched", len(response.content))
+        return HtmlResponse(
+            url=response.url,
+            status=response.status_code,
+            headers={"Content-Type": content_type or "text/html"},
+            body=response.content,
+        )
+
+    async def _crawl_one(self, url, spider):
+        try:
+            async with self._global_slots, self._host_slot(url):
+                with span("crawl.fetch", url=url):
+                    response = await asyncio.to_thread(self._fetch, url)
+            if response is None:
+                return []
+            with span("crawl.extract", url=url):
+                items = await asyncio.to_thread(lambda: list(spider.parse(response)))
+            # Image downloads finish on the image pool without holding a crawl slot
+            for item in items:
+                pending = item.pop("pending_images", None)
+                if pending:
+                    with span("crawl.images", url=url, images=len(pending)):
+                        paths = await asyncio.gather(*(asyncio.wrap_future(f) for f in pending))
+                    item["images"] = [path for path in paths if path]
+            return items
+        except Exception as e:
+            print(f"[❌] Failed to crawl {url}: {e}")
+            return []
+
+    async def crawl(self, urls):
+        """Async generator yielding scraped items as each page finishes."""
+        self._bind_loop()
+        spider = SearchSpider(urls=urls, wait_for_images=False)
+        tasks = [asyncio.create_task(self._crawl_one(url, spider)) for url in dict.fromkeys(urls)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                for item in await next_done:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def crawl_all(self, urls):
+        return [item async for item in self.crawl(urls)]
+
+    async def close(self):
+        self.session.close()
+
+
+_engine = None
+
+
+def get_crawl_engine(**kwargs):
+    """Return the process-wide CrawlEngine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        _engine = CrawlEngine(**kwargs)
+        on_shutdown(_engine.close)
+    return _engine
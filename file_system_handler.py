@@ -1,17 +1,42 @@
 from fpdf import FPDF
 import json
+import multiprocessing
 import os
-from bs4 import BeautifulSoup
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain, islice
+from html_extract import table_rows_from_html
+from image_prep import ImagePreparer, RENDER_WIDTH_MM
+from instrumentation import span, count
+from json_sinks import iter_entries
 import unicodedata
-import re
+
+try:
+    from pypdf import PdfReader
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject
+except ImportError:  # pypdf is in requirements.txt; without it the report is one in-memory document
+    PdfReader = None
+
+# Processes rendering the sections of a long report (AGENT_PDF_WORKERS, main.py
+# --pdf-workers); unset or 0 means one per CPU core, up to DEFAULT_PDF_WORKERS
+PDF_WORKERS_ENV = "AGENT_PDF_WORKERS"
+DEFAULT_PDF_WORKERS = 4
+MAX_IMAGES_PER_ENTRY = 3
+
+@lru_cache(maxsize=8192)
+def _sanitize_short(text):
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
 
 def sanitize_text(text):
     """Remove non-latin1 characters, emojis, and weird quotes from text."""
     if not text: return ""
-    text = unicodedata.normalize("NFKD", text)
-    text = text.encode("latin-1", "ignore").decode("latin-1")
-    text = re.sub(r"[^\x00-\x7F]+", "", text)  # ASCII only (optional, extra safe)
-    return text
+    # NFKD + dropping everything outside ASCII leaves ASCII text untouched
+    if text.isascii(): return text
+    # Short strings (labels, table cells, keywords) repeat a lot; long ones rarely do
+    if len(text) <= 256: return _sanitize_short(text)
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
 
 class PDF(FPDF):
     def __init__(self):
@@ -30,7 +55,7 @@ class PDF(FPDF):
         self.multi_cell(0, 8, sanitize_text(text))
         self.ln(2)
 
-    def add_image(self, image_path, max_width=160):
+    def add_image(self, image_path, max_width=RENDER_WIDTH_MM):
         if os.path.exists(image_path):
             try:
                 self.image(image_path, w=max_width)
@@ -48,64 +73,309 @@ class PDF(FPDF):
             self.multi_cell(0, 8, f"- {sanitize_text(item)}")
         self.ln(2)
 
-    def add_table(self, table_html):
-        soup = BeautifulSoup(table_html, "html.parser")
-        rows = soup.find_all("tr")
+    def add_table(self, table):
+        # Accepts pre-extracted rows (lists of cell texts) or a table HTML string
+        rows = table_rows_from_html(table) if isinstance(table, str) else table
         if not rows: return
         self.set_font("Arial", "I", 10)
         self.cell(0, 8, "[Embedded table below]", ln=True)
-        for row in rows:
-            cols = [col.get_text(strip=True) for col in row.find_all(["td", "th"])]
+        for cols in rows:
             self.multi_cell(0, 7, sanitize_text(" | ".join(cols)))
         self.ln(3)
 
-def generate_pdf(summary_file, keyword_file, output_path="final_report.pdf"):
-    with open(summary_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
+def generate_pdf(summary_file, keyword_file, output_path="final_report.pdf", section_size=50, workers=None,
+                 duplicates_file=None):
     if keyword_file and os.path.exists(keyword_file):
         with open(keyword_file, "r", encoding="utf-8") as f:
             keyword_data = json.load(f)
     else:
         keyword_data = {}
 
-    pdf = PDF()
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(200, 10, txt="AI Summarized Report", ln=True, align="C")
-    pdf.ln(10)
+    # Entries are read one at a time (JSON array or .jsonl) instead of json.load
+    entries = iter_entries(summary_file)
+    if duplicates_file and os.path.exists(duplicates_file):
+        with open(duplicates_file, "r", encoding="utf-8") as f:
+            entries = with_alternate_urls(entries, json.load(f))
+    render_pdf(entries, keyword_data, output_path, section_size, workers)
 
-    for entry in data:
-        url = entry.get("url", "")
-        summary = entry.get("summary", entry.get("text", ""))
-        images = entry.get("images", [])
-        pros = entry.get("pros", [])
-        cons = entry.get("cons", [])
-        tables = entry.get("tables", [])
+def with_alternate_urls(entries, duplicates):
+    """Attach alternate_urls to entries from a {duplicate url: canonical url} map."""
+    alternates = {}
+    for url, canonical in duplicates.items():
+        alternates.setdefault(canonical, []).append(url)
+    for entry in entries:
+        if entry.get("url") in alternates:
+            entry = {**entry, "alternate_urls": alternates[entry["url"]]}
+        yield entry
 
-        pdf.set_font("Arial", "B", 12)
-        pdf.multi_cell(0, 10, sanitize_text(f"Source: {url}"))
-        pdf.ln(1)
+def _prepared_images(images, preparer, limit=MAX_IMAGES_PER_ENTRY):
+    """The first `limit` images that are usable and not near-duplicates, prepared for the PDF."""
+    prepared = []
+    for img_path in images:
+        if len(prepared) == limit:
+            break
+        path = preparer.prepare(img_path)
+        if path:
+            prepared.append(path)
+    return prepared
 
-        pdf.add_text(summary)
-        pdf.add_list(pros, "Pros")
-        pdf.add_list(cons, "Cons")
+def _render_entry(pdf, entry, preparer):
+    url = entry.get("url", "")
+    summary = entry.get("summary", entry.get("text", ""))
+    images = entry.get("images", [])
+    pros = entry.get("pros", [])
+    cons = entry.get("cons", [])
+    tables = entry.get("table_rows") or entry.get("tables", [])
 
-        for img_path in images[:3]:
-            pdf.add_image(img_path)
+    pdf.set_font("Arial", "B", 12)
+    pdf.multi_cell(0, 10, sanitize_text(f"Source: {url}"))
+    alternates = entry.get("alternate_urls", [])
+    if alternates:
+        pdf.set_font("Arial", "I", 10)
+        pdf.multi_cell(0, 6, sanitize_text("Also published at: " + ", ".join(alternates)))
+    pdf.ln(1)
 
-        for table_html in tables[:1]:
-            pdf.add_table(table_html)
+    pdf.add_text(summary)
+    pdf.add_list(pros, "Pros")
+    pdf.add_list(cons, "Cons")
 
-        pdf.ln(5)
-        pdf.cell(0, 0, "-" * 80, ln=True)
-        pdf.ln(5)
+    for img_path in (_prepared_images(images, preparer) if preparer is not None else images):
+        pdf.add_image(img_path)
+        count("images_embedded")
+
+    for table in tables[:1]:
+        pdf.add_table(table)
+
+    pdf.ln(5)
+    pdf.cell(0, 0, "-" * 80, ln=True)
+    pdf.ln(5)
+
+def _render_section(entries, output_path, title=False, keyword_data=None, preparer=None):
+    """
+    Render one self-contained PDF; runs in worker processes for big reports.
+    Images go through `preparer`; without one they are already prepared.
+    """
+    pdf = PDF()
+    if title:
+        pdf.set_font("Arial", "B", 14)
+        pdf.cell(200, 10, txt="AI Summarized Report", ln=True, align="C")
+        pdf.ln(10)
+
+    rendered = 0
+    for entry in entries:
+        _render_entry(pdf, entry, preparer)
+        rendered += 1
 
     if keyword_data:
-        pdf.add_page()
+        if rendered or title:
+            pdf.add_page()
         pdf.chapter_title("Keywords")
         for url, keywords in keyword_data.items():
             line = f"{url}\n- " + ", ".join(sanitize_text(k) for k in keywords)
             pdf.add_text(line)
 
     pdf.output(output_path)
+    return output_path
+
+def _sections(entries, section_size):
+    while True:
+        section = list(islice(entries, section_size))
+        if not section:
+            return
+        yield section
+
+def _render_parts(entries, keyword_data, tmp_dir, section_size, workers):
+    """Yield part files in order; at most 2 * workers sections are held at once."""
+    part = lambda i: os.path.join(tmp_dir, f"part_{i:05d}.pdf")
+    sections = _sections(entries, section_size)
+    parts = 0
+    # One preparer for the whole report: near-duplicates are dropped across sections
+    preparer = ImagePreparer()
+    if workers <= 1:
+        for i, section in enumerate(sections):
+            yield _render_section(section, part(i), title=i == 0, preparer=preparer)
+            parts += 1
+    else:
+        # spawn: the caller may have an event loop and crawler threads running
+        spawn = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=spawn) as pool:
+            pending = deque()
+            for i, section in enumerate(sections):
+                # Images are prepared here, in report order, and the workers only embed them
+                section = [{**entry, "images": _prepared_images(entry.get("images", []), preparer)}
+                           for entry in section]
+                pending.append(pool.submit(_render_section, section, part(i), i == 0))
+                parts += 1
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+    if keyword_data:
+        yield _render_section([], part(parts), title=parts == 0, keyword_data=keyword_data)
+
+class PdfConcatenator:
+    """
+    Appends the pages of finished PDFs to one output file as it goes: each
+    part's objects are renumbered and written out before the next part is
+    read, so memory stays flat however many parts a report has. Only the
+    page tree, catalog and xref offsets are written at the end.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.offsets = []  # byte offset of object n at index n - 1
+        self.kids = []
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self.pages_num = self._reserve()
+
+    def _reserve(self):
+        self.offsets.append(None)
+        return len(self.offsets)
+
+    def _write_object(self, num, obj):
+        self.offsets[num - 1] = self.f.tell()
+        self.f.write(f"{num} 0 obj\n".encode())
+        obj.write_to_stream(self.f)
+        self.f.write(b"\nendobj\n")
+
+    def append(self, path):
+        reader = PdfReader(path)
+        numbers = {}    # (idnum, generation) in this part -> object number in the output
+        pending = deque()
+
+        def renumber(obj):
+            # In place: the reader and its parsed objects are dropped after this part
+            if isinstance(obj, IndirectObject):
+                if obj.pdf is not reader:
+                    return obj  # already renumbered (direct objects can be shared between pages)
+                key = (obj.idnum, obj.generation)
+                if key not in numbers:
+                    numbers[key] = self._reserve()
+                    pending.append(obj)
+                return IndirectObject(numbers[key], 0, None)
+            if isinstance(obj, DictionaryObject):
+                for key, value in list(dict.items(obj)):
+                    dict.__setitem__(obj, key, renumber(value))
+            elif isinstance(obj, ArrayObject):
+                for i, value in enumerate(list.__iter__(obj)):
+                    list.__setitem__(obj, i, renumber(value))
+            return obj
+
+        parent = IndirectObject(self.pages_num, 0, None)
+        for page in reader.pages:
+            ref = page.indirect_reference
+            numbers[(ref.idnum, ref.generation)] = num = self._reserve()
+            # pypdf has already copied inherited attributes (MediaBox, Resources) onto the page
+            dict.__setitem__(page, "/Parent", parent)
+            self._write_object(num, renumber(page))
+            self.kids.append(num)
+            while pending:
+                ref = pending.popleft()
+                self._write_object(numbers[(ref.idnum, ref.generation)], renumber(ref.get_object()))
+
+    def close(self):
+        kids = " ".join(f"{num} 0 R" for num in self.kids)
+        self.offsets[self.pages_num - 1] = self.f.tell()
+        self.f.write(f"{self.pages_num} 0 obj\n<< /Type /Pages /Kids [{kids}] /Count {len(self.kids)} >>\n"
+                     "endobj\n".encode())
+        catalog = self._reserve()
+        self.offsets[catalog - 1] = self.f.tell()
+        self.f.write(f"{catalog} 0 obj\n<< /Type /Catalog /Pages {self.pages_num} 0 R >>\nendobj\n".encode())
+        xref = self.f.tell()
+        self.f.write(f"xref\n0 {len(self.offsets) + 1}\n0000000000 65535 f \n".encode())
+        self.f.write("".join(f"{offset:010d} 00000 n \n" for offset in self.offsets).encode())
+        self.f.write(f"trailer\n<< /Size {len(self.offsets) + 1} /Root {catalog} 0 R >>\n"
+                     f"startxref\n{xref}\n%%EOF\n".encode())
+
+def pdf_workers(workers=None):
+    """Explicit `workers`, else AGENT_PDF_WORKERS, else one per CPU core up to DEFAULT_PDF_WORKERS."""
+    if workers is None:
+        workers = int(os.environ.get(PDF_WORKERS_ENV) or 0)
+    # Every worker is a fresh interpreter importing fpdf and Pillow
+    return workers if workers > 0 else min(DEFAULT_PDF_WORKERS, os.cpu_count() or 1)
+
+def render_settings(section_size=50):
+    """Everything besides the entries and keywords that decides the report (for stage hashes)."""
+    import image_prep
+    # The worker count is left out: sections come out the same on any number of processes
+    return {"section_size": section_size, "sections": PdfReader is not None,
+            "images_per_entry": MAX_IMAGES_PER_ENTRY, "image_width_mm": image_prep.RENDER_WIDTH_MM,
+            "image_dpi": image_prep.TARGET_DPI, "jpeg_quality": image_prep.JPEG_QUALITY,
+            "pillow": image_prep.Image is not None}
+
+def render_pdf(data, keyword_data, output_path="final_report.pdf", section_size=50, workers=None):
+    """
+    Render report entries (any iterable, consumed lazily) to `output_path`.
+
+    Reports longer than `section_size` entries are rendered section by section
+    into temporary PDFs on `workers` processes (see pdf_workers) and appended
+    to the output as each one finishes, so neither rendering nor merging holds
+    the whole report. Every section and the keywords page start on a new page.
+    Without pypdf the whole report is built as one document.
+    """
+    entries = iter(data)
+    head = list(islice(entries, section_size + 1))
+
+    if len(head) <= section_size or PdfReader is None:
+        if PdfReader is None and len(head) > section_size:
+            print("[⚠️] pypdf is not installed; rendering the report as one document in memory")
+        _render_section(chain(head, entries), output_path, title=True, keyword_data=keyword_data,
+                        preparer=ImagePreparer())
+    else:
+        with tempfile.TemporaryDirectory(prefix="report_") as tmp_dir, open(output_path, "wb") as f:
+            merged = PdfConcatenator(f)
+            for part_path in _render_parts(chain(head, entries), keyword_data, tmp_dir, section_size,
+                                           pdf_workers(workers)):
+                count("pdf_sections")
+                with span("pdf.merge"):
+                    merged.append(part_path)
+                os.remove(part_path)
+            merged.close()
+
     print(f"[✅] PDF saved as: {output_path}")
+
+# -------------------- File commands --------------------
+def handle_file_commands(instruction, commands, summary_file="final_summary.json",
+                         keyword_file="keywords.json", output_path="final_report.pdf", directory=".",
+                         duplicates_file="duplicates.json"):
+    """
+    Run file_handler commands against the last completed web run in
+    `directory`: taken from the run store, or from its JSON files for runs
+    made before the store. With the store, the commands make a run of their
+    own; the web run's outputs stay as it left them.
+    """
+    from run_store import get_run_store
+    from stage_graph import StageGraph, keywords_run, keywords_stage, pdf_stage
+
+    summary_file, keyword_file, output_path, duplicates_file = (
+        os.path.join(directory, name) for name in (summary_file, keyword_file, output_path, duplicates_file)
+    )
+    store = get_run_store()
+    summary_run = store.latest_run("summarize", workdir=directory)
+    if summary_run is None and not os.path.exists(summary_file):
+        print(f"[❌] No summaries found in the run store or {summary_file}. Run a search first.")
+        return
+
+    if summary_run is None:
+        if "extract_keywords" in commands:
+            from keyword_extractor import extract_keywords  # loads KeyBERT on first use
+            extract_keywords(summary_file, keyword_file)
+        if "export_to_pdf" in commands:
+            generate_pdf(summary_file, keyword_file, output_path, duplicates_file=duplicates_file)
+        return
+
+    run_id = store.create_run(instruction, commands, directory)
+    graph = StageGraph(store, run_id, directory)
+    try:
+        if "extract_keywords" in commands:
+            # keywords.json is rewritten too, so it never lags behind the store
+            keywords_stage(graph, summary_run, keyword_file)
+            print(f"[✓] Keywords saved in run {run_id} and {keyword_file}")
+        if "export_to_pdf" in commands:
+            keyword_run = run_id if store.keywords(run_id) else keywords_run(graph, summary_run)
+            pdf_stage(graph, summary_run, keyword_run, output_path)
+    except BaseException:
+        store.finish_run(run_id, "failed")
+        raise
+    store.finish_run(run_id)
+    graph.report()
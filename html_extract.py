@@ -0,0 +1,249 @@
+from urllib.parse import urljoin
+from html import escape
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # fall back to the BeautifulSoup walker below
+    lxml = None
+
+from bs4 import BeautifulSoup
+
+from main_content import select_main_paragraphs
+
+IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png", ".webp"]
+
+# Text inside these tags is not part of BeautifulSoup's get_text()
+_SKIP_TEXT_TAGS = {"script", "style", "template", "rt", "rp"}
+_RAW_TEXT_TAGS = {"script", "style"}
+_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem",
+    "meta", "param", "source", "track", "wbr", "basefont", "bgsound", "command", "frame",
+    "image", "isindex", "nextid", "spacer",
+}
+_PRESERVE_WHITESPACE_TAGS = {"pre", "textarea"}
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+_MULTI_VALUED_ATTRS = {"class", "rel", "rev", "accept-charset", "headers", "accesskey", "dropzone"}
+
+
+def extract_document(html, base_url, main_content=False):
+    """
+    Parse `html` once and return everything the pipeline extracts from a page.
+
+    Keys:
+      text          <p> text as built by scrape_content, plus the chart note;
+                    with main_content=True only the paragraphs of the article
+                    body (see main_content.py), when one is found
+      image_urls    raw src/data-src of <img> tags with an image extension
+      linked_images absolute src of every <img src>, as extract_structured_content
+      tables        HTML of each <table>
+      table_rows    cell texts per row for each table (what the PDF renders)
+      pros, cons    lists from pros/cons headings
+      charts        {"svg": n, "canvas": n}
+
+    Uses lxml when it is installed and BeautifulSoup otherwise. On well-formed
+    markup both give the same result as the BeautifulSoup/html.parser
+    functions they replace; broken markup (unclosed <p>, stray cells) may be
+    repaired differently by lxml. main_content needs lxml and is ignored
+    without it.
+    """
+    if lxml is not None:
+        return _extract_lxml(html, base_url, main_content)
+    return _extract_soup(html, base_url)
+
+
+def _finish(paragraphs, image_urls, linked_images, tables, table_rows, pros, cons, svg, canvas):
+    main_text = "\n".join(paragraphs)
+    if svg or canvas:
+        main_text += f"\n\n[Charts Detected: {svg} SVG, {canvas} Canvas]"
+    return {
+        "text": main_text,
+        "image_urls": image_urls,
+        "linked_images": linked_images,
+        "tables": tables,
+        "table_rows": table_rows,
+        "pros": pros,
+        "cons": cons,
+        "charts": {"svg": svg, "canvas": canvas},
+    }
+
+
+# -------------------- lxml backend --------------------
+def _node_text(text, parent):
+    """BeautifulSoup collapses whitespace-only strings to one space or newline."""
+    if text.strip(_ASCII_SPACES):
+        return text
+    if parent.tag in _PRESERVE_WHITESPACE_TAGS or any(
+        a.tag in _PRESERVE_WHITESPACE_TAGS for a in parent.iterancestors()
+    ):
+        return text
+    return "\n" if "\n" in text else " "
+
+
+def _strings(el):
+    """Text nodes under `el` in document order, like Tag._all_strings()."""
+    if el.tag in _SKIP_TEXT_TAGS:
+        return
+    if el.text:
+        yield _node_text(el.text, el)
+    for child in el:
+        if isinstance(child.tag, str):
+            yield from _strings(child)
+        if child.tail:
+            yield _node_text(child.tail, el)
+
+
+def _get_text(el, strip=False):
+    if strip:
+        return "".join(s.strip() for s in _strings(el) if s.strip())
+    return "".join(_strings(el))
+
+
+def _quote_attr(value):
+    value = escape(value, quote=False)
+    if '"' in value and "'" not in value:
+        return f"'{value}'"
+    return '"' + value.replace('"', "&quot;") + '"'
+
+
+def _serialize(el, out):
+    """Serialize like str(Tag) with BeautifulSoup's default 'minimal' formatter."""
+    if not isinstance(el.tag, str):
+        if el.tag is etree.Comment:
+            out.append(f"<!--{el.text or ''}-->")
+        return
+    attrs = ""
+    for name, value in sorted(el.attrib.items()):
+        if name in _MULTI_VALUED_ATTRS:
+            value = " ".join(value.split())
+        attrs += f" {name}={_quote_attr(value)}"
+    if el.tag in _VOID_TAGS:
+        out.append(f"<{el.tag}{attrs}/>")
+        return
+    out.append(f"<{el.tag}{attrs}>")
+    raw = el.tag in _RAW_TEXT_TAGS
+    if el.text:
+        out.append(el.text if raw else escape(_node_text(el.text, el), quote=False))
+    for child in el:
+        _serialize(child, out)
+        if child.tail:
+            out.append(escape(_node_text(child.tail, el), quote=False))
+    out.append(f"</{el.tag}>")
+
+
+def _table_html(table):
+    out = []
+    _serialize(table, out)
+    return "".join(out)
+
+
+def _rows_lxml(table):
+    return [[_get_text(cell, strip=True) for cell in row.iter("td", "th")] for row in table.iter("tr")]
+
+
+def _parse_lxml(html):
+    if isinstance(html, str):
+        html = html.encode("utf-8", "surrogatepass")
+    parser = lxml.html.HTMLParser(encoding="utf-8")
+    return lxml.html.document_fromstring(html, parser=parser)
+
+
+def _extract_lxml(html, base_url, main_content=False):
+    paragraphs, image_urls, linked_images = [], [], []
+    tables, table_rows, pros, cons = [], [], [], []
+    svg = canvas = 0
+
+    try:
+        root = _parse_lxml(html)
+    except (etree.ParserError, ValueError):
+        root = None  # empty document
+
+    for el in (root.iter() if root is not None else ()):
+        tag = el.tag
+        if not isinstance(tag, str):
+            continue
+        if tag == "p":
+            if len(_get_text(el)) > 50:
+                paragraphs.append(_get_text(el, strip=True))
+        elif tag == "img":
+            src = el.get("src")
+            img_url = src or el.get("data-src")
+            if img_url and any(ext in img_url for ext in IMAGE_EXTENSIONS):
+                image_urls.append(img_url)
+            if src is not None:
+                linked_images.append(urljoin(base_url, src))
+        elif tag == "table":
+            tables.append(_table_html(el))
+            table_rows.append(_rows_lxml(el))
+        elif tag == "svg":
+            svg += 1
+        elif tag == "canvas":
+            canvas += 1
+        elif tag in ("h2", "h3", "strong"):
+            text = _get_text(el, strip=True).lower()
+            for label, bucket in (("pros", pros), ("cons", cons)):
+                if label in text:
+                    ul = next(el.itersiblings("ul"), None)
+                    if ul is not None:
+                        bucket.extend(_get_text(li, strip=True) for li in ul.iter("li"))
+
+    if main_content and root is not None:
+        # Last: selecting the body strips chrome out of the tree
+        body = [_get_text(p, strip=True) for p in select_main_paragraphs(root, base_url)
+                if len(_get_text(p)) > 50]
+        if body:
+            paragraphs = body
+
+    return _finish(paragraphs, image_urls, linked_images, tables, table_rows, pros, cons, svg, canvas)
+
+
+# -------------------- BeautifulSoup backend --------------------
+def _rows_soup(table):
+    return [[col.get_text(strip=True) for col in row.find_all(["td", "th"])] for row in table.find_all("tr")]
+
+
+def _extract_soup(html, base_url):
+    paragraphs, image_urls, linked_images = [], [], []
+    tables, table_rows, pros, cons = [], [], [], []
+    svg = canvas = 0
+
+    soup = BeautifulSoup(html, "html.parser")
+    for el in soup.find_all(True):
+        tag = el.name
+        if tag == "p":
+            if len(el.get_text()) > 50:
+                paragraphs.append(el.get_text(strip=True))
+        elif tag == "img":
+            src = el.get("src")
+            img_url = src or el.get("data-src")
+            if img_url and any(ext in img_url for ext in IMAGE_EXTENSIONS):
+                image_urls.append(img_url)
+            if src is not None:
+                linked_images.append(urljoin(base_url, src))
+        elif tag == "table":
+            tables.append(str(el))
+            table_rows.append(_rows_soup(el))
+        elif tag == "svg":
+            svg += 1
+        elif tag == "canvas":
+            canvas += 1
+        elif tag in ("h2", "h3", "strong"):
+            text = el.get_text(strip=True).lower()
+            for label, bucket in (("pros", pros), ("cons", cons)):
+                if label in text:
+                    ul = el.find_next_sibling("ul")
+                    if ul:
+                        bucket.extend(li.get_text(strip=True) for li in ul.find_all("li"))
+
+    return _finish(paragraphs, image_urls, linked_images, tables, table_rows, pros, cons, svg, canvas)
+
+
+def table_rows_from_html(table_html):
+    """Cell texts per row for a stored table HTML string."""
+    if lxml is not None:
+        try:
+            root = _parse_lxml(table_html)
+        except (etree.ParserError, ValueError):
+            return []
+        return _rows_lxml(root)
+    return _rows_soup(BeautifulSoup(table_html, "html.parser"))
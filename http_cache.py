@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+
+from instrumentation import count
+
+
+class ResponseTooLarge(Exception):
+    pass
+
+
+class CachedResponse:
+    def __init__(self, url, status_code, headers, content, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.from_cache = from_cache
+
+
+class ResponseCache:
+    """
+    On-disk HTTP cache shared by the page crawl and image downloads.
+
+    Entries are keyed by URL; bodies are stored once per content hash, so the
+    same image served from two URLs takes space once. Fresh entries (younger
+    than `ttl` seconds) are served without touching the network, stale ones are
+    revalidated with If-None-Match / If-Modified-Since. When the stored bodies
+    exceed `max_bytes`, least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir=".http_cache", ttl=3600, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(cache_dir, "bodies"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, "index.db"), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                final_url TEXT,
+                headers TEXT,
+                body_hash TEXT,
+                fetched_at REAL,
+                last_access REAL
+            );
+            CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access);
+            CREATE TABLE IF NOT EXISTS bodies (
+                body_hash TEXT PRIMARY KEY,
+                size INTEGER
+            );
+        """)
+        self._db.commit()
+
+    # -------------------- Storage --------------------
+    def _body_path(self, body_hash):
+        return os.path.join(self.cache_dir, "bodies", body_hash[:2], body_hash)
+
+    def _read_body(self, body_hash):
+        try:
+            with open(self._body_path(body_hash), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_body(self, content):
+        body_hash = hashlib.sha256(content).hexdigest()
+        path = self._body_path(body_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.part"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        return body_hash
+
+    def _lookup(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT final_url, headers, body_hash, fetched_at FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        final_url, headers, body_hash, fetched_at = row
+        return {"final_url": final_url, "headers": json.loads(headers),
+                "body_hash": body_hash, "fetched_at": fetched_at}
+
+    def _store(self, url, final_url, headers, content):
+        body_hash = self._write_body(content)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (url, final_url, json.dumps(headers), body_hash, now, now),
+            )
+            self._db.execute("INSERT OR IGNORE INTO bodies VALUES (?, ?)", (body_hash, len(content)))
+            self._evict()
+            self._db.commit()
+
+    def _touch(self, url, refreshed=False):
+        count("http_cache_revalidated" if refreshed else "http_cache_hits")
+        now = time.time()
+        with self._lock:
+            self.hits += 1
+            self.revalidated += refreshed
+            if refreshed:
+                self._db.execute("UPDATE entries SET fetched_at = ?, last_access = ? WHERE url = ?", (now, now, url))
+            else:
+                self._db.execute("UPDATE entries SET last_access = ? WHERE url = ?", (now, url))
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM bodies").fetchone()[0]
+        while total > self.max_bytes:
+            row = self._db.execute("SELECT url, body_hash FROM entries ORDER BY last_access LIMIT 1").fetchone()
+            if row is None:
+                break
+            url, body_hash = row
+            self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            self.evictions += 1
+            still_used = self._db.execute("SELECT 1 FROM entries WHERE body_hash = ? LIMIT 1", (body_hash,)).fetchone()
+            if not still_used:
+                size = self._db.execute("SELECT size FROM bodies WHERE body_hash = ?", (body_hash,)).fetchone()[0]
+                self._db.execute("DELETE FROM bodies WHERE body_hash = ?", (body_hash,))
+                try:
+                    os.remove(self._body_path(body_hash))
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    # -------------------- Fetching --------------------
+    def get(self, url, session=None, timeout=10, max_bytes=None):
+        """GET `url` through the cache. Raises ResponseTooLarge past `max_bytes`."""
+        entry = self._lookup(url)
+        content = self._read_body(entry["body_hash"]) if entry else None
+
+        if content is not None and time.time() - entry["fetched_at"] < self.ttl:
+            self._touch(url)
+            return CachedResponse(entry["final_url"], 200, entry["headers"], content, from_cache=True)
+
+        request_headers = {}
+        if content is not None:
+            if entry["headers"].get("ETag"):
+                request_headers["If-None-Match"] = entry["headers"]["ETag"]
+            if entry["headers"].get("Last-Modified"):
+                request_headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+
+        with (session or requests).get(url, timeout=timeout, stream=True, headers=request_headers) as response:
+            if response.status_code == 304 and content is not None:
+                self._touch(url, refreshed=True)
+                return CachedResponse(entry["final_url"], 200, entry["headers"], content, from_cache=True)
+
+            with self._lock:
+                self.misses += 1
+            count("http_cache_misses")
+            body = self._read_capped(response, url, max_bytes)
+            headers = {
+                name: response.headers[name]
+                for name in ("Content-Type", "ETag", "Last-Modified")
+                if name in response.headers
+            }
+            cacheable = "no-store" not in response.headers.get("Cache-Control", "")
+            if response.status_code == 200 and cacheable:
+                self._store(url, response.url, headers, body)
+            return CachedResponse(response.url, response.status_code, headers, body)
+
+    def _read_capped(self, response, url, max_bytes):
+        if max_bytes is None:
+            return response.content
+        declared = response.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise ResponseTooLarge(f"{url}: {declared} bytes exceeds cap")
+        chunks, size = [], 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            size += len(chunk)
+            if size > max_bytes:
+                raise ResponseTooLarge(f"{url}: larger than {max_bytes} bytes")
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "revalidated": self.revalidated, "evictions": self.evictions}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache(**kwargs):
+    """Return the process-wide ResponseCache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(**kwargs)
+    return _cache
@@ -0,0 +1,106 @@
+import hashlib
+import os
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # without Pillow images are passed through untouched
+    Image = None
+
+RENDER_WIDTH_MM = 160
+TARGET_DPI = 150
+JPEG_QUALITY = 80
+CACHE_DIR = ".image_cache"
+
+# Formats FPDF can embed as-is when Pillow is not available
+_FPDF_NATIVE = {".jpg", ".jpeg", ".png", ".gif"}
+
+
+def target_width_px(width_mm=RENDER_WIDTH_MM, dpi=TARGET_DPI):
+    return round(width_mm / 25.4 * dpi)
+
+
+def dhash(img, size=8):
+    """64-bit difference hash; near-identical images differ in only a few bits."""
+    small = img.convert("L").resize((size + 1, size), Image.LANCZOS)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def _flatten(img):
+    """RGB on a white background (PDF JPEGs have no alpha)."""
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+class ImagePreparer:
+    """
+    Turns downloaded images into small JPEGs sized for the PDF.
+
+    Every image is converted to RGB, downsampled to the width it is rendered
+    at (160mm at `dpi`), recompressed and cached in `cache_dir` under the
+    hash of its source bytes, so the next report reuses it. Images whose
+    perceptual hash is within `max_distance` bits of one already used in
+    this report are dropped as near-duplicates.
+    """
+
+    def __init__(self, width_mm=RENDER_WIDTH_MM, dpi=TARGET_DPI, quality=JPEG_QUALITY,
+                 cache_dir=CACHE_DIR, max_distance=5):
+        self.width_px = target_width_px(width_mm, dpi)
+        self.quality = quality
+        self.cache_dir = cache_dir
+        self.max_distance = max_distance
+        self._seen_hashes = []
+
+    def _is_duplicate(self, image_hash):
+        if any(bin(image_hash ^ seen).count("1") <= self.max_distance for seen in self._seen_hashes):
+            return True
+        self._seen_hashes.append(image_hash)
+        return False
+
+    def _cached_path(self, source_bytes):
+        key = hashlib.sha256(source_bytes)
+        key.update(f"|{self.width_px}|{self.quality}".encode())
+        return os.path.join(self.cache_dir, key.hexdigest() + ".jpg")
+
+    def prepare(self, image_path):
+        """Path of the prepared image, or None if it is unusable or a near-duplicate."""
+        if not image_path or not os.path.exists(image_path):
+            return None
+        if Image is None:
+            return image_path if os.path.splitext(image_path)[1].lower() in _FPDF_NATIVE else None
+
+        try:
+            with open(image_path, "rb") as f:
+                source_bytes = f.read()
+            prepared_path = self._cached_path(source_bytes)
+
+            if os.path.exists(prepared_path):
+                with Image.open(prepared_path) as img:
+                    image_hash = dhash(img)
+            else:
+                with Image.open(image_path) as img:
+                    img.draft("RGB", (self.width_px, self.width_px))  # cheap JPEG pre-scaling
+                    img = _flatten(ImageOps.exif_transpose(img))
+                    if img.width > self.width_px:
+                        height = max(1, round(img.height * self.width_px / img.width))
+                        img = img.resize((self.width_px, height), Image.LANCZOS)
+                    image_hash = dhash(img)
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    tmp_path = prepared_path + ".part"
+                    img.save(tmp_path, "JPEG", quality=self.quality, optimize=True)
+                    os.replace(tmp_path, prepared_path)
+        except Exception as e:
+            print(f"[⚠️] Could not prepare image {image_path}: {e}")
+            return None
+
+        return None if self._is_duplicate(image_hash) else prepared_path
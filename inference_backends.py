@@ -0,0 +1,169 @@
+import os
+import re
+import sys
+
+# CPU inference backends for the summarizer and the sentence-transformer
+# (keywords and intent routing). Models are loaded through these functions,
+# so the backend only has to be chosen before first use; the thread count is
+# set once at startup (main.py), before any model loads torch:
+#
+#   eager      fp32 PyTorch, as downloaded (the reference output)
+#   int8       PyTorch with dynamic int8 quantization of every Linear layer
+#   onnx       exported ONNX graph run by onnxruntime (needs optimum)
+#   onnx-int8  the exported graph with dynamic int8 quantization
+#
+# Choose with configure(), main.py --backend/--threads, or the environment:
+# AGENT_INFERENCE_BACKEND for every model, AGENT_SUMMARIZER_BACKEND /
+# AGENT_EMBEDDER_BACKEND per model, AGENT_NUM_THREADS for the thread pools
+# (applied by main.py, like --threads).
+# The ONNX backends export the model on first use and keep it under
+# .onnx_models (AGENT_ONNX_DIR).
+
+BACKENDS = ("eager", "int8", "onnx", "onnx-int8")
+EXPORT_DIR = os.environ.get("AGENT_ONNX_DIR", ".onnx_models")  # exported graphs, built once
+
+_backends = {}
+_threads = None
+
+
+def configure(backend=None, threads=None, **per_model):
+    """
+    Set the backend for every model (`backend`) or per model
+    (summarizer=..., embedder=...), and the inference thread count.
+    Only models loaded afterwards are affected.
+    """
+    global _threads
+    for name, value in dict(per_model, default=backend).items():
+        if value is None:
+            continue
+        if value not in BACKENDS:
+            raise ValueError(f"Unknown inference backend '{value}' (choose from {', '.join(BACKENDS)})")
+        _backends[name] = value
+    if threads:
+        _threads = int(threads)
+        # Read by the OpenMP/MKL pools when torch is first imported
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+            os.environ[var] = str(_threads)
+        if "torch" in sys.modules:
+            sys.modules["torch"].set_num_threads(_threads)
+
+
+def backend_for(name):
+    backend = (_backends.get(name) or os.environ.get(f"AGENT_{name.upper()}_BACKEND")
+               or _backends.get("default") or os.environ.get("AGENT_INFERENCE_BACKEND") or "eager")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}' for {name}")
+    return backend
+
+
+def num_threads():
+    if _threads is None and os.environ.get("AGENT_NUM_THREADS"):
+        return int(os.environ["AGENT_NUM_THREADS"])
+    return _threads
+
+
+def cache_params(name):
+    """Extra result-cache parameters: outputs of non-reference backends are cached separately."""
+    backend = backend_for(name)
+    return {} if backend == "eager" else {"backend": backend}
+
+
+def _export_dir(model_name, suffix=""):
+    return os.path.join(EXPORT_DIR, re.sub(r"[^A-Za-z0-9_.-]+", "--", model_name) + suffix)
+
+
+def _session_options():
+    import onnxruntime
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads():
+        options.intra_op_num_threads = num_threads()
+        options.inter_op_num_threads = 1
+    return options
+
+
+def _quantize_linear(model):
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+# -------------------- Summarizer --------------------
+def _export_seq2seq(model_name, quantize):
+    """Export (and optionally quantize) once; later loads read the saved graphs."""
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer
+
+    export_dir = _export_dir(model_name)
+    if not os.path.exists(os.path.join(export_dir, "config.json")):
+        print(f"[+] Exporting {model_name} to ONNX (one-time)...")
+        # use_cache exports the decoder-with-past graph: the cross-attention keys
+        # of the encoder output and earlier decoder steps are reused while generating
+        model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True, use_cache=True)
+        model.save_pretrained(export_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(export_dir)
+    if not quantize:
+        return export_dir, {}
+
+    quant_dir = _export_dir(model_name, "-int8")
+    files = {"encoder_file_name": "encoder_model_quantized.onnx",
+             "decoder_file_name": "decoder_model_quantized.onnx",
+             "decoder_with_past_file_name": "decoder_with_past_model_quantized.onnx"}
+    if not os.path.exists(os.path.join(quant_dir, files["encoder_file_name"])):
+        from optimum.onnxruntime import ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoConfig
+
+        print(f"[+] Quantizing the ONNX graphs of {model_name} (one-time)...")
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        for file_name in ("encoder_model.onnx", "decoder_model.onnx", "decoder_with_past_model.onnx"):
+            quantizer = ORTQuantizer.from_pretrained(export_dir, file_name=file_name)
+            quantizer.quantize(save_dir=quant_dir, quantization_config=qconfig)
+        AutoConfig.from_pretrained(export_dir).save_pretrained(quant_dir)
+        AutoTokenizer.from_pretrained(export_dir).save_pretrained(quant_dir)
+    return quant_dir, files
+
+
+def load_summarizer(model_name, backend=None):
+    """A transformers summarization pipeline on the chosen backend."""
+    from transformers import pipeline
+
+    backend = backend or backend_for("summarizer")
+    if backend == "eager":
+        return pipeline("summarization", model=model_name)
+    if backend == "int8":
+        from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+        model = _quantize_linear(AutoModelForSeq2SeqLM.from_pretrained(model_name).eval())
+        return pipeline("summarization", model=model, tokenizer=AutoTokenizer.from_pretrained(model_name))
+
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer
+    model_dir, files = _export_seq2seq(model_name, quantize=backend == "onnx-int8")
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_dir, use_cache=True, session_options=_session_options(),
+                                                 **files)
+    return pipeline("summarization", model=model, tokenizer=AutoTokenizer.from_pretrained(model_dir))
+
+
+# -------------------- Sentence-transformer --------------------
+def load_sentence_transformer(model_name, backend=None):
+    """A SentenceTransformer on the chosen backend (ONNX needs sentence-transformers >= 3.2)."""
+    from sentence_transformers import SentenceTransformer
+
+    backend = backend or backend_for("embedder")
+    if backend == "eager":
+        return SentenceTransformer(model_name)
+    if backend == "int8":
+        return _quantize_linear(SentenceTransformer(model_name).eval())
+
+    model_kwargs = {"provider": "CPUExecutionProvider", "session_options": _session_options()}
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs)
+
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+    export_dir = _export_dir(model_name)
+    quantized = os.path.join("onnx", "model_qint8_avx2.onnx")
+    if not os.path.exists(os.path.join(export_dir, quantized)):
+        print(f"[+] Exporting and quantizing {model_name} (one-time)...")
+        model = SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs)
+        model.save_pretrained(export_dir)
+        export_dynamic_quantized_onnx_model(model, "avx2", export_dir)
+    return SentenceTransformer(export_dir, backend="onnx", model_kwargs=dict(model_kwargs, file_name=quantized))
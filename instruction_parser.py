@@ -1,11 +1,16 @@
 # instruction_parser.py
 
+import hashlib
 import os
-from transformers import pipeline
-from Browser_automation import run_pipeline  # Entry point for web task execution
+import re
+from functools import lru_cache
+from model_registry import register, get_model
 
-# Zero-shot model for future extension (currently not used in logic)
-classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+# Instructions are routed by comparing their sentence embedding with the
+# embeddings of INTENT_LABELS; the embedder is the same sentence-transformer
+# KeyBERT uses, so it is loaded (lazily) only once for both. An instruction
+# that is just a label ("list files") is routed without it, so plain terminal
+# work does not pay for loading the model.
 
 # Intent mappings
 INTENT_TYPES = {
@@ -33,7 +38,7 @@ INTENT_TYPES = {
 COMMAND_MAP = {
     "list files": "dir" if os.name == "nt" else "ls",
     "list pdf files": "dir *.pdf" if os.name == "nt" else "ls *.pdf",
-    "show current directory": "cd",
+    "show current directory": "cd" if os.name == "nt" else "pwd",
     "show python files": "dir *.py" if os.name == "nt" else "ls *.py",
     "remove temp files": "del *.tmp" if os.name == "nt" else "rm *.tmp",
     "search web": ["scrape"],
@@ -50,7 +55,74 @@ COMMAND_MAP = {
 
 INTENT_LABELS = list(INTENT_TYPES.keys())
 
-def parse_instruction(instruction: str) -> dict:
+# Pipeline commands the web and file stages understand
+PIPELINE_COMMANDS = {cmd for cmds in COMMAND_MAP.values() if isinstance(cmds, list) for cmd in cmds}
+
+# Below this cosine similarity the keyword rules decide instead
+INTENT_THRESHOLD = 0.5
+# Shell commands need a much closer match: a loose paraphrase must not run one
+TERMINAL_THRESHOLD = 0.8
+# Terminal labels whose command changes files; only run when named verbatim
+MUTATING_LABELS = {"remove temp files"}
+LABEL_CACHE_DIR = ".intent_cache"
+
+# -------------------- Embedding router --------------------
+_label_vectors = None
+
+def _normalize(vectors):
+    import numpy as np
+    vectors = np.asarray(vectors, dtype="float32")
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+def get_label_vectors():
+    """Unit vectors for INTENT_LABELS, embedded once and cached on disk."""
+    global _label_vectors
+    if _label_vectors is None:
+        import numpy as np
+        from inference_backends import backend_for
+        from keyword_extractor import KEYWORD_MODEL
+        backend = backend_for("embedder")
+        model = KEYWORD_MODEL if backend == "eager" else f"{KEYWORD_MODEL}@{backend}"
+        key = hashlib.sha256("\n".join([model] + INTENT_LABELS).encode()).hexdigest()[:16]
+        path = os.path.join(LABEL_CACHE_DIR, f"labels_{key}.npy")
+        if os.path.exists(path):
+            _label_vectors = np.load(path)
+        else:
+            _label_vectors = _normalize(get_model("embedder").embed(INTENT_LABELS))
+            os.makedirs(LABEL_CACHE_DIR, exist_ok=True)
+            np.save(path, _label_vectors)
+    return _label_vectors
+
+@lru_cache(maxsize=256)
+def _instruction_vector(instruction):
+    # Repeated instructions (the job daemon, batch files) are embedded once
+    return _normalize(get_model("embedder").embed([instruction]))[0]
+
+def classify_intent(instruction):
+    """(label, cosine similarity) for every INTENT_LABELS entry, best first."""
+    scores = get_label_vectors() @ _instruction_vector(instruction)
+    return sorted(zip(INTENT_LABELS, map(float, scores)), key=lambda item: -item[1])
+
+def exact_label(instruction):
+    """The label an instruction spells out as a whole ("list files", "Please export to PDF."), if any."""
+    text = " ".join(re.findall(r"[a-z0-9_]+", instruction.lower()))
+    text = text[len("please "):] if text.startswith("please ") else text
+    return text if INTENT_TYPES.get(text, "unknown") != "unknown" else None
+
+def _commands_for(label):
+    commands = COMMAND_MAP.get(label, [])
+    # Terminal labels map to a single shell command string
+    return [commands] if isinstance(commands, str) else list(commands)
+
+def _accepts(label, score, threshold):
+    intent = INTENT_TYPES[label]
+    if intent == "unknown" or label in MUTATING_LABELS:
+        return False
+    return score >= (max(threshold, TERMINAL_THRESHOLD) if intent == "terminal" else threshold)
+
+# -------------------- Keyword rules (fallback) --------------------
+def _parse_with_rules(instruction):
     instruction = instruction.lower()
     commands = set()
     intent = "unknown"
@@ -81,6 +153,8 @@ def parse_instruction(instruction: str) -> dict:
         commands.add("generate_charts")
     if any(k in instruction for k in ["save", "pdf", "export"]):
         commands.add("export_to_pdf")
+    if "keyword" in instruction:
+        commands.add("extract_keywords")
 
     # ✅ Safe fallback
     if not commands:
@@ -99,10 +173,37 @@ def parse_instruction(instruction: str) -> dict:
     return {
         "intent": intent,
         "commands": list(commands),
-        "label": label,
-        "score": 0.99  # Hardcoded for now, can be dynamic with classifier later
+        "label": label
     }
 
+def parse_instruction(instruction: str, threshold: float = INTENT_THRESHOLD) -> dict:
+    label = exact_label(instruction)
+    if label is not None:
+        return {"intent": INTENT_TYPES[label], "commands": _commands_for(label), "label": label, "score": 1.0}
+
+    try:
+        ranked = classify_intent(instruction)
+    except Exception as e:
+        print(f"[⚠️] Intent embedding unavailable, using keyword rules: {e}")
+        ranked = []
+
+    matches = [(label, score) for label, score in ranked if _accepts(label, score, threshold)]
+    if not matches:
+        parsed = _parse_with_rules(instruction)
+        parsed["score"] = ranked[0][1] if ranked else 0.0
+        return parsed
+
+    label, score = matches[0]
+    intent = INTENT_TYPES[label]
+    commands = _commands_for(label)
+    if intent != "terminal":
+        # Compound instructions ("search and summarize X, then export to pdf")
+        # add what the keyword rules spell out; a runner-up label adds nothing,
+        # so a loose second match cannot write a PDF nobody asked for
+        rule_commands = _parse_with_rules(instruction)["commands"]
+        commands += sorted(cmd for cmd in rule_commands if cmd in PIPELINE_COMMANDS and cmd not in commands)
+    return {"intent": intent, "commands": commands, "label": label, "score": score}
+
 # 🧪 CLI test
 if __name__ == "__main__":
     user_input = input("🔍 Enter your instruction: ")
@@ -115,4 +216,5 @@ if __name__ == "__main__":
 
     # Trigger pipeline if it's a web intent
     if result["intent"] == "web":
+        from Browser_automation import run_pipeline  # Entry point for web task execution
         run_pipeline(user_input, result["intent"], result["commands"])
@@ -0,0 +1,281 @@
+import contextlib
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# Spans and counters for finding where a run spends its time and memory.
+# Disabled by default: span() then hands back one shared no-op context manager
+# and count() returns after a single flag check. Turn it on with enable() or
+# by setting AGENT_TRACE=1 (AGENT_TRACE_MEMORY=1 adds tracemalloc peaks).
+#
+# Spans and counters go to the active Trace: the process-wide one, or the one
+# new_trace() started for the current context. Context variables follow
+# event-loop tasks and to_thread calls, so concurrent jobs (the agent server's
+# workers) each record and export only their own.
+
+_enabled = False
+_trace_memory = False
+_lock = threading.Lock()
+_ids = itertools.count(1)
+_current = contextvars.ContextVar("current_span", default=None)
+_open_spans = set()  # spans collecting tracemalloc peaks (process-wide, like tracemalloc)
+
+
+class Trace:
+    """Finished spans (in completion order) and counters of one run."""
+
+    def __init__(self):
+        self.spans = []
+        self.counters = {}
+        self.epoch = time.perf_counter()
+
+
+_global_trace = Trace()
+_active_trace = contextvars.ContextVar("active_trace", default=None)
+
+
+def _trace():
+    return _active_trace.get() or _global_trace
+
+
+@contextlib.contextmanager
+def new_trace():
+    """Record the enclosed block (and the tasks and threads it starts) in a trace of its own."""
+    trace = Trace()
+    token = _active_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _active_trace.reset(token)
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Span:
+    __slots__ = ("id", "parent", "name", "attrs", "start", "end", "thread", "peak_bytes", "trace", "_token")
+
+    def __init__(self, name, attrs):
+        self.id = next(_ids)
+        self.trace = _trace()
+        self.name = name
+        self.attrs = attrs
+        self.parent = None
+        self.start = self.end = None
+        self.thread = None
+        self.peak_bytes = None
+        self._token = None
+
+    @property
+    def duration(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        parent = _current.get()
+        self.parent = parent.id if parent is not None else None
+        self.thread = threading.current_thread().name
+        self._token = _current.set(self)
+        if _trace_memory and tracemalloc.is_tracing():
+            with _lock:
+                current = _fold_peak()
+                self.peak_bytes = current
+                _open_spans.add(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            _current.set(None)  # exited in another context (e.g. a generator resumed elsewhere)
+        with _lock:
+            if self in _open_spans:
+                _fold_peak()
+                _open_spans.discard(self)
+            self.trace.spans.append(self)
+        return False
+
+
+def _fold_peak():
+    """Credit the peak since the last reset to every open span (caller holds _lock)."""
+    current, peak = tracemalloc.get_traced_memory()
+    for span in _open_spans:
+        span.peak_bytes = max(span.peak_bytes or 0, peak)
+    tracemalloc.reset_peak()
+    return current
+
+
+# -------------------- Control --------------------
+def enable(trace_memory=False):
+    global _enabled, _trace_memory
+    _enabled = True
+    _trace_memory = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    global _enabled, _trace_memory
+    _enabled = False
+    if _trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _trace_memory = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Forget the active trace's spans and counters."""
+    trace = _trace()
+    with _lock:
+        trace.spans.clear()
+        trace.counters.clear()
+        trace.epoch = time.perf_counter()
+
+
+# -------------------- Recording --------------------
+def span(name, **attrs):
+    """Context manager timing a block; nests under the enclosing span (also across tasks)."""
+    if not _enabled:
+        return _NO_SPAN
+    return Span(name, attrs)
+
+
+def traced(name=None):
+    """Decorator form of span() for plain functions."""
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(label, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, value=1):
+    if not _enabled:
+        return
+    counters = _trace().counters
+    with _lock:
+        counters[name] = counters.get(name, 0) + value
+
+
+def counters():
+    trace = _trace()
+    with _lock:
+        return dict(trace.counters)
+
+
+def stage_totals():
+    """{span name: {"calls", "seconds", "peak_bytes"}} over all finished spans."""
+    totals = {}
+    trace = _trace()
+    with _lock:
+        spans = list(trace.spans)
+    for s in spans:
+        entry = totals.setdefault(s.name, {"calls": 0, "seconds": 0.0, "peak_bytes": None})
+        entry["calls"] += 1
+        entry["seconds"] += s.duration
+        if s.peak_bytes is not None:
+            entry["peak_bytes"] = max(entry["peak_bytes"] or 0, s.peak_bytes)
+    return totals
+
+
+# -------------------- Export --------------------
+def export_json(path="trace.json"):
+    """
+    Write finished spans in Chrome trace-event format (open it in
+    chrome://tracing or ui.perfetto.dev) plus the counters.
+    """
+    trace = _trace()
+    with _lock:
+        spans = sorted(trace.spans, key=lambda s: s.start)
+        epoch = trace.epoch
+    threads = {name: i for i, name in enumerate(dict.fromkeys(s.thread for s in spans))}
+    events = [
+        {"name": name, "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+        for name, tid in threads.items()
+    ]
+    for s in spans:
+        args = {"id": s.id, "parent": s.parent, **s.attrs}
+        if s.peak_bytes is not None:
+            args["peak_mb"] = round(s.peak_bytes / 2 ** 20, 3)
+        events.append({
+            "name": s.name, "ph": "X", "pid": os.getpid(), "tid": threads[s.thread],
+            "ts": round((s.start - epoch) * 1e6), "dur": round(s.duration * 1e6),
+            "args": {k: v if isinstance(v, (int, float, str, bool, type(None))) else str(v)
+                     for k, v in args.items()},
+        })
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "counters": counters()}, f, indent=2)
+    return path
+
+
+def _metric_name(name):
+    return "".join(c if c.isalnum() else "_" for c in name).strip("_").lower()
+
+
+def export_prometheus(path="metrics.prom", prefix="agent"):
+    """Write stage totals and counters in the Prometheus text exposition format."""
+    totals = stage_totals()
+    lines = [
+        f"# HELP {prefix}_stage_seconds_total Wall time spent in each span.",
+        f"# TYPE {prefix}_stage_seconds_total counter",
+    ]
+    lines += [f'{prefix}_stage_seconds_total{{stage="{name}"}} {t["seconds"]:.6f}' for name, t in totals.items()]
+    lines += [f"# TYPE {prefix}_stage_calls_total counter"]
+    lines += [f'{prefix}_stage_calls_total{{stage="{name}"}} {t["calls"]}' for name, t in totals.items()]
+    peaks = {name: t["peak_bytes"] for name, t in totals.items() if t["peak_bytes"] is not None}
+    if peaks:
+        lines += [f"# TYPE {prefix}_stage_peak_bytes gauge"]
+        lines += [f'{prefix}_stage_peak_bytes{{stage="{name}"}} {peak}' for name, peak in peaks.items()]
+    for name, value in sorted(counters().items()):
+        metric = f"{prefix}_{_metric_name(name)}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def export(directory=".", json_name="trace.json", prom_name="metrics.prom"):
+    """Write both exports to `directory` and print a per-stage summary."""
+    os.makedirs(directory, exist_ok=True)
+    json_path = export_json(os.path.join(directory, json_name))
+    prom_path = export_prometheus(os.path.join(directory, prom_name))
+    for name, t in sorted(stage_totals().items(), key=lambda item: -item[1]["seconds"]):
+        peak = f", peak {t['peak_bytes'] / 2 ** 20:.1f} MB" if t["peak_bytes"] is not None else ""
+        print(f"[⏱] {name}: {t['seconds']:.2f}s over {t['calls']} call(s){peak}")
+    print(f"[✓] Trace saved to {json_path} and {prom_path}")
+    return json_path, prom_path
+
+
+if os.environ.get("AGENT_TRACE", "") not in ("", "0"):
+    enable(trace_memory=os.environ.get("AGENT_TRACE_MEMORY", "") not in ("", "0"))
@@ -0,0 +1,124 @@
+import json
+
+
+class _StreamingJsonWriter:
+    """
+    Writes a JSON container one member at a time with the same layout as
+    json.dump(..., indent=2), so the whole container never sits in memory.
+    """
+
+    brackets = "[]"
+
+    def __init__(self, path, ensure_ascii=True):
+        self.path = path
+        self.ensure_ascii = ensure_ascii
+        self.count = 0
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write(self.brackets[0])
+
+    def _write_member(self, prefix, value):
+        self._file.write("\n  " if not self.count else ",\n  ")
+        body = json.dumps(value, indent=2, ensure_ascii=self.ensure_ascii).replace("\n", "\n  ")
+        self._file.write(prefix + body)
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.write(("\n" if self.count else "") + self.brackets[1])
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JsonArrayWriter(_StreamingJsonWriter):
+    brackets = "[]"
+
+    def append(self, item):
+        self._write_member("", item)
+
+
+class JsonObjectWriter(_StreamingJsonWriter):
+    brackets = "{}"
+
+    def __init__(self, path, ensure_ascii=True):
+        super().__init__(path, ensure_ascii)
+        self._keys = set()
+
+    def add(self, key, value):
+        """
+        Write one member. Keys are written as strings; a None key or a key
+        already written is skipped (the file must stay valid JSON), and
+        False is returned.
+        """
+        if key is None:
+            return False
+        key = str(key)
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        self._write_member(json.dumps(key, ensure_ascii=self.ensure_ascii) + ": ", value)
+        return True
+
+
+def iter_json_array(path, chunk_size=64 * 1024):
+    """
+    Yield the elements of a JSON array file one by one, reading it in chunks,
+    so only the element being decoded has to fit in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof, started = "", 0, False, False
+
+        def refill():
+            nonlocal buf, pos, eof
+            more = f.read(chunk_size)
+            buf, pos, eof = buf[pos:] + more, 0, not more
+
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buf):
+                if eof:
+                    raise ValueError(f"{path}: unexpected end of JSON array")
+                refill()
+                continue
+
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError(f"{path}: not a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                refill()
+                continue
+            # A value ending exactly at the buffer edge may be cut short (e.g. a number)
+            if end == len(buf) and not eof:
+                refill()
+                continue
+            yield value
+            pos = end
+
+
+def iter_entries(path):
+    """Entries of a .jsonl file (one object per line) or of a JSON array file."""
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        yield from iter_json_array(path)
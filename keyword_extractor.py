@@ -1,21 +1,138 @@
-from keybert import KeyBERT
 import json
 
-def extract_keywords(summary_path, output_path="keywords.json"):
-    kw_model = KeyBERT()
-    
+from inference_backends import backend_for, cache_params, load_sentence_transformer
+from instrumentation import span, count
+from model_registry import register, get_model
+from result_cache import ResultCache
+from json_sinks import JsonObjectWriter
+
+# The sentence-transformer KeyBERT() uses by default
+KEYWORD_MODEL = "all-MiniLM-L6-v2"
+
+def _load_keybert():
+    from keybert import KeyBERT
+    if backend_for("embedder") == "eager":
+        return KeyBERT(KEYWORD_MODEL)
+    return KeyBERT(model=load_sentence_transformer(KEYWORD_MODEL))
+
+register("keybert", _load_keybert)
+
+# The sentence-transformer behind KeyBERT, shared with the intent router
+register("embedder", lambda: get_model("keybert").model)
+
+# -------------------- Batched scoring --------------------
+def _normalize(matrix):
+    import numpy as np
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+def _mmr(doc_sims, word_sims, top_n, diversity):
+    import numpy as np
+    selected = [int(np.argmax(doc_sims))]
+    candidates = [i for i in range(len(doc_sims)) if i != selected[0]]
+    while candidates and len(selected) < top_n:
+        redundancy = word_sims[np.ix_(candidates, selected)].max(axis=1)
+        scores = (1 - diversity) * doc_sims[candidates] - diversity * redundancy
+        selected.append(candidates.pop(int(np.argmax(scores))))
+    return selected
+
+def extract_keywords_batch(texts, top_n=5, use_mmr=False, diversity=0.5):
+    """
+    Keywords for many documents with a few large embedding calls.
+
+    Same candidates and scoring as KeyBERT.extract_keywords (single words,
+    English stop words removed, cosine similarity to the document), but all
+    documents are embedded in one call and every distinct candidate word across
+    all documents in another, then scored with matrix products.
+    """
+    import numpy as np
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    results = [[] for _ in texts]
+    doc_indices = [i for i, text in enumerate(texts) if text and text.strip()]
+    if not doc_indices:
+        return results
+    docs = [texts[i] for i in doc_indices]
+
+    vectorizer = CountVectorizer(ngram_range=(1, 1), stop_words="english")
+    try:
+        doc_terms = vectorizer.fit_transform(docs)
+    except ValueError:  # only stop words / no tokens anywhere
+        return results
+    vocabulary = vectorizer.get_feature_names_out()
+
+    embedder = get_model("keybert").model
+    with span("keywords.embed", docs=len(docs), words=len(vocabulary)):
+        doc_embeddings = _normalize(np.asarray(embedder.embed(docs)))
+        word_embeddings = _normalize(np.asarray(embedder.embed(list(vocabulary))))
+
+    for row, doc_index in enumerate(doc_indices):
+        candidates = doc_terms[row].nonzero()[1]
+        if len(candidates) == 0:
+            continue
+        candidate_embeddings = word_embeddings[candidates]
+        doc_sims = candidate_embeddings @ doc_embeddings[row]
+        if use_mmr:
+            order = _mmr(doc_sims, candidate_embeddings @ candidate_embeddings.T, top_n, diversity)
+        else:
+            order = np.argsort(-doc_sims, kind="stable")[:top_n]
+        results[doc_index] = [str(vocabulary[candidates[i]]) for i in order]
+    return results
+
+# -------------------- Cached extraction --------------------
+_cache = None
+
+def get_keyword_cache():
+    global _cache
+    if _cache is None:
+        _cache = ResultCache("keywords", KEYWORD_MODEL)
+    return _cache
+
+def keywords_for_texts(texts, top_n=5, use_mmr=False, diversity=0.5, stats=None):
+    """
+    Keywords per text: cached results first, one batched model pass for the
+    rest. With a `stats` dict, the "cached" and "computed" counts are added to it.
+    """
+    cache = get_keyword_cache()
+    params = {"top_n": top_n, "diversity": diversity} if use_mmr else {"top_n": top_n}
+    params.update(cache_params("embedder"))
+    keywords_list = cache.get_many(texts, **params)
+
+    missing = [i for i, keywords in enumerate(keywords_list) if keywords is None]
+    count("keyword_cache_hits", len(texts) - len(missing))
+    if stats is not None:
+        stats["cached"] = stats.get("cached", 0) + len(texts) - len(missing)
+        stats["computed"] = stats.get("computed", 0) + len(missing)
+    if missing:
+        # The model is only loaded when something actually needs extracting
+        fresh = extract_keywords_batch([texts[i] for i in missing], top_n, use_mmr, diversity)
+        for i, keywords in zip(missing, fresh):
+            keywords_list[i] = keywords
+        cache.put_many([(texts[i], keywords) for i, keywords in zip(missing, fresh)], **params)
+    return keywords_list
+
+def keyword_settings(top_n=5, use_mmr=False, diversity=0.5):
+    """Everything besides the summaries that decides the keywords (for stage hashes)."""
+    return {"model": KEYWORD_MODEL, "top_n": top_n, "use_mmr": use_mmr, "diversity": diversity,
+            **cache_params("embedder")}
+
+
+def extract_keywords(summary_path, output_path="keywords.json", top_n=5, use_mmr=False, diversity=0.5,
+                     group_size=256):
     with open(summary_path, "r", encoding="utf-8") as f:
         summaries = json.load(f)
-    
-    results = {}
-    for entry in summaries:
-        url = entry.get("url")
-        summary = entry.get("summary", "")
-        keywords = [kw[0] for kw in kw_model.extract_keywords(summary, top_n=5)]
-        results[url] = keywords
-
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+    # As with the dict this file used to be dumped from: one entry per URL, the last one wins
+    last = {entry.get("url"): i for i, entry in enumerate(summaries)}
+    summaries = [entry for i, entry in enumerate(summaries)
+                 if entry.get("url") is not None and last[entry["url"]] == i]
+
+    # Entries are written group by group instead of building the whole dict first
+    with JsonObjectWriter(output_path, ensure_ascii=False) as writer:
+        for start in range(0, len(summaries), group_size):
+            group = summaries[start:start + group_size]
+            texts = [entry.get("summary", "") for entry in group]
+            for entry, keywords in zip(group, keywords_for_texts(texts, top_n, use_mmr, diversity)):
+                writer.add(entry.get("url"), keywords)
 
     print(f"[✓] Keywords saved to {output_path}")
     return output_path  # 🛠️ THIS LINE WAS MISSING
@@ -1,7 +1,66 @@
 # main.py
+import argparse
+import os
 from task_handler import route_instruction
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Autonomous AI agent REPL")
+    parser.add_argument("--warm-up", action="store_true",
+                        help="load the summarizer, keyword and intent models in the background at startup")
+    parser.add_argument("--trace", action="store_true",
+                        help="record per-stage spans and counters; each web run writes trace.json and metrics.prom")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="with --trace, also record tracemalloc peaks per stage")
+    parser.add_argument("--serve", action="store_true",
+                        help="run as a daemon serving the job API instead of the REPL")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="--serve: address to bind (loopback only by default)")
+    parser.add_argument("--allow-remote", action="store_true",
+                        help="--serve: allow a non-loopback --host; the job API has no authentication")
+    parser.add_argument("--port", type=int, default=8700, help="--serve: port to listen on")
+    parser.add_argument("--workers", type=int, default=2, help="--serve: jobs run concurrently")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="run every instruction in FILE as one batch (see batch_runner.py) and exit")
+    parser.add_argument("--batch-output", default="batch_reports", help="--batch: directory for the reports")
+    parser.add_argument("--backend", choices=["eager", "int8", "onnx", "onnx-int8"],
+                        help="inference backend for every model (see inference_backends.py)")
+    parser.add_argument("--summarizer-backend", choices=["eager", "int8", "onnx", "onnx-int8"],
+                        help="inference backend for the summarizer only")
+    parser.add_argument("--threads", type=int, help="CPU threads per model call")
+    parser.add_argument("--pdf-workers", type=int,
+                        help="processes rendering long PDF reports (default: one per core, at most 4)")
+    args = parser.parse_args()
+
+    # Thread pools are sized once, before any model (and torch) is loaded
+    threads = args.threads or os.environ.get("AGENT_NUM_THREADS")
+    if args.backend or args.summarizer_backend or threads:
+        from inference_backends import configure
+        configure(args.backend, threads, summarizer=args.summarizer_backend)
+
+    if args.pdf_workers is not None:
+        os.environ["AGENT_PDF_WORKERS"] = str(args.pdf_workers)
+
+    if args.trace or args.trace_memory:
+        from instrumentation import enable
+        enable(trace_memory=args.trace_memory)
+
+    if args.warm_up:
+        from model_registry import warm_up
+        warm_up(["summarizer", "keybert", "embedder"])
+
+    if args.batch:
+        from batch_runner import run_batch, read_instructions
+        run_batch(read_instructions(args.batch), args.batch_output)
+        raise SystemExit(0)
+
+    if args.serve:
+        from agent_server import serve
+        try:
+            serve(args.host, args.port, args.workers, allow_remote=args.allow_remote)
+        except ValueError as e:
+            parser.error(str(e))
+        raise SystemExit(0)
+
     while True:
         user_input = input(" Enter instruction ('exit' to quit): ")
         if user_input.lower() == "exit":
@@ -0,0 +1,268 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+from instrumentation import count
+
+# Main-content extraction: keep the paragraphs of the article body and drop
+# page chrome (cookie banners, comment threads, related-article teasers,
+# footers). Blocks are scored by how much non-link text their paragraphs
+# carry; the winning block's path is remembered per domain, and once a domain
+# has settled on one layout later pages take that block, as long as it still
+# scores close to the best block of the page (a redesign re-learns).
+
+TEMPLATE_PATH = ".content_templates/templates.db"
+TEMPLATE_MIN_WINS = 3       # pages a path must win before it is trusted
+TEMPLATE_MIN_SHARE = 0.6    # ... and the share of the domain's pages it won
+TEMPLATE_MIN_SCORE = 0.5    # a template block scoring below this share of the best block is stale
+MIN_SCORED_CHARS = 25       # shorter paragraphs do not vote for a block
+MAX_LINK_DENSITY = 0.33     # paragraphs that are mostly links are navigation
+SIBLING_SHARE = 0.2         # siblings scoring this share of the best block join it
+DOMINANT_SHARE = 0.5        # a content-looking block with this share of the paragraph text is kept
+
+_DROP_TAGS = {"nav", "footer", "header", "aside", "form", "script", "style", "noscript",
+              "template", "iframe", "button", "select", "dialog"}
+_KEEP_TAGS = {"html", "body", "main", "article"}
+# The negative hints match whole class/id tokens ("share-bar", not "shareholders")
+_TOKEN_SPLIT = re.compile(r"[\s_-]+")
+# Chrome, unless the block also looks like content and holds most of the page's text
+_STRONG_NEGATIVE = re.compile(
+    r"(?:comment|cookie|consent|gdpr|related|share|sharing|social|newsletter|subscribe|promo|sponsor"
+    r"|ad|advert|advertisement|popup|modal|disqus|outbrain|taboola|recommend|recommended"
+    r"|recommendation)s?")
+# Chrome unless the class also looks like content ("content-header" stays)
+_WEAK_NEGATIVE = re.compile(
+    r"(?:sidebar|footer|header|masthead|nav|navbar|navigation|menu|breadcrumb|widget|banner|meta|tag"
+    r"|author|byline)s?")
+_POSITIVE = re.compile(r"article|body|content|entry|main|post|story|text|blog", re.I)
+
+
+# -------------------- Template store --------------------
+class TemplateStore:
+    """Per-domain counts of which block path held the main content."""
+
+    def __init__(self, path=TEMPLATE_PATH):
+        self._lock = threading.Lock()
+        self._best = {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS templates (
+                    domain TEXT,
+                    path TEXT,
+                    wins INTEGER,
+                    last_seen REAL,
+                    PRIMARY KEY (domain, path)
+                )
+            """)
+            self._db.commit()
+
+    def template(self, domain):
+        """The trusted block path for `domain`, or None while it is still learning."""
+        with self._lock:
+            if domain not in self._best:
+                rows = self._db.execute(
+                    "SELECT path, wins FROM templates WHERE domain = ? ORDER BY wins DESC", (domain,)
+                ).fetchall()
+                total = sum(wins for _, wins in rows)
+                path = None
+                if rows and rows[0][1] >= TEMPLATE_MIN_WINS and rows[0][1] >= TEMPLATE_MIN_SHARE * total:
+                    path = rows[0][0]
+                self._best[domain] = path
+            return self._best[domain]
+
+    def record(self, domain, path):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO templates VALUES (?, ?, 1, ?) "
+                "ON CONFLICT (domain, path) DO UPDATE SET wins = wins + 1, last_seen = excluded.last_seen",
+                (domain, path, time.time()),
+            )
+            self._db.commit()
+            self._best.pop(domain, None)
+
+    def forget(self, domain):
+        """Drop a domain's template, e.g. after a redesign made it stop matching."""
+        with self._lock:
+            self._db.execute("DELETE FROM templates WHERE domain = ?", (domain,))
+            self._db.commit()
+            self._best.pop(domain, None)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_template_store(**kwargs):
+    """Return the process-wide TemplateStore, creating it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TemplateStore(**kwargs)
+    return _store
+
+
+# -------------------- Scoring --------------------
+def _text_len(el):
+    return len(" ".join(el.text_content().split()))
+
+
+def _link_density(el, length=None):
+    length = _text_len(el) if length is None else length
+    if not length:
+        return 1.0
+    return min(1.0, sum(_text_len(a) for a in el.iter("a")) / length)
+
+
+def _hints(el):
+    return f"{el.get('class', '')} {el.get('id', '')}"
+
+
+def _has_token(pattern, hints):
+    return any(pattern.fullmatch(token) for token in _TOKEN_SPLIT.split(hints.lower()) if token)
+
+
+def _paragraph_chars(el):
+    return sum(_text_len(p) for p in el.iter("p"))
+
+
+def _is_chrome(el, page_chars):
+    if el.tag in _DROP_TAGS:
+        return True
+    if el.tag in _KEEP_TAGS:
+        return False
+    hints = _hints(el)
+    if not hints.strip():
+        return False
+    if _has_token(_STRONG_NEGATIVE, hints):
+        # "post share-enabled" wrapping the whole article is not a share bar
+        return not (_POSITIVE.search(hints) and _paragraph_chars(el) > DOMINANT_SHARE * page_chars)
+    return _has_token(_WEAK_NEGATIVE, hints) and not _POSITIVE.search(hints)
+
+
+def _strip_chrome(root):
+    page_chars = _paragraph_chars(root)
+    doomed = [el for el in root.iter() if isinstance(el.tag, str) and _is_chrome(el, page_chars)]
+    for el in doomed:
+        if el.getparent() is not None:
+            el.drop_tree()
+
+
+def _class_weight(el):
+    hints = _hints(el)
+    weight = 1.0
+    if _POSITIVE.search(hints):
+        weight += 0.25
+    if _has_token(_WEAK_NEGATIVE, hints) or _has_token(_STRONG_NEGATIVE, hints):
+        weight -= 0.25
+    return weight
+
+
+def _score_blocks(root):
+    """{block element: score} from the paragraphs each block contains."""
+    scores = {}
+    for p in root.iter("p"):
+        length = _text_len(p)
+        if length < MIN_SCORED_CHARS:
+            continue
+        text = p.text_content()
+        score = (1 + text.count(",") + min(length / 100, 3)) * (1 - _link_density(p, length))
+        parent = p.getparent()
+        for share in (1.0, 0.5):
+            if parent is None or not isinstance(parent.tag, str):
+                break
+            scores[parent] = scores.get(parent, 0.0) + score * share
+            parent = parent.getparent()
+    return {el: score * _class_weight(el) * (1 - _link_density(el)) for el, score in scores.items()}
+
+
+def _pick_blocks(scores):
+    best = max(scores, key=scores.get)
+    parent = best.getparent()
+    if parent is None:
+        return best, [best]
+    threshold = scores[best] * SIBLING_SHARE
+    blocks = [child for child in parent if child is best or scores.get(child, 0.0) >= threshold]
+    return best, blocks
+
+
+# -------------------- Templates --------------------
+def _signature(el):
+    if el.get("id"):
+        return f"{el.tag}#{el.get('id')}"
+    classes = ".".join(sorted(el.get("class", "").split()))
+    return f"{el.tag}.{classes}" if classes else el.tag
+
+
+def block_path(el):
+    """Position-independent path like 'body>div#page>article.post'."""
+    steps = []
+    while el is not None and el.tag != "html":
+        steps.append(_signature(el))
+        el = el.getparent()
+    return ">".join(reversed(steps))
+
+
+def _follow(root, path):
+    el = root
+    for step in path.split(">"):
+        el = next((child for child in el if isinstance(child.tag, str) and _signature(child) == step), None)
+        if el is None:
+            return None
+    return el
+
+
+def _template_blocks(root, path):
+    block = _follow(root, path)
+    if block is None:
+        return None
+    signature = _signature(block)
+    parent = block.getparent()
+    if parent is None:
+        return [block]
+    # Articles split into several same-class sections keep all of them
+    return [child for child in parent if isinstance(child.tag, str) and _signature(child) == signature]
+
+
+def _paragraphs(blocks):
+    return [p for block in blocks for p in block.iter("p") if _link_density(p) < MAX_LINK_DENSITY]
+
+
+def domain_of(url):
+    host = (urlsplit(url or "").hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def select_main_paragraphs(root, url=None, store=None, learn=True):
+    """
+    <p> elements of the main content of a parsed (lxml) page, in document
+    order. The page tree is modified: chrome subtrees are removed. Returns []
+    when nothing looks like an article body.
+    """
+    domain = domain_of(url)
+    store = store if store is not None else (get_template_store() if domain else None)
+
+    _strip_chrome(root)
+    scores = _score_blocks(root)
+    path = store.template(domain) if store is not None else None
+    if path is not None:
+        blocks = _template_blocks(root, path)
+        if blocks:
+            paragraphs = _paragraphs(blocks)
+            # After a redesign the old block may still exist but no longer hold the article
+            template_score = max(scores.get(block, 0.0) for block in blocks)
+            if paragraphs and template_score >= TEMPLATE_MIN_SCORE * max(scores.values(), default=0.0):
+                count("main_content_template_hits")
+                return paragraphs
+        count("main_content_template_misses")
+
+    if not scores:
+        return []
+    best, blocks = _pick_blocks(scores)
+    if learn and store is not None:
+        store.record(domain, block_path(best))
+    return _paragraphs(blocks)
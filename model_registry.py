@@ -0,0 +1,69 @@
+import importlib
+import threading
+
+# Models are built on first use instead of at import time, so commands that
+# never touch a model (terminal instructions, cached results) don't pay for it.
+
+# Module that registers each well-known model, imported on demand
+_PROVIDERS = {
+    "summarizer": "summarizer",
+    "keybert": "keyword_extractor",
+    "embedder": "keyword_extractor",
+}
+
+_factories = {}
+_models = {}
+_model_locks = {}
+_lock = threading.Lock()
+
+
+def register(name, factory):
+    """Register (or replace) the zero-argument factory that builds model `name`."""
+    with _lock:
+        _factories[name] = factory
+        _models.pop(name, None)
+        _model_locks.setdefault(name, threading.Lock())
+
+
+def _factory_for(name):
+    if name not in _factories and name in _PROVIDERS:
+        importlib.import_module(_PROVIDERS[name])
+    if name not in _factories:
+        raise KeyError(f"No model registered under '{name}'")
+    return _factories[name], _model_locks[name]
+
+
+def get_model(name):
+    """Return model `name`, loading it on the first call."""
+    model = _models.get(name)
+    if model is not None:
+        return model
+    factory, model_lock = _factory_for(name)
+    with model_lock:
+        if name not in _models:
+            print(f"[+] Loading model '{name}'...")
+            _models[name] = factory()
+        return _models[name]
+
+
+def is_loaded(name):
+    return name in _models
+
+
+def warm_up(names=None, background=True):
+    """Load `names` (default: every known model) now, optionally on a daemon thread."""
+    names = list(names or (_PROVIDERS.keys() | _factories.keys()))
+
+    def load_all():
+        for name in names:
+            try:
+                get_model(name)
+            except Exception as e:
+                print(f"[⚠️] Warm-up failed for '{name}': {e}")
+
+    if not background:
+        load_all()
+        return None
+    thread = threading.Thread(target=load_all, name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,173 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from functools import lru_cache
+
+from instrumentation import count
+
+# Syndicated and mirrored articles (one wire story on five news sites) are
+# grouped by MinHash similarity of their word shingles. An LSH index over
+# the signatures lives on disk, so pages keep their group across runs.
+# Within a run the first page of a group is summarized (from its own text)
+# and the later ones point at it.
+
+INDEX_PATH = ".dedup/minhash.db"
+NUM_PERM = 128
+BANDS = 16                 # 16 bands x 8 rows: pairs above ~0.7 Jaccard almost always collide
+SHINGLE_WORDS = 5
+DUPLICATE_THRESHOLD = 0.8  # estimated Jaccard similarity that counts as the same article
+MAX_DOCS = 50000
+
+_PRIME = 4294967311  # smallest prime above 2**32
+_WORD = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=1)
+def _permutations():
+    # numpy is imported on first use, not at startup
+    import numpy as np
+    rng = np.random.RandomState(1)
+    return (rng.randint(1, 2 ** 32, size=NUM_PERM, dtype=np.uint64),
+            rng.randint(0, 2 ** 32, size=NUM_PERM, dtype=np.uint64))
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    words = _WORD.findall(text.lower())
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(text):
+    """MinHash signature (uint32 array) of `text`, or None when it is too short to compare."""
+    import numpy as np
+    grams = shingles(text)
+    if not grams:
+        return None
+    a, b = _permutations()
+    hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+    # (a * x + b) mod p for every permutation at once; a, x < 2**32 keeps it inside uint64
+    permuted = ((hashes[:, None] * a) % _PRIME + b) % _PRIME
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return float((sig_a == sig_b).sum()) / len(sig_a)
+
+
+def _band_keys(signature):
+    rows = len(signature) // BANDS
+    return [(band, zlib.crc32(signature[band * rows:(band + 1) * rows].tobytes())) for band in range(BANDS)]
+
+
+class DuplicateIndex:
+    """
+    Persistent LSH index of page signatures, grouped into clusters of
+    near-duplicates. Safe to share between threads.
+    """
+
+    def __init__(self, path=INDEX_PATH, threshold=DUPLICATE_THRESHOLD, max_docs=MAX_DOCS):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS clusters (
+                    id INTEGER PRIMARY KEY,
+                    url TEXT
+                );
+                CREATE TABLE IF NOT EXISTS docs (
+                    url TEXT PRIMARY KEY,
+                    cluster INTEGER,
+                    signature BLOB,
+                    last_seen REAL
+                );
+                CREATE INDEX IF NOT EXISTS docs_seen ON docs (last_seen);
+                CREATE TABLE IF NOT EXISTS bands (
+                    band INTEGER,
+                    bucket INTEGER,
+                    url TEXT,
+                    PRIMARY KEY (band, bucket, url)
+                ) WITHOUT ROWID;
+            """)
+            self._prune(max_docs)
+            self._db.commit()
+
+    def _prune(self, max_docs):
+        stale = [url for (url,) in self._db.execute(
+            "SELECT url FROM docs ORDER BY last_seen DESC LIMIT -1 OFFSET ?", (max_docs,))]
+        for url in stale:
+            self._db.execute("DELETE FROM docs WHERE url = ?", (url,))
+            self._db.execute("DELETE FROM bands WHERE url = ?", (url,))
+        if stale:
+            self._db.execute("DELETE FROM clusters WHERE id NOT IN (SELECT cluster FROM docs)")
+
+    def _match(self, signature):
+        import numpy as np
+        candidates = set()
+        for band, bucket in _band_keys(signature):
+            candidates.update(u for (u,) in self._db.execute(
+                "SELECT url FROM bands WHERE band = ? AND bucket = ?", (band, bucket)))
+        best, best_score = None, self.threshold
+        for candidate in candidates:
+            cluster, blob = self._db.execute(
+                "SELECT cluster, signature FROM docs WHERE url = ?", (candidate,)).fetchone()
+            score = similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            if score >= best_score:
+                best, best_score = cluster, score
+        return best
+
+    def add(self, url, signature):
+        """Index a page and return the id of its cluster."""
+        with self._lock:
+            cluster = self._match(signature)
+            if cluster is None:
+                cluster = self._db.execute("INSERT INTO clusters (url) VALUES (?)", (url,)).lastrowid
+            self._db.execute("DELETE FROM bands WHERE url = ?", (url,))
+            self._db.execute("INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?)",
+                             (url, cluster, signature.tobytes(), time.time()))
+            self._db.executemany("INSERT OR IGNORE INTO bands VALUES (?, ?, ?)",
+                                 [(band, bucket, url) for band, bucket in _band_keys(signature)])
+            self._db.commit()
+        return cluster
+
+
+class RunDeduplicator:
+    """
+    Groups one run's pages: the first page of each cluster in the run is its
+    canonical source, later ones are duplicates of it.
+    """
+
+    def __init__(self, index=None):
+        self.index = index if index is not None else get_duplicate_index()
+        self.canonical = {}   # cluster id -> canonical url in this run
+        self.duplicates = 0
+
+    def check(self, url, text):
+        """The canonical url a scraped page repeats, or None when it is the first of its group."""
+        signature = minhash(text)
+        if signature is None:
+            return None
+        cluster = self.index.add(url, signature)
+        canonical = self.canonical.setdefault(cluster, url)
+        if canonical == url:
+            return None
+        self.duplicates += 1
+        count("near_duplicates")
+        return canonical
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_duplicate_index(**kwargs):
+    """Return the process-wide DuplicateIndex, creating it on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = DuplicateIndex(**kwargs)
+    return _index
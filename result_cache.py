@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def make_key(text, model, params):
+    payload = json.dumps([model, sorted(params.items())], default=str)
+    digest = hashlib.sha256(payload.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Disk-backed cache for model outputs (summaries, keywords, ...).
+
+    Results are keyed by a hash of the input text, the model name and the
+    generation parameters, and grouped by `namespace`. Opening a namespace
+    with a different model name drops the entries produced by the old model.
+    Each namespace keeps at most `max_entries`, evicting least recently used.
+    """
+
+    def __init__(self, namespace, model, path=".result_cache/results.db", max_entries=20000):
+        self.namespace = namespace
+        self.model = model
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT,
+                    model TEXT,
+                    value TEXT,
+                    last_access REAL
+                );
+                CREATE INDEX IF NOT EXISTS results_lru ON results (namespace, last_access);
+            """)
+            self._db.execute(
+                "DELETE FROM results WHERE namespace = ? AND model != ?", (namespace, model)
+            )
+            self._db.commit()
+
+    def get_many(self, texts, **params):
+        """Cached values for `texts` (None where missing), in the same order."""
+        keys = [make_key(text, self.model, params) for text in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, value FROM results WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._db.executemany(
+                    "UPDATE results SET last_access = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._db.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return [json.loads(found[key]) if key in found else None for key in keys]
+
+    def get(self, text, **params):
+        return self.get_many([text], **params)[0]
+
+    def put_many(self, items, **params):
+        """Store (text, value) pairs computed with `params`."""
+        now = time.time()
+        rows = [
+            (make_key(text, self.model, params), self.namespace, self.model, json.dumps(value), now)
+            for text, value in items
+        ]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", rows)
+            self._evict()
+            self._db.commit()
+
+    def put(self, text, value, **params):
+        self.put_many([(text, value)], **params)
+
+    def _evict(self):
+        count = self._db.execute(
+            "SELECT COUNT(*) FROM results WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM results WHERE key IN ("
+                " SELECT key FROM results WHERE namespace = ? ORDER BY last_access LIMIT ?)",
+                (self.namespace, count - self.max_entries),
+            )
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
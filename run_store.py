@@ -0,0 +1,541 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+from json_sinks import JsonArrayWriter, JsonObjectWriter
+
+# Every run's results live in one SQLite file instead of fixed JSON files in
+# the working directory. Runs are keyed by id, so concurrent runs never touch
+# each other's rows; page text and the bulky per-page details (tables, image
+# paths, pros/cons) are zlib-compressed and stored once per content hash.
+# Streamed results are written in batches, and only the newest MAX_RUNS runs
+# (plus the blobs they use) are kept.
+
+STORE_PATH = ".runs/runs.db"
+MAX_RUNS = 500
+STALE_RUNNING = 24 * 3600  # "running" runs older than this were left by a crashed process
+SINK_BATCH = 32            # streamed rows per table written per commit
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        id TEXT PRIMARY KEY,
+        query TEXT,
+        commands TEXT,
+        workdir TEXT,
+        status TEXT,
+        created REAL,
+        finished REAL
+    );
+    CREATE INDEX IF NOT EXISTS runs_created ON runs (workdir, created);
+    CREATE TABLE IF NOT EXISTS blobs (
+        hash TEXT PRIMARY KEY,
+        data BLOB
+    );
+    CREATE TABLE IF NOT EXISTS search_results (
+        run_id TEXT,
+        rank INTEGER,
+        url TEXT,
+        PRIMARY KEY (run_id, rank)
+    );
+    CREATE TABLE IF NOT EXISTS pages (
+        run_id TEXT,
+        seq INTEGER,
+        url TEXT,
+        text_hash TEXT,
+        details_hash TEXT,
+        PRIMARY KEY (run_id, url)
+    );
+    CREATE INDEX IF NOT EXISTS pages_url ON pages (url);
+    CREATE INDEX IF NOT EXISTS pages_text ON pages (text_hash);
+    CREATE TABLE IF NOT EXISTS summaries (
+        run_id TEXT,
+        seq INTEGER,
+        url TEXT,
+        summary TEXT,
+        PRIMARY KEY (run_id, url)
+    );
+    CREATE INDEX IF NOT EXISTS summaries_url ON summaries (url);
+    CREATE TABLE IF NOT EXISTS headlines (
+        run_id TEXT,
+        seq INTEGER,
+        url TEXT,
+        headline TEXT,
+        PRIMARY KEY (run_id, url)
+    );
+    CREATE TABLE IF NOT EXISTS keywords (
+        run_id TEXT,
+        seq INTEGER,
+        url TEXT,
+        keywords TEXT,
+        PRIMARY KEY (run_id, url)
+    );
+    CREATE TABLE IF NOT EXISTS duplicates (
+        run_id TEXT,
+        url TEXT,
+        canonical TEXT,
+        PRIMARY KEY (run_id, url)
+    );
+    CREATE TABLE IF NOT EXISTS stages (
+        run_id TEXT,
+        stage TEXT,
+        input_hash TEXT,
+        output_hash TEXT,
+        status TEXT,
+        entries INTEGER,
+        recomputed INTEGER,
+        created REAL,
+        PRIMARY KEY (run_id, stage)
+    );
+    CREATE INDEX IF NOT EXISTS stages_input ON stages (stage, input_hash);
+"""
+
+# Per-page fields kept in the compressed details blob
+_DETAIL_FIELDS = ("images", "pros", "cons", "table_rows", "tables")
+
+# Tables holding per-run rows
+_RUN_TABLES = ("search_results", "pages", "summaries", "headlines", "keywords", "duplicates", "stages")
+
+# Stage name -> table that proves the stage produced something
+_STAGE_TABLES = {"search": "search_results", "scrape": "pages", "summarize": "summaries",
+                 "headlines": "headlines", "extract_keywords": "keywords"}
+
+# Rows that make up a stage's output, in an order that does not depend on
+# which page finished first (summaries keep theirs: it is the report order)
+_DIGEST_QUERIES = {
+    "search": "SELECT url FROM search_results WHERE run_id = ? ORDER BY rank",
+    "scrape": "SELECT url, text_hash, details_hash FROM pages WHERE run_id = ? ORDER BY url",
+    "summarize": "SELECT url, summary FROM summaries WHERE run_id = ? ORDER BY seq",
+    "headlines": "SELECT url, headline FROM headlines WHERE run_id = ? ORDER BY url",
+    "extract_keywords": "SELECT url, keywords FROM keywords WHERE run_id = ? ORDER BY url",
+    "duplicates": "SELECT url, canonical FROM duplicates WHERE run_id = ? ORDER BY url",
+}
+
+
+class RunStore:
+    """SQLite store for pipeline runs; safe to share between threads and processes."""
+
+    def __init__(self, path=STORE_PATH, max_runs=MAX_RUNS):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # WAL keeps the store consistent without a sync on every commit
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+            self._db.commit()
+        self.prune(max_runs)
+
+    def prune(self, keep=MAX_RUNS):
+        """Delete all but the newest `keep` runs and the blobs no remaining page uses."""
+        with self._lock:
+            stale = [run_id for (run_id,) in self._db.execute(
+                "SELECT id FROM runs WHERE status != 'running' OR created < ? "
+                "ORDER BY created DESC LIMIT -1 OFFSET ?", (time.time() - STALE_RUNNING, keep))]
+            for run_id in stale:
+                for table in _RUN_TABLES:
+                    self._db.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+                self._db.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+            if stale:
+                self._db.execute(
+                    "DELETE FROM blobs WHERE hash NOT IN (SELECT text_hash FROM pages) "
+                    "AND hash NOT IN (SELECT details_hash FROM pages)"
+                )
+            self._db.commit()
+        return len(stale)
+
+    # -------------------- Blobs --------------------
+    def _put_blob(self, data):
+        """Compress and store `data` (bytes) once; returns its content hash."""
+        digest = hashlib.sha256(data).hexdigest()
+        self._db.execute("INSERT OR IGNORE INTO blobs VALUES (?, ?)", (digest, zlib.compress(data, 6)))
+        return digest
+
+    def _get_blob(self, digest):
+        row = self._db.execute("SELECT data FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        return zlib.decompress(row[0]) if row else None
+
+    def _write(self, sql_rows):
+        with self._lock:
+            for sql, params in sql_rows:
+                self._db.execute(sql, params)
+            self._db.commit()
+
+    def _next_seq(self, table, run_id):
+        # Past the highest seq, not the row count: a URL written again replaces its row under a new
+        # seq, so the count can fall behind and hand out a seq that is already taken
+        return self._db.execute(
+            f"SELECT COALESCE(MAX(seq), -1) + 1 FROM {table} WHERE run_id = ?", (run_id,)
+        ).fetchone()[0]
+
+    # -------------------- Runs --------------------
+    def create_run(self, query, commands=(), workdir="."):
+        run_id = uuid.uuid4().hex[:12]
+        self._write([(
+            "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (run_id, query, json.dumps(list(commands)), os.path.abspath(workdir), "running", time.time(), None),
+        )])
+        return run_id
+
+    def finish_run(self, run_id, status="done"):
+        self._write([("UPDATE runs SET status = ?, finished = ? WHERE id = ?", (status, time.time(), run_id))])
+
+    def get_run(self, run_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, query, commands, workdir, status, created, finished FROM runs WHERE id = ?", (run_id,)
+            ).fetchone()
+        return _run_dict(row) if row else None
+
+    def list_runs(self, limit=20):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, query, commands, workdir, status, created, finished FROM runs "
+                "ORDER BY created DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [_run_dict(row) for row in rows]
+
+    def latest_run(self, stage=None, workdir=None, exclude=None):
+        """Newest finished run (optionally: in `workdir`, with output for `stage`, other than `exclude`)."""
+        # Running runs are still being written and failed ones may hold only part of their output
+        sql = "SELECT id FROM runs r WHERE status = 'done'"
+        params = []
+        if workdir is not None:
+            sql += " AND workdir = ?"
+            params.append(os.path.abspath(workdir))
+        if exclude is not None:
+            sql += " AND id != ?"
+            params.append(exclude)
+        if stage is not None:
+            sql += f" AND EXISTS (SELECT 1 FROM {_STAGE_TABLES[stage]} t WHERE t.run_id = r.id)"
+        sql += " ORDER BY created DESC LIMIT 1"
+        with self._lock:
+            row = self._db.execute(sql, params).fetchone()
+        return row[0] if row else None
+
+    # -------------------- Writing --------------------
+    def add_search_results(self, run_id, urls):
+        self._write([("INSERT OR REPLACE INTO search_results VALUES (?, ?, ?)", (run_id, rank, url))
+                     for rank, url in enumerate(urls)])
+
+    def add_pages(self, run_id, items):
+        with self._lock:
+            seq = self._next_seq("pages", run_id)
+            for offset, item in enumerate(items):
+                text = item.get("text", "").encode("utf-8")
+                details = json.dumps({k: item[k] for k in _DETAIL_FIELDS if k in item},
+                                     sort_keys=True).encode("utf-8")
+                self._db.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                    (run_id, seq + offset, item["url"], self._put_blob(text), self._put_blob(details)),
+                )
+            self._db.commit()
+
+    def _add_rows(self, table, run_id, rows):
+        """Append (url, value) rows in one transaction."""
+        with self._lock:
+            seq = self._next_seq(table, run_id)
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?)",
+                [(run_id, seq + offset, url, value) for offset, (url, value) in enumerate(rows)],
+            )
+            self._db.commit()
+
+    def add_summaries(self, run_id, entries):
+        # Images, pros/cons and tables are already stored with the page
+        self._add_rows("summaries", run_id, [(entry["url"], entry["summary"]) for entry in entries])
+
+    def add_headlines(self, run_id, headlines):
+        self._add_rows("headlines", run_id, [(h["url"], h["headline"]) for h in headlines])
+
+    def add_keyword_rows(self, run_id, rows):
+        """Store (url, keywords) rows."""
+        self._add_rows("keywords", run_id,
+                       [(url, json.dumps(keywords, ensure_ascii=False)) for url, keywords in rows])
+
+    def add_duplicates(self, run_id, rows):
+        """Store (near-duplicate url, canonical url) rows."""
+        self._write([("INSERT OR REPLACE INTO duplicates VALUES (?, ?, ?)", (run_id, url, canonical))
+                     for url, canonical in rows])
+
+    def add_page(self, run_id, item):
+        self.add_pages(run_id, [item])
+
+    def add_summary(self, run_id, entry):
+        self.add_summaries(run_id, [entry])
+
+    def add_headline(self, run_id, headline):
+        self.add_headlines(run_id, [headline])
+
+    def add_keywords(self, run_id, url, keywords):
+        self.add_keyword_rows(run_id, [(url, keywords)])
+
+    def add_duplicate(self, run_id, url, canonical):
+        self.add_duplicates(run_id, [(url, canonical)])
+
+    # -------------------- Reading --------------------
+    def search_results(self, run_id):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT url FROM search_results WHERE run_id = ? ORDER BY rank", (run_id,)
+            ).fetchall()
+        return [url for (url,) in rows]
+
+    def _page_details(self, run_id, url):
+        row = self._db.execute(
+            "SELECT details_hash FROM pages WHERE run_id = ? AND url = ?", (run_id, url)
+        ).fetchone()
+        return json.loads(self._get_blob(row[0])) if row else {}
+
+    def iter_pages(self, run_id, with_text=True):
+        """Scraped items of a run, in the order they were stored, one at a time."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT url, text_hash, details_hash FROM pages WHERE run_id = ? ORDER BY seq", (run_id,)
+            ).fetchall()
+        for url, text_hash, details_hash in rows:
+            with self._lock:
+                item = {"url": url, **json.loads(self._get_blob(details_hash))}
+                if with_text:
+                    item["text"] = self._get_blob(text_hash).decode("utf-8")
+            yield item
+
+    def duplicates(self, run_id):
+        """{near-duplicate url: url of the page summarized for it}"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT url, canonical FROM duplicates WHERE run_id = ? ORDER BY rowid", (run_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def iter_summaries(self, run_id, with_details=True):
+        """
+        Summary entries shaped like final_summary.json (url, summary, images,
+        pros, cons, table_rows, and alternate_urls when near-duplicates were
+        folded into the entry); details come from the page of the same run.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT url, summary FROM summaries WHERE run_id = ? ORDER BY seq", (run_id,)
+            ).fetchall()
+        alternates = {}
+        for url, canonical in self.duplicates(run_id).items():
+            alternates.setdefault(canonical, []).append(url)
+        for url, summary in rows:
+            entry = {"url": url, "summary": summary}
+            if with_details:
+                with self._lock:
+                    details = self._page_details(run_id, url)
+                for field in ("images", "pros", "cons", "table_rows"):
+                    entry[field] = details.get(field, [])
+                if url in alternates:
+                    entry["alternate_urls"] = alternates[url]
+            yield entry
+
+    def headlines(self, run_id):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT url, headline FROM headlines WHERE run_id = ? ORDER BY seq", (run_id,)
+            ).fetchall()
+        return [{"url": url, "headline": headline} for url, headline in rows]
+
+    def keywords(self, run_id):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT url, keywords FROM keywords WHERE run_id = ? ORDER BY seq", (run_id,)
+            ).fetchall()
+        return {url: json.loads(words) for url, words in rows}
+
+    def page_hashes(self, run_id):
+        """{url: text hash} of a run's pages."""
+        with self._lock:
+            rows = self._db.execute("SELECT url, text_hash FROM pages WHERE run_id = ?", (run_id,)).fetchall()
+        return dict(rows)
+
+    def copy_keywords(self, from_run, to_run):
+        """Reuse another run's keywords (in its order) for `to_run`."""
+        with self._lock:
+            self._db.execute("DELETE FROM keywords WHERE run_id = ?", (to_run,))
+            self._db.execute(
+                "INSERT INTO keywords SELECT ?, seq, url, keywords FROM keywords WHERE run_id = ?",
+                (to_run, from_run),
+            )
+            self._db.commit()
+
+    # -------------------- Stage records --------------------
+    def stage_digest(self, run_id, stage):
+        """Content hash of what `stage` stored for a run; None when it stored nothing."""
+        with self._lock:
+            rows = self._db.execute(_DIGEST_QUERIES[stage], (run_id,)).fetchall()
+        if not rows:
+            return None
+        return hashlib.sha256(json.dumps(rows, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def record_stage(self, run_id, stage, input_hash, output_hash, status, entries=None, recomputed=None):
+        self._write([(
+            "INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_id, stage, input_hash, output_hash, status, entries, recomputed, time.time()),
+        )])
+
+    def find_stage(self, stage, input_hash, workdir=None):
+        """Newest record of `stage` run on the same inputs (optionally: in `workdir`)."""
+        sql = ("SELECT s.run_id, s.output_hash, s.status, s.entries, s.recomputed FROM stages s "
+               "JOIN runs r ON r.id = s.run_id WHERE s.stage = ? AND s.input_hash = ?")
+        params = [stage, input_hash]
+        if workdir is not None:
+            sql += " AND r.workdir = ?"
+            params.append(os.path.abspath(workdir))
+        sql += " ORDER BY s.created DESC LIMIT 1"
+        with self._lock:
+            row = self._db.execute(sql, params).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("run_id", "output_hash", "status", "entries", "recomputed"), row))
+
+    def stages(self, run_id):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT stage, status, entries, recomputed FROM stages WHERE run_id = ? ORDER BY created",
+                (run_id,),
+            ).fetchall()
+        return [dict(zip(("stage", "status", "entries", "recomputed"), row)) for row in rows]
+
+    # -------------------- JSON export --------------------
+    def export_json(self, run_id, directory="."):
+        """Write the classic JSON files for whatever stages the run produced."""
+        os.makedirs(directory, exist_ok=True)
+        path = lambda name: os.path.join(directory, name)
+        written = []
+
+        urls = self.search_results(run_id)
+        if urls:
+            with open(path("search_urls.json"), "w") as f:
+                json.dump(urls, f, indent=2)
+            written.append(path("search_urls.json"))
+        for name, rows in (("scraped_output.json", self.iter_pages(run_id)),
+                           ("final_summary.json", self.iter_summaries(run_id)),
+                           ("headlines.json", iter(self.headlines(run_id)))):
+            first = next(rows, None)
+            if first is None:
+                continue
+            with JsonArrayWriter(path(name)) as writer:
+                writer.append(first)
+                for row in rows:
+                    writer.append(row)
+            written.append(path(name))
+        keywords = self.keywords(run_id)
+        if keywords:
+            with JsonObjectWriter(path("keywords.json"), ensure_ascii=False) as writer:
+                for url, words in keywords.items():
+                    writer.add(url, words)
+            written.append(path("keywords.json"))
+        duplicates = self.duplicates(run_id)
+        if duplicates:
+            with open(path("duplicates.json"), "w") as f:
+                json.dump(duplicates, f, indent=2)
+            written.append(path("duplicates.json"))
+        return written
+
+
+def _run_dict(row):
+    run_id, query, commands, workdir, status, created, finished = row
+    return {"id": run_id, "query": query, "commands": json.loads(commands), "workdir": workdir,
+            "status": status, "created": created, "finished": finished}
+
+
+class RunStoreSink:
+    """
+    StreamingPipeline sink appending results to a run in the store. Rows are
+    written `batch_size` at a time per table, and the rest when the pipeline
+    closes its sinks, so the event loop does not wait on a commit per result.
+    """
+
+    def __init__(self, store, run_id, batch_size=SINK_BATCH):
+        self.store = store
+        self.run_id = run_id
+        self.batch_size = batch_size
+        self._writers = {
+            "pages": store.add_pages,
+            "duplicates": store.add_duplicates,
+            "headlines": store.add_headlines,
+            "summaries": store.add_summaries,
+            "keywords": store.add_keyword_rows,
+        }
+        self._pending = {name: [] for name in self._writers}
+
+    def _add(self, name, row):
+        rows = self._pending[name]
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self._flush(name)
+
+    def _flush(self, name):
+        rows, self._pending[name] = self._pending[name], []
+        if rows:
+            self._writers[name](self.run_id, rows)
+
+    def open(self, stages):
+        pass
+
+    def on_scraped(self, item):
+        self._add("pages", item)
+
+    def on_duplicate(self, url, canonical):
+        self._add("duplicates", (url, canonical))
+
+    def on_headline(self, headline):
+        self._add("headlines", headline)
+
+    def on_summary(self, entry):
+        self._add("summaries", entry)
+
+    def on_keywords(self, url, keywords):
+        self._add("keywords", (url, keywords))
+
+    def close(self):
+        for name in self._writers:
+            self._flush(name)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_run_store(**kwargs):
+    """Return the process-wide RunStore, creating it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RunStore(**kwargs)
+    return _store
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect stored pipeline runs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="show the most recent runs")
+    prune = sub.add_parser("prune", help="delete all but the newest runs and the page data only they used")
+    prune.add_argument("--keep", type=int, default=MAX_RUNS)
+    export = sub.add_parser("export", help="write a run's results as the classic JSON files")
+    export.add_argument("run_id")
+    export.add_argument("directory", nargs="?", default=".")
+    args = parser.parse_args()
+
+    store = get_run_store()
+    if args.command == "list":
+        for run in store.list_runs():
+            started = time.strftime("%Y-%m-%d %H:%M", time.localtime(run["created"]))
+            print(f"{run['id']}  {started}  {run['status']:<8} {run['query']}")
+    elif args.command == "prune":
+        print(f"[✓] Pruned {store.prune(args.keep)} runs")
+    else:
+        for path in store.export_json(args.run_id, args.directory):
+            print(f"[✓] Wrote {path}")
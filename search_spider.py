@@ -4,27 +4,34 @@ from content_scraper import scrape_content
 class SearchSpider(scrapy.Spider):
     name = "search_spider"
 
-    def __init__(self, urls=None, *args, **kwargs):
+    def __init__(self, urls=None, wait_for_images=True, *args, **kwargs):
         super(SearchSpider, self).__init__(*args, **kwargs)
         self.start_urls = urls or []
+        # The crawl engine collects image downloads itself, off the parse thread
+        self.wait_for_images = wait_for_images
 
     def parse(self, response):
         url = response.url
         html = response.text
 
         try:
-            entry = scrape_content(html, url)
-            self.log(f"[🖼️] Extracted {len(entry['images'])} images, "
+            entry = scrape_content(html, url, wait_for_images=self.wait_for_images)
+            pending_images = entry.get("pending_images", [])
+            self.log(f"[🖼️] Extracted {len(entry['images']) or len(pending_images)} images, "
                      f"{len(entry['tables'])} tables from {url}")
 
-            yield {
+            item = {
                 "url": url,
                 "text": entry.get("text", ""),
                 "images": entry.get("images", []),
                 "tables": entry.get("tables", []),
+                "table_rows": entry.get("table_rows", []),
                 "pros": entry.get("pros", []),
                 "cons": entry.get("cons", [])
             }
+            if pending_images:
+                item["pending_images"] = pending_images
+            yield item
 
         except Exception as e:
             self.logger.error(f"[❌] Error processing {url}: {e}")
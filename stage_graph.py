@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import sys
+
+# The web pipeline as a graph of stages (search -> scrape -> summarize ->
+# keywords -> pdf). Every stage a run executes is recorded in the run store
+# with a hash of its inputs (the upstream stage's output, the model and
+# settings, the code that renders it) and a hash of its output. A stage whose
+# input hash matches an earlier record in the same working directory can
+# reuse that output instead of running; entries inside a stage are reused
+# through the per-text summary and keyword caches.
+
+
+def fingerprint(*parts):
+    """Stable hash of JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def code_hash(*module_names):
+    """Hash of the source files of already-imported modules (layout or scoring changes re-run a stage)."""
+    digest = hashlib.sha256()
+    for name in module_names:
+        path = getattr(sys.modules.get(name), "__file__", None)
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        digest.update(name.encode())
+    return digest.hexdigest()
+
+
+def file_hash(path):
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StageGraph:
+    """Stage records of one run: what was reused, what was recomputed."""
+
+    def __init__(self, store, run_id, workdir="."):
+        self.store = store
+        self.run_id = run_id
+        self.workdir = workdir
+        self.results = []  # (stage, status, entries, recomputed)
+
+    def reusable(self, stage, input_hash):
+        """Earlier record of `stage` on the same inputs in this working directory, if any."""
+        return self.store.find_stage(stage, input_hash, workdir=self.workdir)
+
+    def record(self, stage, input_hash, output_hash=None, status="ran", entries=None, recomputed=None):
+        """Store the stage's hashes; output_hash defaults to the digest of its rows in this run."""
+        if output_hash is None:
+            output_hash = self.store.stage_digest(self.run_id, stage)
+        self.store.record_stage(self.run_id, stage, input_hash, output_hash, status, entries, recomputed)
+        self.results.append((stage, status, entries, recomputed))
+        return output_hash
+
+    def report(self):
+        skipped = [stage for stage, status, _, _ in self.results if status == "skipped"]
+        if skipped:
+            print(f"[⏭] Skipped (inputs unchanged): {', '.join(skipped)}")
+        for stage, status, entries, recomputed in self.results:
+            if status == "skipped" or entries is None:
+                continue
+            if recomputed is None:
+                print(f"[✓] {stage}: {entries} entries")
+            else:
+                print(f"[✓] {stage}: {recomputed} of {entries} entries recomputed")
+
+
+# -------------------- Stages shared by web runs and file commands --------------------
+def keywords_input(store, summary_run):
+    from keyword_extractor import keyword_settings
+    return fingerprint(store.stage_digest(summary_run, "summarize"), keyword_settings(),
+                       code_hash("keyword_extractor"))
+
+
+def keywords_stage(graph, summary_run, keyword_file=None):
+    """
+    Keywords for the summaries of `summary_run`, stored in graph.run_id. An
+    earlier result for the same summaries and keyword settings is copied.
+    """
+    from keyword_extractor import keywords_for_texts
+    from json_sinks import JsonObjectWriter
+
+    store = graph.store
+    input_hash = keywords_input(store, summary_run)
+    prior = graph.reusable("extract_keywords", input_hash)
+    if prior is not None and store.stage_digest(prior["run_id"], "extract_keywords") == prior["output_hash"]:
+        if prior["run_id"] != graph.run_id:
+            store.copy_keywords(prior["run_id"], graph.run_id)
+        graph.record("extract_keywords", input_hash, prior["output_hash"], "skipped", prior["entries"], 0)
+    else:
+        # Only the summary texts are read back, not the page details
+        entries = list(store.iter_summaries(summary_run, with_details=False))
+        stats = {}
+        keywords_list = keywords_for_texts([entry["summary"] for entry in entries], stats=stats)
+        store.add_keyword_rows(graph.run_id, [(entry["url"], keywords)
+                                              for entry, keywords in zip(entries, keywords_list)])
+        graph.record("extract_keywords", input_hash, entries=len(entries),
+                     recomputed=stats.get("computed", 0))
+
+    if keyword_file:
+        with JsonObjectWriter(keyword_file, ensure_ascii=False) as writer:
+            for url, words in store.keywords(graph.run_id).items():
+                writer.add(url, words)
+
+
+def keywords_run(graph, summary_run):
+    """The run holding keywords for `summary_run`'s summaries: the newest extraction on them, else that run."""
+    prior = graph.reusable("extract_keywords", keywords_input(graph.store, summary_run))
+    return prior["run_id"] if prior is not None else summary_run
+
+
+def pdf_stage(graph, summary_run, keyword_run, output_path, section_size=50):
+    """Render the report unless the same inputs already produced the file at `output_path`."""
+    from file_system_handler import render_pdf, render_settings
+
+    store = graph.store
+    input_hash = fingerprint(
+        store.stage_digest(summary_run, "summarize"),
+        store.stage_digest(summary_run, "duplicates"),
+        store.stage_digest(keyword_run, "extract_keywords") if keyword_run else None,
+        render_settings(section_size),
+        code_hash("file_system_handler", "image_prep", "html_extract"),
+        os.path.abspath(output_path),
+    )
+    prior = graph.reusable("export_to_pdf", input_hash)
+    if prior is not None and file_hash(output_path) == prior["output_hash"]:
+        graph.record("export_to_pdf", input_hash, prior["output_hash"], "skipped", prior["entries"])
+        print(f"[✅] PDF unchanged: {output_path}")
+        return
+
+    rendered = []
+
+    def entries():
+        for entry in store.iter_summaries(summary_run):
+            rendered.append(entry["url"])
+            yield entry
+
+    render_pdf(entries(), store.keywords(keyword_run) if keyword_run else {}, output_path, section_size)
+    graph.record("export_to_pdf", input_hash, file_hash(output_path), entries=len(rendered))
@@ -0,0 +1,250 @@
+import asyncio
+import os
+
+from crawl_engine import get_crawl_engine
+from instrumentation import span, count
+from json_sinks import JsonArrayWriter, JsonObjectWriter
+from keyword_extractor import keywords_for_texts
+from near_duplicates import RunDeduplicator
+from summarizer import summarize_batch
+
+_DONE = object()
+
+
+# -------------------- Sinks --------------------
+class MemorySink:
+    """Collects every result in memory (used when no files should be written)."""
+
+    def __init__(self):
+        self.scraped, self.summaries, self.headlines = [], [], []
+        self.keywords = {}
+        self.duplicates = {}
+
+    def open(self, stages):
+        pass
+
+    def on_scraped(self, item):
+        self.scraped.append(item)
+
+    def on_duplicate(self, url, canonical):
+        self.duplicates[url] = canonical
+
+    def on_headline(self, headline):
+        self.headlines.append(headline)
+
+    def on_summary(self, entry):
+        self.summaries.append(entry)
+
+    def on_keywords(self, url, keywords):
+        self.keywords[url] = keywords
+
+    def close(self):
+        pass
+
+
+class JsonFileSink:
+    """
+    Streams results into the JSON files the rest of the tools read
+    (scraped_output.json, final_summary.json, headlines.json, keywords.json,
+    and duplicates.json mapping near-duplicate URLs to the page summarized
+    for them when the pipeline deduplicates). Only the files for stages that
+    actually run are (re)written.
+    """
+
+    FILES = {
+        "scrape": "scraped_output.json",
+        "duplicates": "duplicates.json",
+        "summarize": "final_summary.json",
+        "headlines": "headlines.json",
+        "extract_keywords": "keywords.json",
+    }
+
+    def __init__(self, directory="."):
+        self.directory = directory
+        self.writers = {}
+
+    def path(self, stage):
+        return os.path.join(self.directory, self.FILES[stage])
+
+    def open(self, stages):
+        for stage in stages:
+            writer = JsonObjectWriter if stage in ("extract_keywords", "duplicates") else JsonArrayWriter
+            self.writers[stage] = writer(self.path(stage), ensure_ascii=stage != "extract_keywords")
+        if stages and "duplicates" not in stages and os.path.exists(self.path("duplicates")):
+            # Left by an earlier deduplicated run; it does not describe these results
+            os.remove(self.path("duplicates"))
+
+    def on_scraped(self, item):
+        if "scrape" in self.writers:
+            self.writers["scrape"].append(item)
+
+    def on_duplicate(self, url, canonical):
+        if "duplicates" in self.writers:
+            self.writers["duplicates"].add(url, canonical)
+
+    def on_headline(self, headline):
+        self.writers["headlines"].append(headline)
+
+    def on_summary(self, entry):
+        self.writers["summarize"].append(entry)
+
+    def on_keywords(self, url, keywords):
+        self.writers["extract_keywords"].add(url, keywords)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+
+# -------------------- Pipeline --------------------
+async def _batches(queue, max_batch):
+    """Yield whatever is ready in `queue` (1..max_batch items) until _DONE."""
+    while True:
+        item = await queue.get()
+        if item is _DONE:
+            return
+        batch = [item]
+        while len(batch) < max_batch:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if item is _DONE:
+                yield batch
+                return
+            batch.append(item)
+        yield batch
+
+
+class StreamingPipeline:
+    """
+    Crawl -> summarize -> keywords as concurrent stages joined by bounded
+    queues. Each page moves on as soon as it is scraped, so the run takes
+    about as long as the slowest stage rather than the sum of all stages,
+    and at most `queue_size` pages wait between any two stages.
+
+    Which stages run follows the router commands ("summarize", "headlines",
+    "extract_keywords"); results go to every sink as they are produced.
+
+    With `dedup`, near-duplicate pages (see near_duplicates.py) of a run that
+    summarizes are scraped but not summarized: sinks get
+    on_duplicate(url, canonical_url) instead.
+    """
+
+    def __init__(self, commands, sinks=None, queue_size=16, summary_batch=8, keyword_batch=32, dedup=True):
+        self.commands = commands
+        self.dedup = dedup
+        self.sinks = sinks if sinks is not None else [JsonFileSink()]
+        self.queue_size = queue_size
+        self.summary_batch = summary_batch
+        self.keyword_batch = keyword_batch
+        self.scraped_count = 0
+        self.summarized_count = 0
+        self.duplicate_count = 0
+        # Per stage: entries served from the result caches vs computed by a model
+        self.stats = {"summarize": {}, "extract_keywords": {}}
+
+    @property
+    def deduplicates(self):
+        # Grouping only saves work when pages are summarized
+        return self.dedup and "summarize" in self.commands
+
+    @property
+    def streams_keywords(self):
+        # Keywords are computed from this run's summaries; without them the
+        # caller falls back to the summaries file of a previous run.
+        return "summarize" in self.commands and "extract_keywords" in self.commands
+
+    def _emit(self, event, *args):
+        for sink in self.sinks:
+            getattr(sink, event)(*args)
+
+    async def run(self, urls=None, scraped=None):
+        """Crawl `urls`, or replay already `scraped` entries, through the stages."""
+        stages = ["scrape"] if urls is not None else []
+        stages += [s for s in ("summarize", "headlines") if s in self.commands]
+        if self.streams_keywords:
+            stages.append("extract_keywords")
+        if self.deduplicates:
+            stages.append("duplicates")
+        for sink in self.sinks:
+            sink.open(stages)
+
+        summary_q = asyncio.Queue(self.queue_size) if "summarize" in self.commands else None
+        keyword_q = asyncio.Queue(self.queue_size) if self.streams_keywords else None
+
+        tasks = [asyncio.create_task(self._produce(urls, scraped, summary_q))]
+        if summary_q is not None:
+            tasks.append(asyncio.create_task(self._summarize(summary_q, keyword_q)))
+        if keyword_q is not None:
+            tasks.append(asyncio.create_task(self._extract_keywords(keyword_q)))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            for sink in self.sinks:
+                sink.close()
+
+    async def _produce(self, urls, scraped, summary_q):
+        async def entries():
+            if urls is not None:
+                async for item in get_crawl_engine().crawl(urls):
+                    print(f"[+] Scraped: {item['url']}")
+                    yield item
+            else:
+                for item in scraped or []:
+                    yield item
+
+        dedup = RunDeduplicator() if self.deduplicates else None
+        async for item in entries():
+            self.scraped_count += 1
+            count("pages_scraped")
+            self._emit("on_scraped", item)
+            if "headlines" in self.commands:
+                self._emit("on_headline", {"url": item["url"], "headline": item["text"].split('\n')[0]})
+            if dedup is not None:
+                canonical = await asyncio.to_thread(dedup.check, item["url"], item["text"])
+                if canonical is not None:
+                    self.duplicate_count += 1
+                    self._emit("on_duplicate", item["url"], canonical)
+                    continue
+            if summary_q is not None:
+                await summary_q.put(item)
+        if summary_q is not None:
+            await summary_q.put(_DONE)
+
+    async def _summarize(self, summary_q, keyword_q):
+        async for batch in _batches(summary_q, self.summary_batch):
+            texts = [item["text"] for item in batch]
+            with span("stage.summarize", pages=len(batch)):
+                summaries = await asyncio.to_thread(summarize_batch, texts, self.summary_batch,
+                                                    stats=self.stats["summarize"])
+            for item, summary in zip(batch, summaries):
+                entry = {
+                    "url": item["url"],
+                    "summary": summary,
+                    "images": item.get("images", []),
+                    "pros": item.get("pros", []),
+                    "cons": item.get("cons", []),
+                    "table_rows": item.get("table_rows", []),
+                }
+                self.summarized_count += 1
+                self._emit("on_summary", entry)
+                if keyword_q is not None:
+                    await keyword_q.put(entry)
+            print(f"[+] Summarized {self.summarized_count}/{self.scraped_count} pages")
+        if keyword_q is not None:
+            await keyword_q.put(_DONE)
+
+    async def _extract_keywords(self, keyword_q):
+        async for batch in _batches(keyword_q, self.keyword_batch):
+            texts = [entry["summary"] for entry in batch]
+            with span("stage.keywords", pages=len(batch)):
+                keywords_list = await asyncio.to_thread(keywords_for_texts, texts,
+                                                        stats=self.stats["extract_keywords"])
+            for entry, keywords in zip(batch, keywords_list):
+                self._emit("on_keywords", entry["url"], keywords)
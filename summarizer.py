@@ -1,11 +1,155 @@
-from transformers import pipeline
+import re
+
+from inference_backends import cache_params, load_summarizer
+from instrumentation import span, count
+from model_registry import register, get_model
+from result_cache import ResultCache
+
+MODEL_NAME = "sshleifer/distilbart-cnn-12-6"
+
+
+def _load_summarizer():
+    return load_summarizer(MODEL_NAME)
+
+
+register("summarizer", _load_summarizer)
+
+_cache = None
+
+
+def get_summary_cache():
+    global _cache
+    if _cache is None:
+        _cache = ResultCache("summaries", MODEL_NAME)
+    return _cache
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def split_sentences(text):
+    return [s.strip() for s in _SENTENCE_END.split(text) if s and s.strip()]
+
+
+def chunk_text(text, max_tokens=None):
+    """
+    Split `text` on sentence boundaries into chunks of at most `max_tokens`
+    tokens, as measured by the summarizer's tokenizer. Returns (chunk, n_tokens)
+    pairs. A single sentence longer than the budget is cut at token boundaries.
+    """
+    tokenizer = get_model("summarizer").tokenizer
+    limit = min(tokenizer.model_max_length, 1024) - tokenizer.num_special_tokens_to_add()
+    max_tokens = min(max_tokens or limit, limit)
+
+    sentences = split_sentences(text)
+    if not sentences:
+        return []
+    token_ids = tokenizer(sentences, add_special_tokens=False)["input_ids"]
+
+    chunks, current, current_len = [], [], 0
+    for sentence, ids in zip(sentences, token_ids):
+        if len(ids) > max_tokens:
+            if current:
+                chunks.append((" ".join(current), current_len))
+                current, current_len = [], 0
+            for i in range(0, len(ids), max_tokens):
+                piece = ids[i:i + max_tokens]
+                chunks.append((tokenizer.decode(piece), len(piece)))
+            continue
+        # +1 leaves room for the space the join adds between sentences
+        if current and current_len + len(ids) + 1 > max_tokens:
+            chunks.append((" ".join(current), current_len))
+            current, current_len = [], 0
+        current.append(sentence)
+        current_len += len(ids) + (1 if current_len else 0)
+    if current:
+        chunks.append((" ".join(current), current_len))
+    return chunks
+
+
+def summarize_batch(texts, batch_size=8, max_length=150, min_length=40, max_chunk_tokens=None,
+                    use_cache=True, stats=None):
+    """
+    Summarize many documents at once and return one summary per document.
+
+    Every document is chunked on sentence boundaries, chunks from all documents
+    are sorted by token length (so each batch needs little padding) and run
+    through the model `batch_size` at a time, then each document's chunk
+    summaries are joined back together in their original order.
+
+    Documents summarized before with the same model and parameters are served
+    from the result cache and never reach the model. With a `stats` dict, the
+    numbers of "cached" and "computed" documents are added to it.
+    """
+    params = {"max_length": max_length, "min_length": min_length, "max_chunk_tokens": max_chunk_tokens,
+              **cache_params("summarizer")}
+    cached = get_summary_cache().get_many(texts, **params) if use_cache else [None] * len(texts)
+    missing = [i for i, summary in enumerate(cached) if summary is None]
+    count("summary_cache_hits", len(texts) - len(missing))
+    if stats is not None:
+        stats["cached"] = stats.get("cached", 0) + len(texts) - len(missing)
+        stats["computed"] = stats.get("computed", 0) + len(missing)
+    if not missing:
+        return cached
+
+    fresh = _summarize_uncached([texts[i] for i in missing], batch_size, max_length, min_length,
+                                max_chunk_tokens)
+    if use_cache:
+        get_summary_cache().put_many(
+            [(texts[i], summary) for i, summary in zip(missing, fresh)
+             if not summary.startswith("[Summarization failed")],
+            **params,
+        )
+    for i, summary in zip(missing, fresh):
+        cached[i] = summary
+    return cached
+
+
+def _summarize_uncached(texts, batch_size, max_length, min_length, max_chunk_tokens):
+    jobs = []  # (doc index, chunk text, token count)
+    for doc_index, text in enumerate(texts):
+        for chunk, n_tokens in chunk_text(text or "", max_chunk_tokens):
+            jobs.append((doc_index, chunk, n_tokens))
+
+    count("chunks_summarized", len(jobs))
+    outputs = [None] * len(jobs)
+    failures = {}
+    order = sorted(range(len(jobs)), key=lambda j: jobs[j][2], reverse=True)
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        # Chunks are sorted, so the last one is the shortest in the batch
+        batch_min = min(min_length, max(1, jobs[batch[-1]][2] // 2))
+        try:
+            with span("summarize.model", chunks=len(batch)):
+                results = get_model("summarizer")(
+                    [jobs[j][1] for j in batch],
+                    max_length=max_length,
+                    min_length=batch_min,
+                    do_sample=False,
+                    truncation=True,
+                    batch_size=len(batch),
+                )
+            for j, res in zip(batch, results):
+                outputs[j] = res["summary_text"]
+        except Exception as e:
+            for j in batch:
+                failures[jobs[j][0]] = f"[Summarization failed: {e}]"
+
+    summaries = [[] for _ in texts]
+    for (doc_index, _, _), summary in zip(jobs, outputs):
+        if summary is not None:
+            summaries[doc_index].append(summary)
+    return [failures.get(i) or " ".join(parts) for i, parts in enumerate(summaries)]
+
+
+def summary_settings(max_length=150, min_length=40, max_chunk_tokens=None):
+    """Everything besides the page text that decides a summary (for stage hashes)."""
+    return {"model": MODEL_NAME, "max_length": max_length, "min_length": min_length,
+            "max_chunk_tokens": max_chunk_tokens, **cache_params("summarizer")}
 
-summarizer = pipeline("summarization", model="sshleifer/distilbart-cnn-12-6")
 
 def summarize_text(text, max_len=1024):
+    """Summarize one document; `max_len` is the per-chunk token budget."""
     try:
-        chunks = [text[i:i+max_len] for i in range(0, len(text), max_len)]
-        results = summarizer(chunks[:3], max_length=150, min_length=40, do_sample=False)
-        return " ".join([res["summary_text"] for res in results])
+        return summarize_batch([text], max_chunk_tokens=max_len)[0]
     except Exception as e:
         return f"[Summarization failed: {e}]"
@@ -1,9 +1,9 @@
 # task_handler.py
 from instruction_parser import parse_instruction
-from terminal_execution import run_terminal_command
-from Browser_automation import run_pipeline
+from terminal_execution import run_commands
 
-def route_instruction(instruction):
+def route_instruction(instruction, workdir="."):
+    """Parse and run one instruction; output files go to `workdir`. Returns the parsed intent."""
     parsed = parse_instruction(instruction)
 
     print("\n[🧠] Parsed Intent:", parsed["intent"])
@@ -14,20 +14,34 @@ def route_instruction(instruction):
     # ✅ Terminal Instruction Handler
     if parsed["intent"] == "terminal":
         if parsed["commands"]:
-            for cmd in parsed["commands"]:
-                result = run_terminal_command(cmd)
+            commands = parsed["commands"]
+
+            # Output is printed as it arrives; concurrent commands are prefixed
+            def show_line(cmd, stream, line):
+                prefix = f"[{cmd}] " if len(commands) > 1 else ""
+                print(f"{prefix}{'[stderr] ' if stream == 'stderr' else ''}{line}")
+
+            results = run_commands(commands, on_line=show_line, cwd=workdir)
+            parsed["results"] = results
+            for cmd, result in zip(commands, results):
+                cpu = "n/a" if result["cpu_time"] is None else f"{result['cpu_time']:.2f}s"
+                timing = f"wall {result['wall_time']:.2f}s, cpu {cpu}"
+                if result["omitted_lines"]:
+                    timing += f", {result['omitted_lines']} lines not retained"
                 if result["success"]:
-                    print(f"[✅] Output for '{cmd}':\n{result['stdout']}")
+                    print(f"[✅] '{cmd}' finished ({timing})")
                 else:
-                    print(f"[❌] Error for '{cmd}':\n{result['stderr']}")
+                    print(f"[❌] '{cmd}' failed with exit code {result['exit_code']} ({timing}):\n{result['stderr']}")
         else:
             print("[⚠️] No valid terminal commands found.")
 
     # 🌐 Web Instruction Handler
     elif parsed["intent"] == "web":
         if parsed["commands"]:
+            # Deferred: pulls in Playwright, Scrapy and the model wrappers
+            from Browser_automation import run_pipeline
             print(f"[🚀] Executing Web Pipeline for: '{instruction}'")
-            run_pipeline(instruction, parsed["intent"], parsed["commands"])
+            run_pipeline(instruction, parsed["intent"], parsed["commands"], workdir=workdir)
         else:
             print("[⚠️] No valid web commands found.")
 
@@ -36,10 +50,12 @@ def route_instruction(instruction):
         if parsed["commands"]:
             from file_system_handler import handle_file_commands
             print(f"[📂] Handling file operation: '{instruction}'")
-            handle_file_commands(instruction, parsed["commands"])
+            handle_file_commands(instruction, parsed["commands"], directory=workdir)
         else:
             print("[⚠️] No valid file handling commands found.")
 
     # 🤷 Fallback
     else:
         print("[❓] Unknown intent. Try rephrasing the instruction.")
+
+    return parsed
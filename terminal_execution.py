@@ -1,36 +1,187 @@
-import subprocess
+import asyncio
+import os
+import signal
+import time
+from collections import deque
 
-def run_terminal_command(command: str) -> dict:
+from async_runtime import run_sync
+
+try:
+    import resource
+except ImportError:  # Windows: no rusage, CPU time is reported as None
+    resource = None
+
+HEAD_LINES = 200
+TAIL_LINES = 200
+MAX_LINE_CHARS = 4096
+DEFAULT_TIMEOUT = 60
+
+
+class OutputBuffer:
     """
-    Executes a shell command safely and returns the output or error.
+    Keeps the first `head_lines` and the last `tail_lines` lines of a stream
+    and only counts the ones in between, so retained output stays bounded no
+    matter how much a command prints.
     """
+
+    def __init__(self, head_lines=HEAD_LINES, tail_lines=TAIL_LINES):
+        self.head_lines = head_lines
+        self.head = []
+        self.tail = deque(maxlen=tail_lines)
+        self.total = 0
+
+    def append(self, line):
+        self.total += 1
+        if len(self.head) < self.head_lines:
+            self.head.append(line)
+        else:
+            self.tail.append(line)
+
+    @property
+    def omitted(self):
+        return self.total - len(self.head) - len(self.tail)
+
+    def text(self):
+        lines = list(self.head)
+        if self.omitted:
+            lines.append(f"... [{self.omitted} lines omitted] ...")
+        lines.extend(self.tail)
+        return "\n".join(lines).strip()
+
+
+def _children_cpu_time():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _kill(proc):
+    """Kill the shell and everything it started (they share the pipes)."""
     try:
-        result = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=60  # optional safeguard
-        )
-        return {
-            "success": result.returncode == 0,
-            "stdout": result.stdout.strip(),
-            "stderr": result.stderr.strip(),
-            "exit_code": result.returncode
-        }
+        if os.name == "nt":
+            proc.kill()
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _emit_line(raw, name, buffer, on_line):
+    line = raw.decode("utf-8", "replace").rstrip("\r")
+    if len(line) > MAX_LINE_CHARS:
+        line = line[:MAX_LINE_CHARS] + " ...[line truncated]"
+    buffer.append(line)
+    if on_line is not None:
+        on_line(name, line)
+
+
+async def _pump(stream, name, buffer, on_line, chunk_size=64 * 1024):
+    """Split `stream` into lines as the bytes arrive."""
+    pending = b""
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            if pending:
+                _emit_line(pending, name, buffer, on_line)
+            return
+        *lines, pending = (pending + chunk).split(b"\n")
+        for raw in lines:
+            _emit_line(raw, name, buffer, on_line)
+        # Don't let a line without a newline grow without bound
+        if len(pending) > chunk_size:
+            _emit_line(pending, name, buffer, on_line)
+            pending = b""
 
-    except subprocess.TimeoutExpired as e:
-        return {
-            "success": False,
-            "stdout": "",
-            "stderr": f"Command timed out: {str(e)}",
-            "exit_code": -1
-        }
 
+async def run_command_async(command, on_line=None, timeout=DEFAULT_TIMEOUT,
+                            head_lines=HEAD_LINES, tail_lines=TAIL_LINES, cwd=None):
+    """
+    Run a shell command, calling on_line(stream, line) for every stdout or
+    stderr line as it arrives. Returns the same dict as run_terminal_command
+    plus wall_time, cpu_time and the number of omitted output lines.
+
+    cpu_time is the growth of this process's reaped-children CPU time while
+    the command ran, so it also counts other commands finishing meanwhile.
+    """
+    stdout = OutputBuffer(head_lines, tail_lines)
+    stderr = OutputBuffer(head_lines, tail_lines)
+    cpu_start = _children_cpu_time()
+    start = time.perf_counter()
+    error = None
+
+    try:
+        proc = await asyncio.create_subprocess_shell(
+            command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            cwd=cwd, start_new_session=os.name != "nt"
+        )
     except Exception as e:
         return {
             "success": False,
             "stdout": "",
             "stderr": f"Execution failed: {str(e)}",
-            "exit_code": -1
+            "exit_code": -1,
+            "wall_time": 0.0,
+            "cpu_time": None,
+            "omitted_lines": 0
         }
+
+    work = asyncio.gather(
+        _pump(proc.stdout, "stdout", stdout, on_line),
+        _pump(proc.stderr, "stderr", stderr, on_line),
+        proc.wait(),
+    )
+    try:
+        await asyncio.wait_for(asyncio.shield(work), timeout)
+    except asyncio.TimeoutError:
+        error = f"Command timed out after {timeout} seconds"
+    finally:
+        if not work.done():
+            # Once the process group is gone the pipes hit EOF and `work` ends
+            _kill(proc)
+            await work
+
+    wall_time = time.perf_counter() - start
+    cpu_end = _children_cpu_time()
+    cpu_time = None if cpu_start is None else cpu_end - cpu_start
+
+    stderr_text = stderr.text()
+    if error:
+        stderr_text = f"{stderr_text}\n{error}".strip()
+    return {
+        "success": error is None and proc.returncode == 0,
+        "stdout": stdout.text(),
+        "stderr": stderr_text,
+        "exit_code": -1 if error else proc.returncode,
+        "wall_time": wall_time,
+        "cpu_time": cpu_time,
+        "omitted_lines": stdout.omitted + stderr.omitted
+    }
+
+
+async def run_commands_async(commands, max_workers=4, on_line=None, timeout=DEFAULT_TIMEOUT, cwd=None):
+    """
+    Run independent commands concurrently, at most `max_workers` at a time.
+    on_line(command, stream, line) receives output as it arrives; results
+    come back in the order of `commands`.
+    """
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def run_one(command):
+        callback = None if on_line is None else (lambda stream, line: on_line(command, stream, line))
+        async with semaphore:
+            return await run_command_async(command, callback, timeout, cwd=cwd)
+
+    return await asyncio.gather(*(run_one(command) for command in commands))
+
+
+def run_commands(commands, max_workers=4, on_line=None, timeout=DEFAULT_TIMEOUT, cwd=None):
+    """Blocking wrapper around run_commands_async (runs on the shared loop)."""
+    return run_sync(run_commands_async(commands, max_workers, on_line, timeout, cwd))
+
+
+def run_terminal_command(command: str) -> dict:
+    """
+    Executes a shell command safely and returns the output or error.
+    """
+    return run_sync(run_command_async(command))
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+# The agent's modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Process-wide caches that keep their files under the working directory
+_CACHES = [
+    ("http_cache", "_cache"),
+    ("summarizer", "_cache"),
+    ("keyword_extractor", "_cache"),
+    ("Browser_automation", "_search_cache"),
+    ("run_store", "_store"),
+    ("main_content", "_store"),
+    ("near_duplicates", "_index"),
+]
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run every test in its own directory, with fresh process-wide caches."""
+    monkeypatch.chdir(tmp_path)
+    for module, name in _CACHES:
+        if module in sys.modules:
+            monkeypatch.setattr(sys.modules[module], name, None)
+    return tmp_path
@@ -0,0 +1,45 @@
+import threading
+
+
+class FakeResponse:
+    """The parts of requests.Response the agent uses, from a canned body."""
+
+    def __init__(self, url, body=b"", status_code=200, headers=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = dict(headers or {})
+        self.content = body
+        self.text = body.decode("utf-8", "replace")
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """
+    Serves {url: FakeResponse or callable(url, headers) -> FakeResponse} and
+    records every request as (url, request headers).
+    """
+
+    def __init__(self, routes=None):
+        self.routes = dict(routes or {})
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None, **kwargs):
+        with self._lock:
+            self.requests.append((url, dict(headers or {})))
+        route = self.routes.get(url)
+        if route is None:
+            return FakeResponse(url, status_code=404)
+        return route(url, headers or {}) if callable(route) else route
+
+    def urls(self):
+        return [url for url, _ in self.requests]
@@ -0,0 +1,154 @@
+import io
+import json
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+import requests
+
+import agent_server
+from agent_server import JobQueue, _make_handler, _RoutedStdout, is_loopback, serve
+
+# What serve() installs as sys.stdout (pytest keeps swapping the real one during tests)
+STDOUT = _RoutedStdout(io.StringIO())
+
+
+def fake_route(instruction, workdir="."):
+    """Stands in for route_instruction: logs, reads what earlier jobs left and writes a file."""
+    print(f"[+] Running: {instruction}", file=STDOUT)
+    if instruction == "fail":
+        raise RuntimeError("no such page")
+    seen = sorted(os.listdir(workdir))
+    with open(os.path.join(workdir, f"{len(seen)}.json"), "w") as f:
+        json.dump({"instruction": instruction, "seen": seen}, f)
+    return {"intent": "web", "commands": ["scrape"]}
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(agent_server, "route_instruction", fake_route)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(JobQueue(workers=2)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def submit(api, instruction, **fields):
+    response = requests.post(f"{api}/jobs", json={"instruction": instruction, **fields}, timeout=5)
+    assert response.status_code == 202
+    return response.json()["id"]
+
+
+def wait(api, job_id):
+    for _ in range(200):
+        job = requests.get(f"{api}/jobs/{job_id}", timeout=5).json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_runs_and_reports_its_output(api):
+    job = wait(api, submit(api, "search solar panels"))
+    assert job["status"] == "done"
+    assert job["parsed"] == {"intent": "web", "commands": ["scrape"]}
+    assert job["files"] == ["0.json"]
+    log = requests.get(f"{api}/jobs/{job['id']}/log", timeout=5).json()
+    assert log["lines"] == ["[+] Running: search solar panels"]
+    assert requests.get(f"{api}/jobs/{job['id']}/log?offset=1", timeout=5).json()["lines"] == []
+    data = requests.get(f"{api}/jobs/{job['id']}/files/0.json", timeout=5).json()
+    assert data == {"instruction": "search solar panels", "seen": []}
+
+
+def test_failed_job_keeps_the_error_and_traceback(api):
+    job = wait(api, submit(api, "fail"))
+    assert job["status"] == "failed"
+    assert job["error"] == "RuntimeError: no such page"
+    lines = requests.get(f"{api}/jobs/{job['id']}/log", timeout=5).json()["lines"]
+    assert any("Traceback" in line for line in lines)
+
+
+def test_stream_ends_with_the_finished_job(api):
+    job_id = submit(api, "search solar panels")
+    with requests.get(f"{api}/jobs/{job_id}/stream", stream=True, timeout=5) as response:
+        records = [json.loads(line) for line in response.iter_lines() if line]
+    assert records[0] == {"line": "[+] Running: search solar panels"}
+    assert records[-1]["status"] == "done"
+
+
+def test_jobs_without_a_session_are_isolated(api):
+    wait(api, submit(api, "first"))
+    job = wait(api, submit(api, "second"))
+    assert job["session"] is None
+    assert job["files"] == ["0.json"]
+
+
+def test_session_jobs_share_a_directory(api):
+    first = wait(api, submit(api, "search solar panels", session="solar"))
+    follow_up = wait(api, submit(api, "generate pdf report from last search", session="solar"))
+    assert first["session"] == follow_up["session"] == "solar"
+    data = requests.get(f"{api}/jobs/{follow_up['id']}/files/1.json", timeout=5).json()
+    assert data["seen"] == ["0.json"]
+    assert sorted(os.listdir(os.path.join("jobs", "sessions", "solar"))) == ["0.json", "1.json"]
+
+
+def test_post_requires_json(api):
+    response = requests.post(f"{api}/jobs", data="search solar panels",
+                             headers={"Content-Type": "text/plain"}, timeout=5)
+    assert response.status_code == 415
+    assert requests.get(f"{api}/jobs", timeout=5).json() == []
+
+
+@pytest.mark.parametrize("body", [{}, {"instruction": "  "}, {"instruction": 3},
+                                  {"instruction": "x", "session": "../etc"}, ["instruction"]])
+def test_post_rejects_bad_bodies(api, body):
+    assert requests.post(f"{api}/jobs", json=body, timeout=5).status_code == 400
+
+
+@pytest.mark.parametrize("offset", ["abc", "-1", "1.5"])
+def test_bad_log_offset_is_a_client_error(api, offset):
+    job_id = submit(api, "search solar panels")
+    response = requests.get(f"{api}/jobs/{job_id}/log?offset={offset}", timeout=5)
+    assert response.status_code == 400
+
+
+def test_unknown_jobs_and_files_are_404(api):
+    job_id = submit(api, "search solar panels")
+    wait(api, job_id)
+    assert requests.get(f"{api}/jobs/nope", timeout=5).status_code == 404
+    assert requests.get(f"{api}/jobs/{job_id}/files/../../x", timeout=5).status_code == 404
+    assert requests.get(f"{api}/jobs/{job_id}/files/missing.pdf", timeout=5).status_code == 404
+
+
+def test_pruned_jobs_take_their_directories_along(api, monkeypatch):
+    monkeypatch.setattr(agent_server, "MAX_FINISHED_JOBS", 1)
+    old = wait(api, submit(api, "first"))
+    wait(api, submit(api, "second", session="solar"))
+    assert os.path.isdir(os.path.join("jobs", old["id"]))
+    wait(api, submit(api, "third", session="solar"))
+    assert not os.path.exists(os.path.join("jobs", old["id"]))
+    assert requests.get(f"{api}/jobs/{old['id']}", timeout=5).status_code == 404
+    # The session directory stays while a job of the session is kept
+    wait(api, submit(api, "fourth"))
+    assert os.path.isdir(os.path.join("jobs", "sessions", "solar"))
+    wait(api, submit(api, "fifth"))
+    assert not os.path.exists(os.path.join("jobs", "sessions", "solar"))
+
+
+def test_health_counts_jobs(api):
+    wait(api, submit(api, "fail"))
+    health = requests.get(f"{api}/health", timeout=5).json()
+    assert health["status"] == "ok"
+    assert health["workers"] == 2
+    assert health["failed"] == 1
+
+
+def test_only_loopback_hosts_are_served_by_default():
+    assert is_loopback("127.0.0.1") and is_loopback("localhost") and is_loopback("::1")
+    assert not is_loopback("0.0.0.0") and not is_loopback("example.test")
+    with pytest.raises(ValueError, match="non-loopback"):
+        serve(host="0.0.0.0", warm=False)
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+
+import pytest
+
+import async_runtime
+from async_runtime import get_loop, run_sync
+
+
+def test_run_sync_reuses_one_background_loop():
+    async def current():
+        return asyncio.get_running_loop(), threading.current_thread().name
+
+    first, thread = run_sync(current())
+    second, _ = run_sync(current())
+    assert first is second is get_loop()
+    assert thread == "agent-event-loop"
+
+
+def test_run_sync_refuses_the_loop_thread():
+    async def nested():
+        coro = asyncio.sleep(0)
+        try:
+            run_sync(coro)
+        finally:
+            coro.close()
+
+    with pytest.raises(RuntimeError):
+        run_sync(nested())
+
+
+def test_shutdown_hooks_run_in_reverse_order(monkeypatch):
+    ran = []
+    monkeypatch.setattr(async_runtime, "_shutdown_hooks", [])
+
+    async def first():
+        ran.append("first")
+
+    async def second():
+        ran.append("second")
+
+    async_runtime.on_shutdown(first)
+    async_runtime.on_shutdown(second)
+    run_sync(async_runtime._run_shutdown_hooks())
+    assert ran == ["second", "first"]
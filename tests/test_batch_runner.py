@@ -0,0 +1,105 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("playwright.async_api")
+import batch_runner  # noqa: E402
+from batch_runner import read_instructions, report_dir_name, run_batch  # noqa: E402
+
+RESULTS = {
+    "solar panels": ["https://a.test/1", "https://b.test/2"],
+    "home batteries": ["https://b.test/2", "https://c.test/3"],
+    "heat pumps": [],
+}
+
+
+class FakePipeline:
+    """Summarizes every page as its URL and tags it with its host; `mirrors` are near-duplicates."""
+    runs = []
+    mirrors = {}
+
+    def __init__(self, commands, sinks):
+        self.commands = commands
+        self.sinks = sinks
+
+    async def run(self, urls):
+        FakePipeline.runs.append(list(urls))
+        for sink in self.sinks:
+            for url in urls:
+                if url in self.mirrors:
+                    sink.on_duplicate(url, self.mirrors[url])
+                    continue
+                sink.on_summary({"url": url, "summary": f"Summary of {url}", "images": [],
+                                 "pros": [], "cons": [], "table_rows": []})
+                sink.on_keywords(url, [url.split("/")[2]])
+
+
+@pytest.fixture
+def batch(monkeypatch):
+    searched = []
+
+    async def search_many(queries, num_results=5, search_url=None):
+        searched.append(list(queries))
+        return {query: RESULTS[query] for query in queries}
+
+    FakePipeline.runs = []
+    FakePipeline.mirrors = {}
+    monkeypatch.setattr(batch_runner, "search_many", search_many)
+    monkeypatch.setattr(batch_runner, "StreamingPipeline", FakePipeline)
+    return searched
+
+
+def load(*parts):
+    with open(os.path.join(*parts), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_shared_pages_are_processed_once(batch):
+    index = run_batch(["solar panels", "home batteries", "solar panels"], "out", pdf=False)
+    assert batch == [["solar panels", "home batteries"]]
+    assert FakePipeline.runs == [["https://a.test/1", "https://b.test/2", "https://c.test/3"]]
+    assert [entry["pages"] for entry in index] == [2, 2]
+
+    summary = load("out", "batch.json")
+    assert (summary["queries"], summary["results"], summary["unique_pages"]) == (2, 4, 3)
+    assert summary["summarized_pages"] == 3
+
+
+def test_each_query_gets_its_own_report(batch):
+    index = run_batch(["solar panels", "home batteries"], "out")
+    directory = os.path.join("out", "002-home-batteries")
+    assert index[1]["directory"] == directory
+    assert load(directory, "search_urls.json") == RESULTS["home batteries"]
+    assert [e["url"] for e in load(directory, "final_summary.json")] == RESULTS["home batteries"]
+    assert load(directory, "keywords.json") == {"https://b.test/2": ["b.test"], "https://c.test/3": ["c.test"]}
+    with open(index[1]["report"], "rb") as f:
+        assert f.read(5) == b"%PDF-"
+
+
+def test_query_without_results_gets_no_pdf(batch):
+    (entry,) = run_batch(["heat pumps"], "out")
+    assert entry["pages"] == 0 and entry["report"] is None
+    assert FakePipeline.runs == []
+    assert load(entry["directory"], "final_summary.json") == []
+
+
+def test_near_duplicates_show_up_once_under_their_canonical_page(batch):
+    FakePipeline.mirrors = {"https://c.test/3": "https://b.test/2"}
+    entry = run_batch(["home batteries"], "out", pdf=False)[0]
+    [summary] = load(entry["directory"], "final_summary.json")
+    assert summary["url"] == "https://b.test/2"
+    assert summary["alternate_urls"] == ["https://c.test/3"]
+    assert load("out", "batch.json")["near_duplicates"] == 1
+
+
+def test_read_instructions_from_text_and_json(tmp_path):
+    (tmp_path / "topics.txt").write_text("# energy\nsolar panels\n\n  heat pumps  \n")
+    (tmp_path / "topics.json").write_text('["solar panels", " ", 42]')
+    assert read_instructions(str(tmp_path / "topics.txt")) == ["solar panels", "heat pumps"]
+    assert read_instructions(str(tmp_path / "topics.json")) == ["solar panels", "42"]
+
+
+def test_report_dir_names_are_numbered_slugs():
+    assert report_dir_name(7, "Best 4K TVs (2024)!") == "007-best-4k-tvs-2024"
+    assert report_dir_name(1, "???") == "001-query"
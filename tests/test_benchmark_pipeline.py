@@ -0,0 +1,77 @@
+import pytest
+import requests
+
+from benchmarks.fixture_site import FixtureServer
+from benchmarks.pipeline import _spawn, compare, percentile, summarize_runs
+from content_scraper import scrape_content
+
+
+@pytest.fixture(scope="module")
+def site():
+    with FixtureServer(articles=3, images_per_article=2, image_size=(64, 48)) as server:
+        yield server
+
+
+def test_search_page_links_every_article(site):
+    html = requests.get(site.url("/search?q=benchmark"), timeout=10).text
+    assert html.count('class="b_algo"') == 3
+    for url in site.article_urls():
+        assert url in html
+
+
+def test_articles_are_deterministic_and_scrapable(site):
+    url = site.article_urls()[1]
+    first = requests.get(url, timeout=10)
+    assert first.content == requests.get(url, timeout=10).content
+    assert first.content == FixtureServer(articles=3, images_per_article=2).article_html(1)
+    data = scrape_content(first.text, url)
+    assert data["pros"] and data["cons"]
+    assert len(data["images"]) == 2
+    assert requests.get(site.url("/articles/99.html"), timeout=10).status_code == 404
+
+
+def test_images_are_real_pngs(site):
+    response = requests.get(site.url("/images/0_0.png"), timeout=10)
+    assert response.headers["Content-Type"] == "image/png"
+    assert response.content.startswith(b"\x89PNG\r\n\x1a\n")
+
+
+@pytest.mark.parametrize("stage", ["scrape", "summarize"])
+def test_stage_runs_in_a_cold_worker(site, stage):
+    result = _spawn(stage, site.url(""), 3)
+    assert result["items"] == 3
+    assert len(result["samples"]) == 3
+    assert all(sample > 0 for sample in result["samples"])
+
+
+def test_unknown_stage_fails_the_worker(site):
+    with pytest.raises(RuntimeError, match="Unknown stage"):
+        _spawn("nope", site.url(""), 1)
+
+
+def test_percentile_interpolates():
+    assert percentile([], 0.5) is None
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.5) == pytest.approx(2.5)
+    assert percentile([1.0, 2.0, 3.0, 4.0], 1.0) == 4.0
+
+
+def test_summarize_runs_pools_samples():
+    runs = [{"samples": [0.1, 0.3], "items": 2, "max_rss_mb": 50},
+            {"samples": [0.2], "items": 1, "max_rss_mb": 60}]
+    summary = summarize_runs(runs, {"peak_mb": 12.5})
+    assert summary["samples"] == 3
+    assert summary["throughput_per_s"] == pytest.approx(3 / 0.6)
+    assert summary["latency_ms"]["p50"] == pytest.approx(200)
+    assert summary["peak_mb"] == 12.5
+    assert summary["max_rss_mb"] == 60
+
+
+def test_compare_flags_only_regressions_past_the_limit():
+    def result(**p50):
+        return {"stages": {stage: {"latency_ms": {"p50": ms}} for stage, ms in p50.items()}}
+
+    baseline = result(crawl=100.0, scrape=100.0, pdf=100.0)
+    current = result(crawl=140.0, scrape=110.0, pdf=90.0)
+    current["stages"]["search"] = {"skipped": "playwright is not installed"}
+    assert compare(current, baseline, 0.25) == ["crawl"]
+    assert compare(current, baseline, None) == []
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from async_runtime import run_sync
+
+pytest.importorskip("playwright.async_api")
+import browser_manager  # noqa: E402
+from browser_manager import BrowserManager  # noqa: E402
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    async def new_page(self):
+        return FakePage()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self):
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.connected = False
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.launches = []
+        self.chromium = self
+
+    async def start(self):
+        return self
+
+    async def launch(self, headless=True):
+        self.launches.append(FakeBrowser())
+        return self.launches[-1]
+
+    async def stop(self):
+        pass
+
+
+@pytest.fixture
+def playwright(monkeypatch):
+    fake = FakePlaywright()
+    monkeypatch.setattr(browser_manager, "async_playwright", lambda: fake)
+    return fake
+
+
+def test_pages_are_reused_until_max_uses(playwright):
+    manager = BrowserManager(pool_size=2, max_uses=2)
+
+    async def checkout():
+        async with manager.page() as page:
+            return page
+
+    async def scenario():
+        pages = [await checkout() for _ in range(3)]
+        await manager.close()
+        return pages
+
+    pages = run_sync(scenario())
+    assert pages[0] is pages[1] and pages[2] is not pages[0]
+    assert len(playwright.launches) == 1
+
+
+def test_failed_page_is_discarded_and_dead_browser_relaunched(playwright):
+    manager = BrowserManager(pool_size=1)
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            async with manager.page() as page:
+                failed = page
+                raise ValueError("navigation failed")
+        async with manager.page() as page:
+            assert page is not failed
+        playwright.launches[0].connected = False
+        async with manager.page() as page:
+            relaunched = page
+        await manager.close()
+        return relaunched
+
+    run_sync(scenario())
+    assert len(playwright.launches) == 2
+
+
+def test_pool_size_bounds_concurrent_pages(playwright):
+    manager = BrowserManager(pool_size=2)
+    active, peak = 0, 0
+
+    async def search():
+        nonlocal active, peak
+        async with manager.page():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def scenario():
+        await asyncio.gather(*(search() for _ in range(6)))
+        await manager.close()
+
+    run_sync(scenario())
+    assert peak == 2
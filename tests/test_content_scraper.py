@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+import content_scraper
+from content_scraper import ImageFetcher, download_image, image_path_for, resolve_image_url
+from http_fakes import FakeResponse, FakeSession
+
+PAGE = "https://shop.test/reviews/phone.html"
+IMAGE = "https://cdn.test/img/phone.png"
+
+
+def leftovers(directory):
+    return [name for name in os.listdir(directory) if name.endswith(".part")]
+
+
+def test_image_urls_resolve_against_the_page():
+    assert resolve_image_url("//cdn.test/a.png", PAGE) == "https://cdn.test/a.png"
+    assert resolve_image_url("../img/a.png", PAGE) == "https://shop.test/img/a.png"
+    assert image_path_for(IMAGE, "images").endswith(".png")
+    assert image_path_for("https://cdn.test/photo?size=large", "images").endswith(".jpg")
+
+
+def test_download_writes_once_and_reuses_the_file(workdir):
+    session = FakeSession({IMAGE: FakeResponse(IMAGE, b"\x89PNG" * 10, headers={"Content-Type": "image/png"})})
+    path = download_image(IMAGE, PAGE, "images", session=session)
+    with open(path, "rb") as f:
+        assert f.read() == b"\x89PNG" * 10
+    assert download_image(IMAGE, PAGE, "images", session=session) == path
+    assert session.urls() == [IMAGE]
+
+
+def test_oversized_image_is_skipped_without_leftovers(workdir):
+    session = FakeSession({IMAGE: FakeResponse(IMAGE, b"x" * 300)})
+    assert download_image(IMAGE, PAGE, "images", session=session, max_bytes=100) is None
+    assert os.listdir("images") == []
+
+
+def test_failed_write_leaves_no_partial_file(workdir, monkeypatch):
+    session = FakeSession({IMAGE: FakeResponse(IMAGE, b"\x89PNG" * 10)})
+
+    real_open = open
+
+    class FullDisk:
+        def __init__(self, path, mode):
+            self.file = real_open(path, mode)
+
+        def write(self, data):
+            raise OSError("No space left on device")
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.file.close()
+
+    # Only the image file goes through content_scraper's open
+    monkeypatch.setattr(content_scraper, "open", FullDisk, raising=False)
+    assert download_image(IMAGE, PAGE, "images", session=session) is None
+    assert leftovers("images") == []
+    assert not os.path.exists(image_path_for(IMAGE, "images"))
+
+
+def test_missing_image_returns_none(workdir):
+    assert download_image(IMAGE, PAGE, "images", session=FakeSession()) is None
+
+
+def test_fetcher_downloads_each_url_once(workdir):
+    session = FakeSession({IMAGE: FakeResponse(IMAGE, b"\x89PNG" * 10)})
+    fetcher = ImageFetcher(max_workers=4, save_dir="images")
+    fetcher.session = session
+    paths = fetcher.fetch_all([IMAGE, "//cdn.test/img/phone.png", "/missing.png"], PAGE)
+    assert paths == [image_path_for(IMAGE, "images")] * 2
+    assert session.urls().count(IMAGE) == 1
@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+pytest.importorskip("scrapy")
+from async_runtime import run_sync  # noqa: E402
+from crawl_engine import CrawlEngine  # noqa: E402
+from http_fakes import FakeResponse, FakeSession  # noqa: E402
+
+HTML = {"Content-Type": "text/html; charset=utf-8"}
+
+
+def article(n):
+    body = "".join(f"<p>Paragraph {i} of review {n}, long enough to count as real article text.</p>"
+                   for i in range(3))
+    return f"<html><body><article>{body}</article></body></html>".encode()
+
+
+def site(n_pages, host="reviews.test"):
+    urls = [f"https://{host}/{n}.html" for n in range(n_pages)]
+    return urls, {url: FakeResponse(url, article(n), headers=HTML) for n, url in enumerate(urls)}
+
+
+@pytest.fixture
+def engine():
+    return CrawlEngine(concurrency=4, per_host=2)
+
+
+def test_crawl_yields_one_item_per_unique_page(engine):
+    urls, routes = site(3)
+    engine.session = FakeSession(routes)
+    items = run_sync(engine.crawl_all(urls + urls[:1]))
+    assert sorted(item["url"] for item in items) == sorted(urls)
+    assert all("Paragraph 2 of review" in item["text"] for item in items)
+    assert sorted(engine.session.urls()) == sorted(urls)
+
+
+def test_engine_is_reusable_across_calls(engine):
+    urls, routes = site(2)
+    engine.session = FakeSession(routes)
+    assert len(run_sync(engine.crawl_all(urls[:1]))) == 1
+    assert len(run_sync(engine.crawl_all(urls[1:]))) == 1
+
+
+def test_errors_and_non_html_pages_are_skipped(engine):
+    urls, routes = site(1)
+    routes["https://reviews.test/data.json"] = FakeResponse("https://reviews.test/data.json", b"{}",
+                                                            headers={"Content-Type": "application/json"})
+
+    def broken(url, headers):
+        raise ConnectionError("connection reset")
+
+    routes["https://reviews.test/broken.html"] = broken
+    engine.session = FakeSession(routes)
+    crawl = urls + ["https://reviews.test/data.json", "https://reviews.test/missing.html",
+                    "https://reviews.test/broken.html"]
+    assert [item["url"] for item in run_sync(engine.crawl_all(crawl))] == urls
+
+
+def test_per_host_limit(engine):
+    active, peak = {}, {}
+
+    class SlowSession(FakeSession):
+        def get(self, url, **kwargs):
+            host = url.split("/")[2]
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), active[host])
+            try:
+                time.sleep(0.02)
+                return super().get(url, **kwargs)
+            finally:
+                active[host] -= 1
+
+    urls_a, routes = site(4, "a.test")
+    urls_b, routes_b = site(4, "b.test")
+    routes.update(routes_b)
+    engine.session = SlowSession(routes)
+    items = run_sync(engine.crawl_all(urls_a + urls_b))
+    assert len(items) == 8
+    assert max(peak.values()) <= 2
+
+
+def test_items_stream_as_pages_finish(engine):
+    urls, routes = site(2)
+    engine.session = FakeSession(routes)
+
+    async def first_item():
+        crawl = engine.crawl(urls)
+        try:
+            return await crawl.__anext__()
+        finally:
+            await crawl.aclose()
+
+    assert run_sync(first_item())["url"] in urls
@@ -0,0 +1,129 @@
+import os
+import re
+
+import pytest
+
+pypdf = pytest.importorskip("pypdf")
+
+from fpdf import FPDF
+from PIL import Image
+
+from file_system_handler import (DEFAULT_PDF_WORKERS, PdfConcatenator, pdf_workers, render_pdf,
+                                 sanitize_text, with_alternate_urls)
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # The image preparer keeps its cache in the working directory
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _entries(n):
+    return [{"url": f"https://example.test/{i}", "summary": f"Summary of article {i}. " * 8,
+             "pros": ["fast"], "cons": ["loud"], "table_rows": [["Spec", "Value"], ["Weight", f"{i} g"]]}
+            for i in range(n)]
+
+
+def _text(path):
+    return "\n".join(page.extract_text() for page in pypdf.PdfReader(path, strict=True).pages)
+
+
+def _source_order(text):
+    return [int(line.rsplit("/", 1)[1]) for line in text.splitlines() if line.startswith("Source: ")]
+
+
+def test_short_report_is_one_document(workdir):
+    render_pdf(_entries(3), {}, "report.pdf", section_size=50)
+    assert _source_order(_text("report.pdf")) == [0, 1, 2]
+
+
+def test_sectioned_report_keeps_every_entry_in_order(workdir):
+    render_pdf(iter(_entries(12)), {"https://example.test/1": ["battery"]}, "report.pdf", section_size=5,
+               workers=1)
+    text = _text("report.pdf")
+    assert _source_order(text) == list(range(12))
+    assert "AI Summarized Report" in text
+    last_page = pypdf.PdfReader("report.pdf").pages[-1].extract_text()
+    assert "Keywords" in last_page and "battery" in last_page
+
+
+def test_parallel_sections_match_serial(workdir):
+    render_pdf(_entries(9), {}, "serial.pdf", section_size=3, workers=1)
+    render_pdf(_entries(9), {}, "parallel.pdf", section_size=3, workers=2)
+    assert _text("serial.pdf") == _text("parallel.pdf")
+
+
+
+def _photo(path, turns=0):
+    img = Image.effect_noise((64, 48), 60).convert("L").resize((640, 480)).convert("RGB").rotate(90 * turns)
+    img.save(path)
+    return str(path)
+
+
+def _embedded_images(path):
+    """Image draws in the page contents (fpdf lists every image in each page's resources)."""
+    return sum(len(re.findall(rb"/I\d+ Do", page.get_contents().get_data()))
+               for page in pypdf.PdfReader(path).pages)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_repeated_images_are_embedded_once_per_report(workdir, workers):
+    logo, other = _photo(workdir / "logo.png"), _photo(workdir / "other.png", turns=1)
+    entries = _entries(6)
+    for entry in entries:
+        entry["images"] = [logo]
+    entries[4]["images"].append(other)
+    render_pdf(entries, {}, "report.pdf", section_size=2, workers=workers)
+    assert _embedded_images("report.pdf") == 2
+
+
+def _part(path, label, image):
+    pdf = FPDF()
+    pdf.set_font("Arial", "", 12)
+    for page in (1, 2):
+        pdf.add_page()
+        pdf.cell(0, 10, f"{label} page {page}", ln=True, link=f"https://{label}.test/{page}")
+        pdf.image(image, w=50)
+    pdf.output(str(path))
+    return str(path)
+
+
+def test_concatenated_parts_keep_links_and_shared_resources(workdir):
+    parts = [_part(workdir / "a.pdf", "alpha", _photo(workdir / "a.png")),
+             _part(workdir / "b.pdf", "beta", _photo(workdir / "b.png", turns=1))]
+    with open("merged.pdf", "wb") as f:
+        merged = PdfConcatenator(f)
+        for part in parts:
+            merged.append(part)
+        merged.close()
+
+    reader = pypdf.PdfReader("merged.pdf", strict=True)
+    pages = reader.pages
+    assert [page.extract_text().strip() for page in pages] == [
+        "alpha page 1", "alpha page 2", "beta page 1", "beta page 2"]
+    links = [page["/Annots"][0].get_object()["/A"]["/URI"] for page in pages]
+    assert links == ["https://alpha.test/1", "https://alpha.test/2", "https://beta.test/1", "https://beta.test/2"]
+    images = [page["/Resources"]["/XObject"].raw_get("/I1").idnum for page in pages]
+    # Each part's image is stored once and shared by its pages
+    assert images[0] == images[1] and images[2] == images[3] and images[0] != images[2]
+    assert len(reader.pages[3].images) == 1
+
+def test_pdf_workers(monkeypatch):
+    monkeypatch.setenv("AGENT_PDF_WORKERS", "3")
+    assert pdf_workers() == 3
+    assert pdf_workers(1) == 1
+    monkeypatch.delenv("AGENT_PDF_WORKERS")
+    assert pdf_workers() == min(DEFAULT_PDF_WORKERS, os.cpu_count() or 1)
+
+
+def test_with_alternate_urls():
+    entries = [{"url": "a"}, {"url": "b"}]
+    result = list(with_alternate_urls(entries, {"c": "a", "d": "a"}))
+    assert result == [{"url": "a", "alternate_urls": ["c", "d"]}, {"url": "b"}]
+
+
+def test_sanitize_text():
+    assert sanitize_text("plain") == "plain"
+    assert sanitize_text("café \U0001F600") == "cafe "
+    assert sanitize_text(None) == ""
@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("lxml")
+from html_extract import (_extract_lxml, _extract_soup, extract_document,  # noqa: E402
+                          table_rows_from_html)
+
+PAGE = """<html><head><title>Phone review</title><style>p { color: red }</style></head><body>
+<h1>The phone, reviewed</h1>
+<p>The battery easily lasts a full day of heavy use, and &amp; charging is quick.</p>
+<p>Short line.</p>
+<p>The screen is <b>bright</b> and sharp, with   accurate colours out of the box.</p>
+<img src="/img/front.png" alt="front"><img data-src="//cdn.test/back.jpg"><img src="/pixel.gif">
+<h2>Pros</h2><ul><li>Battery</li><li> Screen </li></ul>
+<h3>Cons</h3><ul><li>Price</li></ul>
+<table class="specs"><tr><th>Spec</th><th>Value</th></tr><tr><td>Weight</td><td>180 g</td></tr></table>
+<svg width="10" height="10"></svg><canvas></canvas><canvas></canvas>
+</body></html>"""
+URL = "https://reviews.test/phone.html"
+
+
+def test_one_pass_extracts_everything():
+    doc = extract_document(PAGE, URL)
+    assert doc["text"].splitlines()[:2] == [
+        "The battery easily lasts a full day of heavy use, and & charging is quick.",
+        "The screen isbrightand sharp, with   accurate colours out of the box.",
+    ]
+    assert doc["text"].endswith("[Charts Detected: 1 SVG, 2 Canvas]")
+    assert doc["image_urls"] == ["/img/front.png", "//cdn.test/back.jpg"]
+    assert doc["linked_images"] == ["https://reviews.test/img/front.png", "https://reviews.test/pixel.gif"]
+    assert doc["pros"] == ["Battery", "Screen"]
+    assert doc["cons"] == ["Price"]
+    assert doc["table_rows"] == [[["Spec", "Value"], ["Weight", "180 g"]]]
+    assert doc["charts"] == {"svg": 1, "canvas": 2}
+
+
+def test_lxml_matches_beautifulsoup_on_well_formed_markup():
+    assert _extract_lxml(PAGE, URL) == _extract_soup(PAGE, URL)
+
+
+def test_stored_table_html_round_trips():
+    [table] = extract_document(PAGE, URL)["tables"]
+    assert table.startswith('<table class="specs">')
+    assert table_rows_from_html(table) == [["Spec", "Value"], ["Weight", "180 g"]]
+
+
+def test_empty_document():
+    doc = extract_document("", URL)
+    assert doc["text"] == "" and doc["tables"] == [] and doc["image_urls"] == []
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from http_cache import ResponseCache, ResponseTooLarge
+from http_fakes import FakeResponse, FakeSession
+
+URL = "https://reviews.test/phone.html"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "http"), ttl=3600)
+
+
+def page(body=b"<html>v1</html>", **headers):
+    return lambda url, request_headers: FakeResponse(url, body, headers={"Content-Type": "text/html", **headers})
+
+
+def test_fresh_entries_skip_the_network(cache):
+    session = FakeSession({URL: page()})
+    assert cache.get(URL, session=session).content == b"<html>v1</html>"
+    again = cache.get(URL, session=session)
+    assert again.from_cache and again.content == b"<html>v1</html>"
+    assert len(session.requests) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_stale_entries_are_revalidated(tmp_path):
+    cache = ResponseCache(str(tmp_path / "http"), ttl=0)
+    session = FakeSession({URL: page(ETag='"v1"', **{"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})})
+    cache.get(URL, session=session)
+    session.routes[URL] = lambda url, headers: FakeResponse(url, status_code=304)
+    response = cache.get(URL, session=session)
+    assert response.status_code == 200 and response.content == b"<html>v1</html>"
+    assert session.requests[-1][1] == {"If-None-Match": '"v1"',
+                                       "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    assert cache.stats()["revalidated"] == 1
+
+
+def test_changed_pages_replace_the_entry(tmp_path):
+    cache = ResponseCache(str(tmp_path / "http"), ttl=0)
+    session = FakeSession({URL: page()})
+    cache.get(URL, session=session)
+    session.routes[URL] = page(b"<html>v2</html>")
+    assert cache.get(URL, session=session).content == b"<html>v2</html>"
+    cache.ttl = 3600
+    assert cache.get(URL, session=session).content == b"<html>v2</html>"
+
+
+def test_errors_and_no_store_are_not_cached(cache):
+    session = FakeSession({URL: page(**{"Cache-Control": "no-store"})})
+    cache.get(URL, session=session)
+    cache.get(URL, session=session)
+    cache.get("https://reviews.test/missing", session=session)
+    cache.get("https://reviews.test/missing", session=session)
+    assert len(session.requests) == 4
+
+
+def test_size_cap_raises_before_storing(cache):
+    session = FakeSession({URL: page(b"x" * 1000)})
+    with pytest.raises(ResponseTooLarge):
+        cache.get(URL, session=session, max_bytes=100)
+    declared = FakeSession({URL: page(b"x" * 10, **{"Content-Length": "5000"})})
+    with pytest.raises(ResponseTooLarge):
+        cache.get(URL, session=declared, max_bytes=100)
+    assert cache.get(URL, session=session).content == b"x" * 1000
+
+
+def test_identical_bodies_are_stored_once(cache, tmp_path):
+    session = FakeSession({"https://a.test/logo.png": page(b"logo"), "https://b.test/logo.png": page(b"logo")})
+    cache.get("https://a.test/logo.png", session=session)
+    cache.get("https://b.test/logo.png", session=session)
+    bodies = [name for _, _, files in os.walk(tmp_path / "http" / "bodies") for name in files]
+    assert len(bodies) == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "http"), max_bytes=250)
+    urls = [f"https://reviews.test/{n}" for n in range(3)]
+    session = FakeSession({url: page(bytes([n]) * 100) for n, url in enumerate(urls)})
+    cache.get(urls[0], session=session)
+    cache.get(urls[1], session=session)
+    cache.get(urls[0], session=session)  # urls[1] is now the least recently used
+    cache.get(urls[2], session=session)
+    assert cache.stats()["evictions"] == 1
+    requests_before = len(session.requests)
+    cache.get(urls[0], session=session)
+    cache.get(urls[1], session=session)
+    assert session.urls()[requests_before:] == [urls[1]]
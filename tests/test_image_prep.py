@@ -0,0 +1,79 @@
+import os
+import random
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+from image_prep import ImagePreparer, dhash, target_width_px  # noqa: E402
+
+
+def photo(path, size=(2000, 1500), turns=0):
+    """A smooth (seeded) random picture; `turns` quarter rotations make a different one."""
+    small = (size[0] // 50, size[1] // 50)
+    rng = random.Random(0)
+    img = Image.frombytes("L", small, bytes(rng.randrange(256) for _ in range(small[0] * small[1])))
+    img = img.resize(size).convert("RGB")
+    if turns:
+        img = img.rotate(90 * turns)
+    img.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def preparer(tmp_path):
+    return ImagePreparer(cache_dir=str(tmp_path / "cache"))
+
+
+def test_large_images_are_downsampled_jpegs(preparer, tmp_path):
+    prepared = preparer.prepare(photo(tmp_path / "big.png"))
+    with Image.open(prepared) as img:
+        assert img.format == "JPEG" and img.mode == "RGB"
+        assert img.width == target_width_px() == 945
+    assert os.path.getsize(prepared) < os.path.getsize(tmp_path / "big.png")
+
+
+def test_transparency_is_flattened_on_white(preparer, tmp_path):
+    Image.new("RGBA", (40, 30), (0, 0, 0, 0)).save(tmp_path / "clear.png")
+    with Image.open(preparer.prepare(str(tmp_path / "clear.png"))) as img:
+        assert img.size == (40, 30)
+        assert min(img.getpixel((20, 15))) > 240
+
+
+def test_near_duplicates_are_dropped_within_a_report(tmp_path):
+    original = photo(tmp_path / "a.png")
+    with Image.open(original) as img:
+        img.convert("RGB").save(tmp_path / "a_copy.jpg", quality=60)
+    other = photo(tmp_path / "b.png", turns=1)
+
+    preparer = ImagePreparer(cache_dir=str(tmp_path / "cache"))
+    assert preparer.prepare(original) is not None
+    assert preparer.prepare(str(tmp_path / "a_copy.jpg")) is None
+    assert preparer.prepare(other) is not None
+    # A new report starts with no images seen
+    assert ImagePreparer(cache_dir=str(tmp_path / "cache")).prepare(str(tmp_path / "a_copy.jpg"))
+
+
+def test_prepared_images_are_cached_by_content(preparer, tmp_path):
+    first = preparer.prepare(photo(tmp_path / "a.png"))
+    modified = os.path.getmtime(first)
+    os.rename(tmp_path / "a.png", tmp_path / "renamed.png")
+    again = ImagePreparer(cache_dir=str(tmp_path / "cache")).prepare(str(tmp_path / "renamed.png"))
+    assert again == first and os.path.getmtime(again) == modified
+    assert ImagePreparer(cache_dir=str(tmp_path / "cache"), quality=50)._cached_path(b"x") != \
+        preparer._cached_path(b"x")
+
+
+def test_unusable_files_are_skipped(preparer, tmp_path):
+    (tmp_path / "broken.jpg").write_bytes(b"not an image")
+    assert preparer.prepare(str(tmp_path / "broken.jpg")) is None
+    assert preparer.prepare(str(tmp_path / "missing.png")) is None
+    assert preparer.prepare(None) is None
+
+
+def test_dhash_tolerates_small_changes(tmp_path):
+    with Image.open(photo(tmp_path / "a.png")) as img:
+        base = dhash(img)
+        brighter = dhash(img.point(lambda v: min(255, v + 10)))
+        flipped = dhash(img.transpose(Image.FLIP_LEFT_RIGHT))
+    assert bin(base ^ brighter).count("1") <= 5
+    assert bin(base ^ flipped).count("1") > 5
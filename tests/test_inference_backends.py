@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+import inference_backends
+import summarizer
+from inference_backends import backend_for, cache_params, configure, num_threads
+from result_cache import make_key
+
+ENV = ("AGENT_INFERENCE_BACKEND", "AGENT_SUMMARIZER_BACKEND", "AGENT_EMBEDDER_BACKEND", "AGENT_NUM_THREADS",
+       "OMP_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    """Nothing configured: no backends chosen, no thread count, none of the variables set."""
+    monkeypatch.setattr(inference_backends, "_backends", {})
+    monkeypatch.setattr(inference_backends, "_threads", None)
+    for var in ENV:
+        # Set first, so the value configure() writes is undone as well
+        monkeypatch.setenv(var, "")
+        monkeypatch.delenv(var)
+    return monkeypatch
+
+
+def test_eager_is_the_default():
+    assert backend_for("summarizer") == backend_for("embedder") == "eager"
+
+
+def test_environment_for_every_model(settings):
+    settings.setenv("AGENT_INFERENCE_BACKEND", "onnx")
+    assert backend_for("summarizer") == backend_for("embedder") == "onnx"
+
+
+def test_per_model_environment_beats_every_model_settings(settings):
+    settings.setenv("AGENT_INFERENCE_BACKEND", "onnx")
+    settings.setenv("AGENT_SUMMARIZER_BACKEND", "int8")
+    configure("onnx-int8")
+    assert backend_for("summarizer") == "int8"
+    assert backend_for("embedder") == "onnx-int8"
+
+
+def test_configured_default_beats_the_environment_default(settings):
+    settings.setenv("AGENT_INFERENCE_BACKEND", "onnx")
+    configure("int8")
+    assert backend_for("embedder") == "int8"
+
+
+def test_configured_model_beats_everything(settings):
+    settings.setenv("AGENT_SUMMARIZER_BACKEND", "onnx")
+    configure("int8", summarizer="onnx-int8")
+    assert backend_for("summarizer") == "onnx-int8"
+    assert backend_for("embedder") == "int8"
+
+
+def test_unknown_backends_are_rejected(settings):
+    with pytest.raises(ValueError, match="Unknown inference backend 'gpu'"):
+        configure("gpu")
+    settings.setenv("AGENT_EMBEDDER_BACKEND", "fp16")
+    with pytest.raises(ValueError, match="for embedder"):
+        backend_for("embedder")
+
+
+def test_eager_leaves_cache_keys_unchanged(settings):
+    # Summaries cached before backends existed keep matching under eager
+    before = {"max_length": 150, "min_length": 40, "max_chunk_tokens": None}
+    assert cache_params("summarizer") == {}
+    assert make_key("text", summarizer.MODEL_NAME, {**before, **cache_params("summarizer")}) == \
+        make_key("text", summarizer.MODEL_NAME, before)
+    settings.setenv("AGENT_SUMMARIZER_BACKEND", "int8")
+    assert cache_params("summarizer") == {"backend": "int8"}
+    assert make_key("text", summarizer.MODEL_NAME, {**before, **cache_params("summarizer")}) != \
+        make_key("text", summarizer.MODEL_NAME, before)
+
+
+def test_threads_are_set_by_configure_only(settings):
+    settings.setenv("AGENT_NUM_THREADS", "3")
+    assert num_threads() == 3
+    # Reading the count never touches the thread pools
+    assert "OMP_NUM_THREADS" not in os.environ
+    configure(threads=2)
+    assert num_threads() == 2
+    assert os.environ["OMP_NUM_THREADS"] == os.environ["MKL_NUM_THREADS"] == "2"
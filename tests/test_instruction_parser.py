@@ -0,0 +1,101 @@
+import pytest
+
+import instruction_parser
+from instruction_parser import _parse_with_rules, exact_label, parse_instruction
+
+
+@pytest.fixture
+def ranking(monkeypatch):
+    """Replace the embedding router with a fixed {label: score} ranking."""
+    def use(scores):
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        monkeypatch.setattr(instruction_parser, "classify_intent", lambda instruction: ranked)
+    return use
+
+
+# -------------------- Keyword rules --------------------
+def test_rules_detect_intent_and_commands():
+    parsed = _parse_with_rules("Search smartphone reviews, summarize the pros and cons and export a PDF")
+    assert parsed["intent"] == "web"
+    assert {"summarize", "export_to_pdf", "scrape_reviews", "extract_pros_cons"} <= set(parsed["commands"])
+    assert parsed["label"] == "extract pros/cons from reviews"
+
+
+def test_rules_terminal_and_file_intents():
+    assert _parse_with_rules("open a bash shell")["intent"] == "terminal"
+    assert _parse_with_rules("save the notes")["intent"] == "file_handler"
+
+
+def test_rules_fall_back_to_general_task():
+    parsed = _parse_with_rules("hello there")
+    assert parsed["intent"] == "unknown"
+    assert parsed["commands"] == ["general_task"]
+
+
+def test_rules_detect_keywords():
+    assert "extract_keywords" in _parse_with_rules("pull keywords from the summaries")["commands"]
+
+
+# -------------------- Router --------------------
+def test_exact_label():
+    assert exact_label("List files") == "list files"
+    assert exact_label("please export to PDF.") == "export to pdf"
+    assert exact_label("list files in my home") is None
+    assert exact_label("unknown") is None
+
+
+def test_exact_label_skips_the_embedder(monkeypatch):
+    def fail(instruction):
+        raise AssertionError("the embedder should not be needed")
+    monkeypatch.setattr(instruction_parser, "classify_intent", fail)
+    parsed = parse_instruction("list files")
+    assert parsed["intent"] == "terminal" and parsed["score"] == 1.0
+
+
+def test_mutating_command_needs_the_exact_label(ranking):
+    ranking({"remove temp files": 0.97, "list files": 0.3})
+    parsed = parse_instruction("tidy up this folder")
+    assert parsed["intent"] != "terminal"
+    assert not any("rm" in cmd or "del" in cmd for cmd in parsed["commands"])
+    exact = parse_instruction("remove temp files")
+    assert exact["commands"] == [instruction_parser.COMMAND_MAP["remove temp files"]]
+
+
+def test_terminal_labels_need_a_close_match(ranking):
+    ranking({"list files": 0.7, "search web": 0.2})
+    assert parse_instruction("what is in here")["intent"] == "unknown"
+    ranking({"list files": 0.9, "list pdf files": 0.85})
+    parsed = parse_instruction("what is in here")
+    assert parsed["intent"] == "terminal"
+    assert parsed["commands"] == [instruction_parser.COMMAND_MAP["list files"]]
+
+
+def test_compound_instruction_keeps_every_pipeline_command(ranking):
+    ranking({"search and summarize": 0.72, "export to pdf": 0.58, "extract keywords": 0.55,
+             "list files": 0.6})
+    parsed = parse_instruction("search and summarize solar news, then export to pdf with keywords")
+    assert parsed["intent"] == "web"
+    assert parsed["label"] == "search and summarize"
+    assert set(parsed["commands"]) == {"scrape", "summarize", "export_to_pdf", "extract_keywords"}
+
+
+def test_runner_up_labels_add_no_commands(ranking):
+    ranking({"search web": 0.83, "export to pdf": 0.62, "extract keywords": 0.51})
+    parsed = parse_instruction("look up reviews of the new solar panels")
+    assert parsed["label"] == "search web"
+    assert parsed["commands"] == ["scrape"]
+
+
+def test_rules_decide_below_the_threshold(ranking):
+    ranking({"search web": 0.3})
+    parsed = parse_instruction("find reviews of laptops")
+    assert parsed["intent"] == "web"
+    assert parsed["score"] == pytest.approx(0.3)
+
+
+def test_embedder_failure_falls_back_to_rules(monkeypatch):
+    def broken(instruction):
+        raise RuntimeError("no model")
+    monkeypatch.setattr(instruction_parser, "classify_intent", broken)
+    parsed = parse_instruction("search for the latest gpu headlines")
+    assert parsed["intent"] == "web" and parsed["score"] == 0.0
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+import instrumentation
+from instrumentation import (count, counters, export_json, export_prometheus, new_trace, span, stage_totals,
+                             traced)
+
+
+@pytest.fixture(autouse=True)
+def tracing():
+    instrumentation.enable()
+    instrumentation.reset()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def test_disabled_spans_and_counters_record_nothing():
+    instrumentation.disable()
+    with span("fetch") as s:
+        s.set(url="https://example.test")
+    count("pages")
+    assert stage_totals() == {}
+    assert counters() == {}
+
+
+def test_spans_nest_and_total_per_name():
+    with span("pipeline"):
+        for _ in range(3):
+            with span("summarize", chunks=2):
+                pass
+    totals = stage_totals()
+    assert totals["summarize"]["calls"] == 3
+    assert totals["pipeline"]["calls"] == 1
+    assert totals["pipeline"]["seconds"] >= totals["summarize"]["seconds"]
+
+
+def test_spans_nest_across_tasks():
+    async def child():
+        with span("child"):
+            await asyncio.sleep(0)
+
+    async def main():
+        with span("parent") as parent:
+            await asyncio.gather(child(), child())
+        return parent.id
+
+    parent_id = asyncio.run(main())
+    path = export_json("trace.json")
+    with open(path, encoding="utf-8") as f:
+        events = [e for e in json.load(f)["traceEvents"] if e["ph"] == "X"]
+    assert [e["args"]["parent"] for e in events if e["name"] == "child"] == [parent_id, parent_id]
+
+
+def test_new_trace_keeps_concurrent_jobs_apart():
+    traces = {}
+    started = threading.Barrier(2)
+
+    def job(name):
+        with new_trace() as trace:
+            started.wait()
+            with span(name):
+                count(f"{name}.pages")
+            traces[name] = (stage_totals(), counters())
+
+    threads = [threading.Thread(target=job, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert list(traces["a"][0]) == ["a"] and traces["a"][1] == {"a.pages": 1}
+    assert list(traces["b"][0]) == ["b"] and traces["b"][1] == {"b.pages": 1}
+    assert stage_totals() == {} and counters() == {}
+
+
+def test_failed_span_records_the_error():
+    with pytest.raises(ValueError):
+        with span("scrape"):
+            raise ValueError("bad page")
+    assert stage_totals()["scrape"]["calls"] == 1
+    with open(export_json(), encoding="utf-8") as f:
+        (event,) = [e for e in json.load(f)["traceEvents"] if e["ph"] == "X"]
+    assert event["args"]["error"] == "ValueError"
+
+
+def test_traced_uses_the_qualified_name():
+    @traced()
+    def render():
+        return "pdf"
+
+    assert render() == "pdf"
+    assert list(stage_totals()) == ["test_traced_uses_the_qualified_name.<locals>.render"]
+
+
+def test_export_json_is_chrome_trace_format():
+    with span("crawl", url=object()):
+        count("http.cache_hit", 2)
+    with open(export_json("trace.json"), encoding="utf-8") as f:
+        data = json.load(f)
+    (event,) = [e for e in data["traceEvents"] if e["ph"] == "X"]
+    assert event["name"] == "crawl"
+    assert event["dur"] >= 0
+    assert isinstance(event["args"]["url"], str)
+    assert data["counters"] == {"http.cache_hit": 2}
+
+
+def test_export_prometheus_sanitizes_counter_names():
+    with span("keywords"):
+        pass
+    count("http.cache-hit", 3)
+    with open(export_prometheus("metrics.prom"), encoding="utf-8") as f:
+        text = f.read()
+    assert 'agent_stage_calls_total{stage="keywords"} 1' in text
+    assert "agent_http_cache_hit_total 3" in text
+
+
+def test_memory_tracing_records_span_peaks():
+    instrumentation.disable()
+    instrumentation.enable(trace_memory=True)
+    with span("images"):
+        block = bytearray(4 * 2 ** 20)
+    del block
+    assert stage_totals()["images"]["peak_bytes"] >= 4 * 2 ** 20
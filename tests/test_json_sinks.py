@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from json_sinks import JsonArrayWriter, JsonObjectWriter, iter_entries, iter_json_array
+
+
+def test_array_writer_matches_json_dump(tmp_path):
+    items = [{"url": "u1", "images": ["a.png"], "nested": {"x": [1, 2]}}, "text", 3, []]
+    with JsonArrayWriter(str(tmp_path / "out.json")) as writer:
+        for item in items:
+            writer.append(item)
+    assert (tmp_path / "out.json").read_text(encoding="utf-8") == json.dumps(items, indent=2)
+
+
+def test_empty_containers(tmp_path):
+    JsonArrayWriter(str(tmp_path / "a.json")).close()
+    JsonObjectWriter(str(tmp_path / "o.json")).close()
+    assert json.loads((tmp_path / "a.json").read_text()) == []
+    assert json.loads((tmp_path / "o.json").read_text()) == {}
+
+
+def test_object_writer_matches_json_dump(tmp_path):
+    members = {"https://a.test/é": ["écran", "batterie"], "u2": []}
+    with JsonObjectWriter(str(tmp_path / "out.json"), ensure_ascii=False) as writer:
+        for key, value in members.items():
+            writer.add(key, value)
+    assert (tmp_path / "out.json").read_text(encoding="utf-8") == json.dumps(members, indent=2,
+                                                                           ensure_ascii=False)
+
+
+def test_object_writer_keeps_the_file_valid(tmp_path):
+    with JsonObjectWriter(str(tmp_path / "out.json")) as writer:
+        assert writer.add("u1", ["first"])
+        assert not writer.add("u1", ["again"])
+        assert not writer.add(None, ["no url"])
+        assert writer.add(7, ["number"])
+    assert json.loads((tmp_path / "out.json").read_text()) == {"u1": ["first"], "7": ["number"]}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64 * 1024])
+def test_array_is_read_back_element_by_element(tmp_path, chunk_size):
+    items = [{"url": f"u{i}", "text": "a, b ] c" * i, "n": 10 ** i} for i in range(8)] + [12345, "x"]
+    (tmp_path / "items.json").write_text(json.dumps(items, indent=2), encoding="utf-8")
+    assert list(iter_json_array(str(tmp_path / "items.json"), chunk_size=chunk_size)) == items
+
+
+def test_truncated_or_wrong_files_raise(tmp_path):
+    (tmp_path / "cut.json").write_text('[{"url": "u1"}, {"url": ', encoding="utf-8")
+    (tmp_path / "object.json").write_text('{"url": "u1"}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(tmp_path / "cut.json")))
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(tmp_path / "object.json")))
+
+
+def test_entries_from_jsonl(tmp_path):
+    (tmp_path / "items.jsonl").write_text('{"url": "u1"}\n\n{"url": "u2"}\n', encoding="utf-8")
+    assert [entry["url"] for entry in iter_entries(str(tmp_path / "items.jsonl"))] == ["u1", "u2"]
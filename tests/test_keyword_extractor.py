@@ -0,0 +1,106 @@
+import json
+import zlib
+
+import numpy as np
+import pytest
+
+import keyword_extractor
+from keyword_extractor import extract_keywords, extract_keywords_batch
+from model_registry import register
+
+
+class HashingEmbedder:
+    """Sentence-transformer stand-in: L2-normalised hashed bag of words."""
+
+    dim = 256
+
+    def embed(self, documents, verbose=False):
+        vectors = np.zeros((len(documents), self.dim), dtype="float32")
+        for row, document in enumerate(documents):
+            for word in document.lower().split():
+                vectors[row, zlib.crc32(word.encode()) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, documents, verbose=False):
+        self.calls.append(len(documents))
+        return super().embed(documents)
+
+
+class StandInKeyBERT:
+    def __init__(self):
+        self.model = CountingEmbedder()
+
+
+@pytest.fixture
+def embedder():
+    keybert = StandInKeyBERT()
+    register("keybert", lambda: keybert)
+    yield keybert.model
+    register("keybert", keyword_extractor._load_keybert)
+
+
+def similarities(text):
+    """KeyBERT's per-document scores: {candidate word: similarity to the document}."""
+    from sklearn.feature_extraction.text import CountVectorizer
+    embedder = HashingEmbedder()
+    words = list(CountVectorizer(stop_words="english").fit([text]).get_feature_names_out())
+    return dict(zip(words, embedder.embed(words) @ embedder.embed([text])[0]))
+
+
+TEXTS = [
+    "The battery lasts two days and the battery charges quickly.",
+    "",
+    "A bright screen, loud speakers and a sharp camera for the price.",
+]
+
+
+def test_batch_matches_per_document_scoring(embedder):
+    batched = extract_keywords_batch(TEXTS, top_n=3)
+    assert batched[1] == []
+    for text, keywords in zip(TEXTS, batched):
+        if text:
+            # Same scores as one document at a time (ties may come out in either order)
+            scores = similarities(text)
+            best = sorted(scores.values(), reverse=True)[:3]
+            assert [scores[word] for word in keywords] == pytest.approx(best)
+
+
+def test_batch_embeds_documents_and_words_once(embedder):
+    extract_keywords_batch(TEXTS, top_n=3)
+    assert len(embedder.calls) == 2
+
+
+def test_mmr_picks_distinct_keywords(embedder):
+    [keywords] = extract_keywords_batch([TEXTS[2]], top_n=4, use_mmr=True, diversity=0.7)
+    assert len(keywords) == len(set(keywords)) == 4
+
+
+def test_stop_words_only(embedder):
+    assert extract_keywords_batch(["the and of", "   "]) == [[], []]
+    assert embedder.calls == []
+
+
+def test_keyword_file_is_valid_json_with_one_entry_per_url(embedder, tmp_path):
+    summaries = [{"url": "u1", "summary": TEXTS[0]}, {"url": None, "summary": TEXTS[2]},
+                 {"url": "u2", "summary": TEXTS[2]}, {"url": "u1", "summary": TEXTS[2]}]
+    (tmp_path / "summary.json").write_text(json.dumps(summaries), encoding="utf-8")
+    extract_keywords(str(tmp_path / "summary.json"), str(tmp_path / "keywords.json"), top_n=3)
+    keywords = json.loads((tmp_path / "keywords.json").read_text(encoding="utf-8"))
+    assert set(keywords) == {"u1", "u2"}
+    assert keywords["u1"] == keywords["u2"] == extract_keywords_batch([TEXTS[2]], top_n=3)[0]
+
+
+def test_cached_keywords_skip_the_model(embedder, tmp_path):
+    (tmp_path / "summary.json").write_text(json.dumps([{"url": "u1", "summary": TEXTS[0]}]), encoding="utf-8")
+    extract_keywords(str(tmp_path / "summary.json"), str(tmp_path / "first.json"))
+    calls = len(embedder.calls)
+    extract_keywords(str(tmp_path / "summary.json"), str(tmp_path / "second.json"))
+    assert len(embedder.calls) == calls
+    assert (tmp_path / "first.json").read_text(encoding="utf-8") == (tmp_path / "second.json").read_text(
+        encoding="utf-8")
@@ -0,0 +1,128 @@
+import os
+
+import lxml.html
+import pytest
+
+from main_content import (TEMPLATE_MIN_WINS, TemplateStore, block_path, domain_of,
+                          select_main_paragraphs)
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "fixtures", "main_content")
+FIXTURES = sorted(name for name in os.listdir(FIXTURE_DIR) if name.endswith(".html"))
+
+ARTICLE = """
+<html><body>
+  <nav><a href="/">Home</a> <a href="/news">News</a></nav>
+  <div class="cookie-banner">
+    <p>We use cookies to improve your experience on this website, please accept them all.</p>
+  </div>
+  <article class="post">
+    <p>The new phone keeps a full day of battery, even with the screen at its brightest setting.</p>
+    <p>Its camera is sharp in daylight, though low light photos are noisy and a little soft.</p>
+  </article>
+  <section class="comments"><p>Great review, thanks a lot for writing this up for all of us!</p></section>
+  <footer><p>Copyright 2024 Example Media, all rights reserved, every single one of them.</p></footer>
+</body></html>
+"""
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TemplateStore(str(tmp_path / "templates.db"))
+
+
+def texts(paragraphs):
+    return [" ".join(p.text_content().split()) for p in paragraphs]
+
+
+@pytest.mark.parametrize("name", FIXTURES)
+def test_fixture_body_paragraphs_are_selected(name, store):
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        root = lxml.html.fromstring(f.read())
+    expected = texts(p for p in root.iter("p") if p.get("data-eval") == "body")
+    assert expected
+    assert texts(select_main_paragraphs(root, "https://www.example.test/a", store=store)) == expected
+
+
+def test_chrome_is_dropped():
+    root = lxml.html.fromstring(ARTICLE)
+    selected = texts(select_main_paragraphs(root))
+    assert len(selected) == 2
+    assert selected[0].startswith("The new phone")
+    assert not any("cookies" in text or "Copyright" in text or "Great review" in text for text in selected)
+
+
+def test_no_article_returns_nothing():
+    root = lxml.html.fromstring("<html><body><nav><a href='/'>Home</a></nav><p>Hi.</p></body></html>")
+    assert select_main_paragraphs(root) == []
+
+
+def test_domain_of_strips_www():
+    assert domain_of("https://WWW.Example.test/path") == "example.test"
+    assert domain_of(None) == ""
+
+
+# -------------------- Templates --------------------
+def test_template_is_trusted_after_enough_wins(store):
+    url = "https://www.example.test/review"
+    for _ in range(TEMPLATE_MIN_WINS):
+        assert store.template("example.test") is None
+        select_main_paragraphs(lxml.html.fromstring(ARTICLE), url, store=store)
+    path = store.template("example.test")
+    assert path == "body>article.post"
+    root = lxml.html.fromstring(ARTICLE)
+    assert block_path(next(root.iter("article"))) == path
+
+
+def test_template_is_followed_and_forgotten(store):
+    for _ in range(TEMPLATE_MIN_WINS):
+        store.record("example.test", "body>div.story")
+    page = ("<html><body><div class='story'><p>A paragraph of the story, long enough to be scored.</p>"
+            "<p>Another one of about the same length, also scored.</p></div>"
+            "<div class='other'><p>A longer paragraph that the scorer alone would have preferred, "
+            "with commas, clauses, and plenty of words.</p></div></body></html>")
+    root = lxml.html.fromstring(page)
+    selected = texts(select_main_paragraphs(root, "https://example.test/x", store=store))
+    assert selected == ["A paragraph of the story, long enough to be scored.",
+                        "Another one of about the same length, also scored."]
+    store.forget("example.test")
+    assert store.template("example.test") is None
+
+
+def test_redesign_is_relearned(store):
+    for _ in range(TEMPLATE_MIN_WINS):
+        store.record("example.test", "body>div.story")
+    # The old block survives as a teaser strip; the article moved
+    page = ("<html><body><div class='story'><p>Short.</p><p>Also short.</p></div>"
+            "<article class='v2'><p>The article now lives here, with commas, clauses, and plenty of words.</p>"
+            "<p>Its second paragraph is just as long, and just as full of words.</p></article></body></html>")
+    selected = texts(select_main_paragraphs(lxml.html.fromstring(page), "https://example.test/x", store=store))
+    assert selected[0].startswith("The article now lives here")
+    for _ in range(TEMPLATE_MIN_WINS * 2):
+        select_main_paragraphs(lxml.html.fromstring(page), "https://example.test/x", store=store)
+    assert store.template("example.test") == "body>article.v2"
+
+
+@pytest.mark.parametrize("hints", ['class="shareholders-report"', 'class="metadata-free"',
+                                   'id="canvas"', 'class="subheader hashtags"'])
+def test_negative_hints_match_whole_tokens(hints):
+    page = (f"<html><body><div {hints}><p>The block with the article, long enough to be scored, "
+            f"with commas, clauses, and words.</p></div><div class='filler'><p>Short.</p></div></body></html>")
+    selected = texts(select_main_paragraphs(lxml.html.fromstring(page)))
+    assert selected and selected[0].startswith("The block with the article")
+
+
+def test_content_block_with_a_chrome_class_is_kept():
+    page = ("<html><body><div class='post share-enabled'>"
+            "<p>The whole article sits in a block that also enables the share buttons, sadly.</p>"
+            "<p>Its second paragraph, too, with commas, clauses, and plenty of words.</p></div>"
+            "<div class='share'><p>Share this article with your friends and your whole family.</p></div>"
+            "</body></html>")
+    selected = texts(select_main_paragraphs(lxml.html.fromstring(page)))
+    assert len(selected) == 2 and selected[0].startswith("The whole article")
+
+
+def test_template_needs_majority_share(store):
+    for _ in range(TEMPLATE_MIN_WINS):
+        store.record("example.test", "body>article")
+        store.record("example.test", "body>main")
+    assert store.template("example.test") is None
@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import model_registry
+from benchmarks.startup import HEAVY_MODULES
+from model_registry import get_model, is_loaded, register, warm_up
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    """A private registry, so test models never replace the real ones."""
+    monkeypatch.setattr(model_registry, "_factories", {})
+    monkeypatch.setattr(model_registry, "_models", {})
+    monkeypatch.setattr(model_registry, "_model_locks", {})
+    monkeypatch.setattr(model_registry, "_PROVIDERS", {})
+
+
+def test_model_is_built_once_on_first_use():
+    builds = []
+    register("toy", lambda: builds.append(1) or object())
+    assert not is_loaded("toy")
+    assert get_model("toy") is get_model("toy")
+    assert builds == [1]
+    assert is_loaded("toy")
+
+
+def test_concurrent_first_use_builds_once():
+    builds = []
+
+    def slow():
+        time.sleep(0.05)
+        builds.append(1)
+        return object()
+
+    register("toy", slow)
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(get_model("toy"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert builds == [1]
+    assert len({id(model) for model in models}) == 1
+
+
+def test_register_replaces_a_loaded_model():
+    register("toy", lambda: "old")
+    assert get_model("toy") == "old"
+    register("toy", lambda: "new")
+    assert get_model("toy") == "new"
+
+
+def test_unknown_model_raises():
+    with pytest.raises(KeyError):
+        get_model("missing")
+
+
+def test_warm_up_survives_failing_factories(capsys):
+    def broken():
+        raise RuntimeError("no weights")
+
+    register("broken", broken)
+    register("toy", lambda: "ok")
+    warm_up(["broken", "toy"], background=False)
+    assert is_loaded("toy") and not is_loaded("broken")
+    assert "Warm-up failed for 'broken'" in capsys.readouterr().out
+
+
+def test_startup_imports_no_heavy_modules():
+    code = f"import sys, task_handler; print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    root = os.path.dirname(os.path.abspath(model_registry.__file__))
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=root)
+    assert out.stdout.strip() == "[]"
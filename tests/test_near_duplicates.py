@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from near_duplicates import DuplicateIndex, RunDeduplicator, minhash, shingles, similarity
+
+VOCABULARY = ("grid battery solar demand evening peak operator storage summer heat record price region "
+              "capacity forecast load wind plant reserve margin output hour network supply").split()
+
+
+def story(seed, words=200):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def edited(text, every=60):
+    """`text` with one word in every `every` replaced, like a mirror's light copy-edit."""
+    words = text.split()
+    for i in range(0, len(words), every):
+        words[i] = "edited"
+    return " ".join(words)
+
+
+@pytest.fixture
+def index(tmp_path):
+    return DuplicateIndex(str(tmp_path / "minhash.db"))
+
+
+# -------------------- Signatures --------------------
+def test_shingles_are_lowercased_word_windows():
+    assert shingles("One two Three, four five six", size=5) == {"one two three four five",
+                                                                "two three four five six"}
+    assert shingles("too short", size=5) == set()
+
+
+def test_minhash_is_deterministic_and_none_for_short_text():
+    assert minhash("only four words here") is None
+    assert (minhash(story(1)) == minhash(story(1))).all()
+
+
+def test_similarity_separates_copies_from_other_stories():
+    original = minhash(story(1))
+    assert similarity(original, minhash(edited(story(1)))) >= 0.8
+    assert similarity(original, minhash(story(2))) < 0.3
+
+
+# -------------------- Index --------------------
+def test_index_groups_near_duplicates(index):
+    first, second = story(1), edited(story(1))
+    cluster = index.add("https://a.test/1", minhash(first))
+    assert index.add("https://b.test/1", minhash(second)) == cluster
+    assert index.add("https://c.test/2", minhash(story(2))) != cluster
+
+
+def test_index_remembers_pages_across_instances(tmp_path):
+    path = str(tmp_path / "minhash.db")
+    cluster = DuplicateIndex(path).add("https://a.test/1", minhash(story(1)))
+    assert DuplicateIndex(path).add("https://b.test/1", minhash(edited(story(1)))) == cluster
+
+
+def test_index_prunes_oldest_documents(tmp_path):
+    path = str(tmp_path / "minhash.db")
+    index = DuplicateIndex(path)
+    for n in range(3):
+        index.add(f"https://a.test/{n}", minhash(story(n)))
+    pruned = DuplicateIndex(path, max_docs=1)
+    assert pruned._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0] == 1
+    assert pruned._db.execute("SELECT COUNT(*) FROM clusters").fetchone()[0] == 1
+
+
+# -------------------- Runs --------------------
+def test_run_deduplicator_points_copies_at_first_page(index):
+    dedup = RunDeduplicator(index)
+    assert dedup.check("https://a.test/1", story(1)) is None
+    assert dedup.check("https://b.test/1", edited(story(1))) == "https://a.test/1"
+    assert dedup.check("https://c.test/2", story(2)) is None
+    assert dedup.check("https://d.test/3", "too short to compare") is None
+    assert dedup.duplicates == 1
+
+
+def test_story_seen_in_an_earlier_run_is_canonical_in_a_new_one(index):
+    RunDeduplicator(index).check("https://a.test/1", story(1))
+    assert RunDeduplicator(index).check("https://b.test/1", edited(story(1))) is None
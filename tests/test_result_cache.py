@@ -0,0 +1,50 @@
+import pytest
+
+from result_cache import ResultCache, make_key
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "results.db")
+
+
+# -------------------- Keys --------------------
+def test_key_covers_text_model_and_params():
+    key = make_key("text", "model-a", {"max_length": 150, "min_length": 40})
+    assert key == make_key("text", "model-a", {"min_length": 40, "max_length": 150})
+    assert key != make_key("text ", "model-a", {"max_length": 150, "min_length": 40})
+    assert key != make_key("text", "model-b", {"max_length": 150, "min_length": 40})
+    assert key != make_key("text", "model-a", {"max_length": 100, "min_length": 40})
+    assert key != make_key("text", "model-a", {"max_length": 150})
+
+
+def test_key_accepts_unpaired_surrogates():
+    # Scraped text can carry lone surrogates from broken pages
+    assert make_key("\ud800", "m", {}) != make_key("\ud801", "m", {})
+
+
+# -------------------- Storage --------------------
+def test_values_round_trip_per_params(path):
+    cache = ResultCache("summaries", "model-a", path=path)
+    cache.put_many([("one", "summary one"), ("two", ["kw", "list"])], max_length=150)
+    assert cache.get_many(["two", "one", "three"], max_length=150) == [["kw", "list"], "summary one", None]
+    assert cache.get("one", max_length=100) is None
+    assert cache.stats() == {"hits": 2, "misses": 2}
+
+
+def test_entries_persist_and_model_change_drops_them(path):
+    ResultCache("summaries", "model-a", path=path).put("one", "summary")
+    assert ResultCache("summaries", "model-a", path=path).get("one") == "summary"
+    ResultCache("keywords", "model-k", path=path).put("one", ["kw"])
+    assert ResultCache("summaries", "model-b", path=path).get("one") is None
+    assert ResultCache("summaries", "model-a", path=path).get("one") is None
+    assert ResultCache("keywords", "model-k", path=path).get("one") == ["kw"]
+
+
+def test_least_recently_used_entries_are_evicted(path):
+    cache = ResultCache("summaries", "model-a", path=path, max_entries=2)
+    cache.put("one", 1)
+    cache.put("two", 2)
+    cache.get("one")
+    cache.put("three", 3)
+    assert cache.get_many(["one", "two", "three"]) == [1, None, 3]
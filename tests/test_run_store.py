@@ -0,0 +1,231 @@
+import json
+import os
+
+import pytest
+
+from run_store import RunStore, RunStoreSink
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RunStore(str(tmp_path / "runs.db"))
+
+
+def page(n, text=None):
+    return {"url": f"https://example.test/{n}", "text": text or f"page {n} text", "images": [f"img_{n}.png"],
+            "pros": ["fast"], "cons": ["loud"], "table_rows": [["Spec", "Value"]]}
+
+
+def blob_count(store):
+    return store._db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+
+
+# -------------------- Runs and rows --------------------
+def test_pages_round_trip_in_order(store):
+    run = store.create_run("phones", ["scrape"])
+    store.add_pages(run, [page(0), page(1)])
+    store.add_page(run, page(2))
+    pages = list(store.iter_pages(run))
+    assert [p["url"] for p in pages] == [page(n)["url"] for n in range(3)]
+    assert pages[1] == page(1)
+    assert "text" not in next(store.iter_pages(run, with_text=False))
+
+
+def test_identical_texts_share_one_blob(store):
+    run = store.create_run("phones")
+    store.add_pages(run, [page(0, "same text"), page(1, "same text")])
+    hashes = store.page_hashes(run)
+    assert len(set(hashes.values())) == 1
+
+
+def test_summaries_carry_page_details_and_alternates(store):
+    run = store.create_run("phones")
+    store.add_pages(run, [page(0)])
+    store.add_summaries(run, [{"url": page(0)["url"], "summary": "Good phone."}])
+    store.add_duplicate(run, "https://mirror.test/0", page(0)["url"])
+    [entry] = store.iter_summaries(run)
+    assert entry["summary"] == "Good phone."
+    assert entry["images"] == ["img_0.png"]
+    assert entry["alternate_urls"] == ["https://mirror.test/0"]
+
+
+def test_latest_run_filters_by_stage(store):
+    first = store.create_run("a")
+    store.add_keywords(first, "u", ["battery"])
+    store.finish_run(first)
+    second = store.create_run("b")
+    store.finish_run(second)
+    assert store.latest_run() == second
+    assert store.latest_run(stage="extract_keywords") == first
+    assert store.latest_run(stage="extract_keywords", exclude=first) is None
+
+
+def test_latest_run_skips_running_and_failed_runs(store):
+    done = store.create_run("a")
+    store.add_summaries(done, [{"url": "u", "summary": "Good."}])
+    store.finish_run(done)
+    failed = store.create_run("b")
+    store.add_summaries(failed, [{"url": "u", "summary": "Half"}])
+    store.finish_run(failed, "failed")
+    running = store.create_run("c")
+    store.add_summaries(running, [{"url": "u", "summary": "Still"}])
+    assert store.latest_run("summarize") == done
+
+
+def test_rewritten_url_does_not_reuse_a_taken_seq(store):
+    run = store.create_run("a")
+    store.add_summaries(run, [{"url": "u0", "summary": "0"}, {"url": "u1", "summary": "1"}])
+    store.add_summaries(run, [{"url": "u0", "summary": "0 again"}])
+    store.add_summaries(run, [{"url": "u2", "summary": "2"}])
+    seqs = store._db.execute("SELECT url, seq FROM summaries WHERE run_id = ? ORDER BY seq", (run,)).fetchall()
+    assert seqs == [("u1", 1), ("u0", 2), ("u2", 3)]
+
+
+def test_copy_keywords_replaces_target_rows(store):
+    source, target = store.create_run("a"), store.create_run("b")
+    store.add_keyword_rows(source, [("u1", ["battery"]), ("u2", ["screen", "price"])])
+    store.add_keywords(target, "old", ["stale"])
+    store.copy_keywords(source, target)
+    assert store.keywords(target) == {"u1": ["battery"], "u2": ["screen", "price"]}
+
+
+# -------------------- Stage records --------------------
+def test_stage_digest_follows_content(store):
+    a, b, c = (store.create_run(q) for q in "abc")
+    assert store.stage_digest(a, "summarize") is None
+    for run, summary in ((a, "same"), (b, "same"), (c, "different")):
+        store.add_summary(run, {"url": "u", "summary": summary})
+    assert store.stage_digest(a, "summarize") == store.stage_digest(b, "summarize")
+    assert store.stage_digest(a, "summarize") != store.stage_digest(c, "summarize")
+
+
+def test_find_stage_returns_newest_record_per_workdir(store, tmp_path):
+    elsewhere = str(tmp_path / "elsewhere")
+    old, new = store.create_run("a"), store.create_run("b", workdir=elsewhere)
+    store.record_stage(old, "summarize", "in", "out-1", "done", entries=3)
+    store.record_stage(new, "summarize", "in", "out-2", "done", entries=3)
+    assert store.find_stage("summarize", "in")["output_hash"] == "out-2"
+    assert store.find_stage("summarize", "in", workdir=".")["run_id"] == old
+    assert store.find_stage("summarize", "other") is None
+    assert store.stages(old) == [{"stage": "summarize", "status": "done", "entries": 3, "recomputed": None}]
+
+
+# -------------------- Pruning --------------------
+def test_prune_keeps_newest_runs_and_drops_orphan_blobs(store):
+    runs = []
+    for n in range(4):
+        run = store.create_run(f"q{n}")
+        store.add_pages(run, [page(n)])
+        store.finish_run(run)
+        runs.append(run)
+    assert blob_count(store) == 8
+    assert store.prune(keep=2) == 2
+    assert [run["id"] for run in store.list_runs()] == runs[:1:-1]
+    assert list(store.iter_pages(runs[0])) == []
+    assert blob_count(store) == 4
+
+
+def test_prune_spares_running_runs(store):
+    running = store.create_run("live")
+    done = store.create_run("old")
+    store.finish_run(done)
+    store.prune(keep=0)
+    assert store.get_run(running)["status"] == "running"
+    assert store.get_run(done) is None
+
+
+def test_store_prunes_on_open(tmp_path):
+    path = str(tmp_path / "runs.db")
+    store = RunStore(path)
+    for q in "abc":
+        store.finish_run(store.create_run(q))
+    assert len(RunStore(path, max_runs=1).list_runs()) == 1
+
+
+# -------------------- Sink --------------------
+def test_sink_writes_in_batches_and_flushes_on_close(store):
+    run = store.create_run("phones")
+    sink = RunStoreSink(store, run, batch_size=2)
+    sink.open(["scrape", "summarize"])
+    for n in range(3):
+        sink.on_scraped(page(n))
+    sink.on_summary({"url": page(0)["url"], "summary": "ok"})
+    sink.on_keywords(page(0)["url"], ["battery"])
+    assert len(list(store.iter_pages(run))) == 2
+    assert list(store.iter_summaries(run)) == []
+    sink.close()
+    assert len(list(store.iter_pages(run))) == 3
+    assert [e["summary"] for e in store.iter_summaries(run)] == ["ok"]
+    assert store.keywords(run) == {page(0)["url"]: ["battery"]}
+
+
+def test_export_json_writes_only_produced_stages(store, tmp_path):
+    run = store.create_run("phones")
+    store.add_search_results(run, ["u0", "u1"])
+    store.add_keywords(run, "u0", ["écran"])
+    out = tmp_path / "out"
+    written = store.export_json(run, str(out))
+    assert sorted(os.path.basename(p) for p in written) == ["keywords.json", "search_urls.json"]
+    assert json.loads((out / "keywords.json").read_text(encoding="utf-8")) == {"u0": ["écran"]}
+
+
+# -------------------- File commands --------------------
+@pytest.fixture
+def file_commands(monkeypatch):
+    """The process-wide store, with keywords and PDFs recorded instead of computed and rendered."""
+    import file_system_handler
+    import keyword_extractor
+    from run_store import get_run_store
+
+    rendered = []
+
+    def render_pdf(entries, keyword_data, output_path, *args, **kwargs):
+        rendered.append((list(entries), keyword_data))
+        with open(output_path, "wb") as f:
+            f.write(b"%PDF-")
+
+    monkeypatch.setattr(keyword_extractor, "keywords_for_texts",
+                        lambda texts, **kwargs: [[text.split()[0].lower()] for text in texts])
+    monkeypatch.setattr(file_system_handler, "render_pdf", render_pdf)
+    store = get_run_store()
+    summary_run = store.create_run("phones", ["scrape", "summarize"])
+    store.add_pages(summary_run, [page(0)])
+    store.add_summaries(summary_run, [{"url": page(0)["url"], "summary": "Battery lasts long."}])
+    store.finish_run(summary_run)
+    return store, summary_run, rendered
+
+
+def test_file_commands_make_a_run_of_their_own(file_commands):
+    from file_system_handler import handle_file_commands
+
+    store, summary_run, rendered = file_commands
+    with open("keywords.json", "w", encoding="utf-8") as f:
+        json.dump({"https://stale.test": ["old"]}, f)
+    handle_file_commands("extract keywords", ["extract_keywords"])
+
+    assert store.keywords(summary_run) == {}
+    file_run = store.latest_run("extract_keywords")
+    assert file_run != summary_run
+    assert store.get_run(file_run)["status"] == "done"
+    assert store.keywords(file_run) == {page(0)["url"]: ["battery"]}
+    with open("keywords.json", encoding="utf-8") as f:
+        assert json.load(f) == {page(0)["url"]: ["battery"]}
+    # Still the web run's summaries that a follow-up works from
+    assert store.latest_run("summarize") == summary_run
+
+    handle_file_commands("export the report", ["export_to_pdf"])
+    [(entries, keyword_data)] = rendered
+    assert [entry["summary"] for entry in entries] == ["Battery lasts long."]
+    assert keyword_data == {page(0)["url"]: ["battery"]}
+
+
+def test_file_commands_ignore_failed_runs(file_commands):
+    from file_system_handler import handle_file_commands
+
+    store, summary_run, rendered = file_commands
+    failed = store.create_run("phones again", ["scrape", "summarize"])
+    store.add_summaries(failed, [{"url": page(1)["url"], "summary": "Half a summ"}])
+    store.finish_run(failed, "failed")
+    handle_file_commands("export the report", ["export_to_pdf"])
+    [(entries, _)] = rendered
+    assert [entry["url"] for entry in entries] == [page(0)["url"]]
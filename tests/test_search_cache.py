@@ -0,0 +1,134 @@
+import contextlib
+
+import pytest
+
+pytest.importorskip("playwright.async_api")
+import Browser_automation  # noqa: E402
+from async_runtime import run_sync  # noqa: E402
+from Browser_automation import _block_heavy_resources, get_top_search_urls, normalize_query  # noqa: E402
+
+SEARCH = "https://search.test/"
+
+
+class FakePage:
+    def __init__(self, results):
+        self.results = results
+        self.routes = []
+        self.queries = []
+        self.url = SEARCH
+
+    async def route(self, pattern, handler):
+        self.routes.append(handler)
+
+    async def unroute(self, pattern, handler):
+        self.routes.remove(handler)
+
+    async def goto(self, url):
+        pass
+
+    async def wait_for_selector(self, selector, timeout=None):
+        pass
+
+    async def fill(self, selector, query):
+        self.queries.append(query)
+
+    @property
+    def keyboard(self):
+        return self
+
+    async def press(self, key):
+        pass
+
+    async def eval_on_selector_all(self, selector, script):
+        return list(self.results)
+
+
+class FakeBrowserManager:
+    def __init__(self, results):
+        self.pages = []
+        self.results = results
+
+    @contextlib.asynccontextmanager
+    async def page(self):
+        page = FakePage(self.results)
+        self.pages.append(page)
+        yield page
+
+
+@pytest.fixture
+def browser(monkeypatch):
+    manager = FakeBrowserManager([f"https://reviews.test/{i}" for i in range(8)])
+    monkeypatch.setattr(Browser_automation, "get_browser_manager", lambda: manager)
+    return manager
+
+
+def search(query, **kwargs):
+    return run_sync(get_top_search_urls(query, search_url=SEARCH, **kwargs))
+
+
+def test_repeated_query_is_served_from_the_cache(browser):
+    first = search("Solar  Panels ")
+    assert first == [f"https://reviews.test/{i}" for i in range(5)]
+    assert search("solar panels") == first
+    assert run_sync(get_top_search_urls("solar panels", 3, search_url=SEARCH)) == first[:3]
+    assert len(browser.pages) == 1
+    assert browser.pages[0].queries == ["Solar  Panels "]
+
+
+def test_cache_is_kept_per_search_engine(browser):
+    search("solar panels")
+    run_sync(get_top_search_urls("solar panels", search_url="https://other.test/"))
+    assert len(browser.pages) == 2
+
+
+def test_expired_results_are_searched_again(browser, monkeypatch):
+    search("solar panels")
+    monkeypatch.setattr(Browser_automation, "SEARCH_CACHE_TTL", 0)
+    search("solar panels")
+    assert len(browser.pages) == 2
+
+
+def test_use_cache_false_always_drives_the_browser(browser):
+    search("solar panels", use_cache=False)
+    search("solar panels", use_cache=False)
+    search("solar panels")
+    assert len(browser.pages) == 3
+
+
+def test_empty_results_are_not_cached(browser):
+    browser.results = []
+    assert search("solar panels") == []
+    browser.results = ["https://reviews.test/0"]
+    assert search("solar panels") == ["https://reviews.test/0"]
+    assert len(browser.pages) == 2
+
+
+def test_pages_go_back_to_the_pool_without_the_route(browser):
+    search("solar panels")
+    assert browser.pages[0].routes == []
+
+
+class FakeRoute:
+    def __init__(self, resource_type):
+        self.request = type("Request", (), {"resource_type": resource_type})()
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = "aborted"
+
+    async def continue_(self):
+        self.outcome = "continued"
+
+
+@pytest.mark.parametrize("resource_type, outcome", [
+    ("document", "continued"), ("script", "continued"), ("xhr", "continued"),
+    ("image", "aborted"), ("font", "aborted"), ("media", "aborted"), ("stylesheet", "aborted"),
+])
+def test_only_the_dom_of_the_results_page_is_loaded(resource_type, outcome):
+    route = FakeRoute(resource_type)
+    run_sync(_block_heavy_resources(route))
+    assert route.outcome == outcome
+
+
+def test_normalize_query():
+    assert normalize_query("  Best\tSolar\n Panels ") == "best solar panels"
@@ -0,0 +1,168 @@
+import json
+import os
+
+import pytest
+
+import keyword_extractor
+from run_store import RunStore
+from stage_graph import StageGraph, code_hash, file_hash, fingerprint, keywords_stage, pdf_stage
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RunStore(str(tmp_path / "runs.db"))
+
+
+@pytest.fixture
+def extractor(monkeypatch):
+    """Count the summaries sent to the keyword model instead of loading it."""
+    calls = []
+
+    def keywords_for_texts(texts, stats=None, **kwargs):
+        calls.append(list(texts))
+        if stats is not None:
+            stats["computed"] = len(texts)
+        return [[text.split()[0].lower()] for text in texts]
+
+    monkeypatch.setattr(keyword_extractor, "keywords_for_texts", keywords_for_texts)
+    return calls
+
+
+def summarized_run(store, workdir, summaries=("Battery lasts long.", "Screen is bright.")):
+    run = store.create_run("phones", workdir=workdir)
+    store.add_summaries(run, [{"url": f"u{n}", "summary": s} for n, s in enumerate(summaries)])
+    return run
+
+
+# -------------------- Hashes --------------------
+def test_fingerprint_is_order_insensitive_for_keys_only():
+    assert fingerprint({"a": 1, "b": 2}, "x") == fingerprint({"b": 2, "a": 1}, "x")
+    assert fingerprint("x", "y") != fingerprint("y", "x")
+
+
+def test_code_hash_follows_module_source():
+    assert code_hash("stage_graph") == code_hash("stage_graph")
+    assert code_hash("stage_graph") != code_hash("run_store")
+    assert code_hash("not_imported") != code_hash("stage_graph")
+
+
+def test_file_hash(tmp_path):
+    path = tmp_path / "report.pdf"
+    assert file_hash(str(path)) is None
+    path.write_bytes(b"%PDF-1.3")
+    first = file_hash(str(path))
+    path.write_bytes(b"%PDF-1.4")
+    assert file_hash(str(path)) != first
+
+
+# -------------------- Records --------------------
+def test_record_defaults_output_hash_to_stage_digest(store, tmp_path):
+    run = summarized_run(store, str(tmp_path))
+    graph = StageGraph(store, run, str(tmp_path))
+    assert graph.record("summarize", "in", entries=2, recomputed=1) == store.stage_digest(run, "summarize")
+    assert graph.reusable("summarize", "in")["run_id"] == run
+    assert graph.reusable("summarize", "other") is None
+    assert StageGraph(store, run, str(tmp_path / "elsewhere")).reusable("summarize", "in") is None
+
+
+def test_report_lists_skipped_and_recomputed_stages(store, capsys):
+    graph = StageGraph(store, store.create_run("q"))
+    graph.record("search", "a", "x", status="skipped")
+    graph.record("summarize", "b", "y", entries=4, recomputed=1)
+    graph.record("extract_keywords", "c", "z", entries=4)
+    graph.report()
+    out = capsys.readouterr().out.splitlines()
+    assert out == ["[⏭] Skipped (inputs unchanged): search",
+                   "[✓] summarize: 1 of 4 entries recomputed",
+                   "[✓] extract_keywords: 4 entries"]
+
+
+# -------------------- Keywords stage --------------------
+def test_keywords_stage_runs_then_reuses(store, extractor, tmp_path):
+    workdir = str(tmp_path)
+    first = summarized_run(store, workdir)
+    keywords_stage(StageGraph(store, first, workdir), first)
+    assert extractor == [["Battery lasts long.", "Screen is bright."]]
+    assert store.keywords(first) == {"u0": ["battery"], "u1": ["screen"]}
+
+    second = summarized_run(store, workdir)
+    graph = StageGraph(store, second, workdir)
+    keyword_file = tmp_path / "keywords.json"
+    keywords_stage(graph, second, str(keyword_file))
+    assert len(extractor) == 1
+    assert graph.results == [("extract_keywords", "skipped", 2, 0)]
+    assert store.keywords(second) == store.keywords(first)
+    assert json.loads(keyword_file.read_text(encoding="utf-8")) == {"u0": ["battery"], "u1": ["screen"]}
+
+
+def test_keywords_stage_reruns_when_summaries_change(store, extractor, tmp_path):
+    workdir = str(tmp_path)
+    first = summarized_run(store, workdir)
+    keywords_stage(StageGraph(store, first, workdir), first)
+    second = summarized_run(store, workdir, ("Camera is sharp.",))
+    graph = StageGraph(store, second, workdir)
+    keywords_stage(graph, second)
+    assert extractor[-1] == ["Camera is sharp."]
+    assert graph.results == [("extract_keywords", "ran", 1, 1)]
+
+
+def test_keywords_stage_reruns_when_stored_output_changed(store, extractor, tmp_path):
+    workdir = str(tmp_path)
+    first = summarized_run(store, workdir)
+    keywords_stage(StageGraph(store, first, workdir), first)
+    store.add_keywords(first, "u2", ["tampered"])
+    second = summarized_run(store, workdir)
+    keywords_stage(StageGraph(store, second, workdir), second)
+    assert len(extractor) == 2
+
+
+# -------------------- PDF stage --------------------
+@pytest.fixture
+def renders(monkeypatch):
+    """Record the reports rendered, writing a stand-in file for each."""
+    import file_system_handler
+
+    calls = []
+
+    def render_pdf(entries, keyword_data, output_path, section_size=50, workers=None):
+        entries = list(entries)
+        calls.append((len(entries), section_size))
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump([entries, keyword_data, section_size], f, default=str)
+
+    monkeypatch.setattr(file_system_handler, "render_pdf", render_pdf)
+    return calls
+
+
+def render(store, workdir, **kwargs):
+    run = summarized_run(store, workdir)
+    graph = StageGraph(store, run, workdir)
+    pdf_stage(graph, run, None, os.path.join(workdir, "final_report.pdf"), **kwargs)
+    return graph.results[-1][1]
+
+
+def test_pdf_stage_skips_an_unchanged_report(store, renders, tmp_path):
+    assert render(store, str(tmp_path)) == "ran"
+    assert render(store, str(tmp_path)) == "skipped"
+    assert renders == [(2, 50)]
+
+
+def test_pdf_stage_reruns_when_the_report_file_changed(store, renders, tmp_path):
+    render(store, str(tmp_path))
+    (tmp_path / "final_report.pdf").write_text("edited")
+    assert render(store, str(tmp_path)) == "ran"
+
+
+@pytest.mark.parametrize("setting, value", [("JPEG_QUALITY", 60), ("TARGET_DPI", 300), ("RENDER_WIDTH_MM", 120)])
+def test_pdf_stage_reruns_when_image_settings_change(store, renders, tmp_path, monkeypatch, setting, value):
+    import image_prep
+
+    render(store, str(tmp_path))
+    monkeypatch.setattr(image_prep, setting, value)
+    assert render(store, str(tmp_path)) == "ran"
+
+
+def test_pdf_stage_reruns_for_another_section_size(store, renders, tmp_path):
+    render(store, str(tmp_path))
+    assert render(store, str(tmp_path), section_size=10) == "ran"
+    assert renders[-1] == (2, 10)
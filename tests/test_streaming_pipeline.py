@@ -0,0 +1,178 @@
+import json
+import os
+import zlib
+
+import numpy as np
+import pytest
+
+import keyword_extractor
+import streaming_pipeline
+import summarizer
+from async_runtime import run_sync
+from model_registry import register
+from streaming_pipeline import JsonFileSink, MemorySink, StreamingPipeline
+
+
+class WordTokenizer:
+    model_max_length = 1024
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+    def __call__(self, texts, add_special_tokens=False):
+        return {"input_ids": [text.split() for text in texts]}
+
+    def decode(self, ids):
+        return " ".join(ids)
+
+
+class LeadSummarizer:
+    tokenizer = WordTokenizer()
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, chunks, **kwargs):
+        self.calls += 1
+        return [{"summary_text": " ".join(chunk.split()[:6])} for chunk in chunks]
+
+
+class HashingEmbedder:
+    def embed(self, documents, verbose=False):
+        vectors = np.zeros((len(documents), 64), dtype="float32")
+        for row, document in enumerate(documents):
+            for word in document.lower().split():
+                vectors[row, zlib.crc32(word.encode()) % 64] += 1.0
+        return vectors
+
+
+class KeyBERT:
+    model = HashingEmbedder()
+
+
+@pytest.fixture
+def models():
+    lead = LeadSummarizer()
+    register("summarizer", lambda: lead)
+    register("keybert", KeyBERT)
+    yield lead
+    register("summarizer", summarizer._load_summarizer)
+    register("keybert", keyword_extractor._load_keybert)
+
+
+def pages(n):
+    topics = ["battery", "screen", "camera", "speaker", "keyboard", "hinge", "charger", "trackpad"]
+    return [{"url": f"https://reviews.test/{i}",
+             "text": f"Review {i} headline\nThe {topics[i % 8]} of model {i} is reviewed in depth here. "
+                     f"Owners praise the {topics[i % 8]} and the price of model {i}.",
+             "images": [f"img_{i}.png"], "pros": ["fast"], "cons": [], "table_rows": []}
+            for i in range(n)]
+
+
+def replay(commands, sinks, scraped, **kwargs):
+    pipeline = StreamingPipeline(commands, sinks=sinks, **kwargs)
+    run_sync(pipeline.run(scraped=scraped))
+    return pipeline
+
+
+def load(directory, name):
+    with open(os.path.join(directory, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_summaries_and_keywords_stream_to_every_sink(models, tmp_path):
+    memory = MemorySink()
+    pipeline = replay(["summarize", "extract_keywords"], [memory, JsonFileSink(str(tmp_path))], pages(12),
+                      summary_batch=4, keyword_batch=5)
+    urls = [page["url"] for page in pages(12)]
+    assert [entry["url"] for entry in memory.summaries] == urls
+    assert memory.summaries[3]["images"] == ["img_3.png"] and memory.summaries[3]["pros"] == ["fast"]
+    assert memory.summaries[0]["summary"] == "Review 0 headline The battery of"
+    assert set(memory.keywords) == set(urls)
+    assert load(tmp_path, "final_summary.json") == memory.summaries
+    assert load(tmp_path, "keywords.json") == memory.keywords
+    assert pipeline.summarized_count == pipeline.scraped_count == 12
+    # Replayed pages were scraped by an earlier run: its file is left alone
+    assert not os.path.exists(tmp_path / "scraped_output.json")
+
+
+def test_headlines_only_run_never_summarizes(models, tmp_path):
+    memory = MemorySink()
+    replay(["headlines"], [memory, JsonFileSink(str(tmp_path))], pages(3))
+    assert memory.headlines == [{"url": p["url"], "headline": p["text"].split("\n")[0]} for p in pages(3)]
+    assert memory.summaries == [] and models.calls == 0
+    assert sorted(os.listdir(tmp_path)) == ["headlines.json"]
+
+
+def test_keywords_need_this_runs_summaries(models, tmp_path):
+    pipeline = replay(["extract_keywords"], [JsonFileSink(str(tmp_path))], pages(2))
+    assert not pipeline.streams_keywords
+    assert not os.path.exists(tmp_path / "keywords.json")
+
+
+def test_crawled_pages_are_written_as_they_arrive(models, tmp_path, monkeypatch):
+    class Engine:
+        async def crawl(self, urls):
+            for page in pages(len(urls)):
+                yield page
+
+    monkeypatch.setattr(streaming_pipeline, "get_crawl_engine", Engine)
+    memory = MemorySink()
+    pipeline = StreamingPipeline(["summarize"], sinks=[memory, JsonFileSink(str(tmp_path))])
+    run_sync(pipeline.run(urls=[p["url"] for p in pages(3)]))
+    assert load(tmp_path, "scraped_output.json") == pages(3) == memory.scraped
+    assert len(load(tmp_path, "final_summary.json")) == 3
+
+
+def test_queues_bound_how_far_the_crawl_runs_ahead(models):
+    ahead = []
+
+    class Watch(MemorySink):
+        def on_summary(self, entry):
+            super().on_summary(entry)
+            ahead.append(pipeline.scraped_count - pipeline.summarized_count)
+
+    pipeline = StreamingPipeline(["summarize"], sinks=[Watch()], queue_size=2, summary_batch=2)
+    run_sync(pipeline.run(scraped=pages(20)))
+    assert pipeline.summarized_count == 20
+    # Two queued, one batch being summarized, one waiting to be queued
+    assert max(ahead) <= 2 + 2 + 1
+
+
+# -------------------- Near-duplicates --------------------
+def story(n):
+    return " ".join(f"Paragraph {i} of story {n} covers the grid battery and its evening peak."
+                    for i in range(8))
+
+
+def mirrored(n, hosts):
+    return [{"url": f"https://{host}/story-{n}", "text": f"{host} edition\n{story(n)}",
+             "images": [f"{host}.png"], "pros": [], "cons": [], "table_rows": []} for host in hosts]
+
+
+def test_near_duplicates_are_summarized_once_but_keep_headlines(models, tmp_path):
+    memory = MemorySink()
+    scraped = mirrored(1, ["a.test", "b.test"]) + mirrored(2, ["c.test"])
+    pipeline = replay(["summarize", "headlines"], [memory, JsonFileSink(str(tmp_path))], scraped)
+    assert [entry["url"] for entry in memory.summaries] == ["https://a.test/story-1", "https://c.test/story-2"]
+    assert memory.duplicates == {"https://b.test/story-1": "https://a.test/story-1"}
+    assert load(tmp_path, "duplicates.json") == memory.duplicates
+    assert [h["headline"] for h in memory.headlines] == ["a.test edition", "b.test edition", "c.test edition"]
+    assert pipeline.duplicate_count == 1
+
+
+def test_story_seen_in_an_earlier_run_is_summarized_from_this_page(models):
+    replay(["summarize"], [MemorySink()], mirrored(1, ["a.test"]))
+    memory = MemorySink()
+    replay(["summarize"], [memory], mirrored(1, ["b.test"]))
+    [entry] = memory.summaries
+    assert entry["url"] == "https://b.test/story-1" and entry["images"] == ["b.test.png"]
+    assert entry["summary"].startswith("b.test edition")
+
+
+def test_runs_without_dedup_drop_a_stale_duplicates_file(models, tmp_path):
+    (tmp_path / "duplicates.json").write_text('{"https://b.test/story-1": "https://a.test/story-1"}')
+    memory = MemorySink()
+    replay(["summarize"], [memory, JsonFileSink(str(tmp_path))], mirrored(1, ["a.test", "b.test"]), dedup=False)
+    assert len(memory.summaries) == 2 and memory.duplicates == {}
+    assert not os.path.exists(tmp_path / "duplicates.json")
@@ -0,0 +1,106 @@
+import pytest
+
+import summarizer
+from model_registry import register
+from summarizer import chunk_text, split_sentences, summarize_batch
+
+
+class WordTokenizer:
+    model_max_length = 1024
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+    def __call__(self, texts, add_special_tokens=False):
+        return {"input_ids": [text.split() for text in texts]}
+
+    def decode(self, ids):
+        return " ".join(ids)
+
+
+class FirstWords:
+    """Summarization pipeline stand-in: keeps the first three words of every chunk."""
+
+    tokenizer = WordTokenizer()
+
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    def __call__(self, chunks, **kwargs):
+        self.batches.append(list(chunks))
+        if self.fail:
+            raise RuntimeError("out of memory")
+        return [{"summary_text": " ".join(chunk.split()[:3])} for chunk in chunks]
+
+
+@pytest.fixture
+def model():
+    stand_in = FirstWords()
+    register("summarizer", lambda: stand_in)
+    yield stand_in
+    register("summarizer", summarizer._load_summarizer)
+
+
+def words(n, start=0):
+    return " ".join(f"w{i}" for i in range(start, start + n))
+
+
+def test_split_sentences():
+    assert split_sentences("One. Two!  Three?\nFour") == ["One.", "Two!", "Three?", "Four"]
+
+
+def test_chunks_keep_sentences_whole_within_the_budget(model):
+    text = f"{words(4)}. {words(4, 4)}. {words(4, 8)}."
+    chunks = chunk_text(text, max_tokens=9)
+    assert [chunk for chunk, _ in chunks] == [f"{words(4)}. {words(4, 4)}.", f"{words(4, 8)}."]
+    assert all(n <= 9 for _, n in chunks)
+
+
+def test_overlong_sentence_is_cut_at_token_boundaries(model):
+    chunks = chunk_text(f"Short one. {words(25)}", max_tokens=10)
+    assert [n for _, n in chunks] == [2, 10, 10, 5]
+    assert chunks[1][0] == words(10)
+
+
+def test_budget_never_exceeds_the_model_limit(model):
+    assert chunk_text(words(2000), max_tokens=5000)[0][1] == 1022
+
+
+def test_batch_returns_one_summary_per_document_in_order(model):
+    texts = [f"{words(3, 100)}. {words(30)}", "Tiny text here.", ""]
+    summaries = summarize_batch(texts, batch_size=2, max_chunk_tokens=10)
+    assert summaries[0] == "w100 w101 w102. w0 w1 w2 w10 w11 w12 w20 w21 w22"
+    assert summaries[1] == "Tiny text here."
+    assert summaries[2] == ""
+    # Longest chunks first, at most batch_size per model call
+    assert [len(batch) for batch in model.batches] == [2, 2, 1]
+    assert len(model.batches[0][0].split()) == 10
+
+
+def test_failed_batch_marks_its_documents(model):
+    model.fail = True
+    [summary] = summarize_batch(["Some text to summarize."], use_cache=False)
+    assert summary.startswith("[Summarization failed")
+
+
+# -------------------- Result cache --------------------
+def test_cached_summaries_skip_the_model(model):
+    texts = ["First page text.", "Second page text."]
+    first = summarize_batch(texts)
+    calls = len(model.batches)
+    assert summarize_batch(list(reversed(texts))) == list(reversed(first))
+    assert len(model.batches) == calls
+
+
+def test_new_parameters_miss_the_cache(model):
+    summarize_batch(["Page text."])
+    summarize_batch(["Page text."], max_length=60)
+    assert len(model.batches) == 2
+
+
+def test_failures_are_not_cached(model):
+    model.fail = True
+    summarize_batch(["Page text."])
+    model.fail = False
+    assert summarize_batch(["Page text."]) == ["Page text."]
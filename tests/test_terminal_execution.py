@@ -0,0 +1,75 @@
+import os
+import sys
+
+import pytest
+
+from async_runtime import run_sync
+from terminal_execution import MAX_LINE_CHARS, OutputBuffer, run_command_async, run_commands
+
+
+# -------------------- OutputBuffer --------------------
+def test_buffer_keeps_everything_below_the_limits():
+    buffer = OutputBuffer(head_lines=3, tail_lines=3)
+    for i in range(5):
+        buffer.append(f"line {i}")
+    assert buffer.omitted == 0
+    assert buffer.text() == "\n".join(f"line {i}" for i in range(5))
+
+
+def test_buffer_keeps_head_and_tail_and_counts_the_rest():
+    buffer = OutputBuffer(head_lines=2, tail_lines=2)
+    for i in range(10):
+        buffer.append(f"line {i}")
+    assert buffer.total == 10
+    assert buffer.omitted == 6
+    assert buffer.text().splitlines() == ["line 0", "line 1", "... [6 lines omitted] ...", "line 8", "line 9"]
+
+
+def test_buffer_memory_is_bounded():
+    buffer = OutputBuffer(head_lines=5, tail_lines=5)
+    for i in range(100000):
+        buffer.append("x")
+    assert len(buffer.head) + len(buffer.tail) == 10
+
+
+# -------------------- Commands --------------------
+def _python(code):
+    return f'"{sys.executable}" -c "{code}"'
+
+
+def test_streams_lines_and_bounds_retained_output():
+    seen = []
+    result = run_sync(run_command_async(_python("for i in range(50): print(i)"),
+                                        on_line=lambda stream, line: seen.append((stream, line)),
+                                        head_lines=5, tail_lines=5))
+    assert result["success"] and result["exit_code"] == 0
+    assert [line for _, line in seen] == [str(i) for i in range(50)]
+    assert result["omitted_lines"] == 40
+    assert result["stdout"].splitlines()[0] == "0" and result["stdout"].splitlines()[-1] == "49"
+
+
+def test_long_lines_are_truncated():
+    result = run_sync(run_command_async(_python(f"print('a' * {MAX_LINE_CHARS * 2})")))
+    assert result["stdout"].endswith("...[line truncated]")
+    assert len(result["stdout"]) < MAX_LINE_CHARS + 100
+
+
+def test_failure_and_stderr():
+    result = run_sync(run_command_async(_python("import sys; sys.stderr.write('boom'); sys.exit(3)")))
+    assert not result["success"]
+    assert result["exit_code"] == 3
+    assert result["stderr"] == "boom"
+
+
+@pytest.mark.skipif(os.name == "nt", reason="uses a POSIX sleep")
+def test_timeout_kills_the_command():
+    result = run_sync(run_command_async("sleep 30", timeout=0.5))
+    assert not result["success"]
+    assert "timed out" in result["stderr"]
+    assert result["wall_time"] < 10
+
+
+def test_concurrent_commands_keep_their_order():
+    commands = [_python(f"print({i})") for i in range(4)]
+    results = run_commands(commands, max_workers=2)
+    assert [r["stdout"] for r in results] == ["0", "1", "2", "3"]